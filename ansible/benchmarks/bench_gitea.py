@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""
+Throughput benchmarks of the gitea Ansible modules against mock_gitea.
+
+Each scenario runs the modules in-process, as a loop of one task per item
+would ("task" mode) and as a single bulk task ("bulk" mode), and reports
+operations per second, p50/p99 request latency as seen by the server, and
+the number of API requests made. AnsiballZ packaging and interpreter start
+up are not included, so task mode figures are a lower bound on the cost of
+a real per-item loop.
+
+Requires ansible-core. Example:
+
+    python bench_gitea.py --repos 500 --latency 0.002 --error-rate 0.01 --json baseline.json
+"""
+
+import argparse
+import json
+import os
+import runpy
+import sys
+import time
+
+ANSIBLE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LIBRARY_DIR = os.path.join(ANSIBLE_DIR, 'library')
+runpy.run_path(os.path.join(ANSIBLE_DIR, 'module_utils', 'gitea_plugins.py'))
+
+from ansible.module_utils.gitea_action import run_in_process  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from mock_gitea import MockGitea  # noqa: E402
+
+
+def run_module(name, args):
+    """ Run a module in-process as the gitea action plugins do, returning its result dict """
+    return run_in_process(os.path.join(LIBRARY_DIR, name + '.py'), args)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))]
+
+
+class Bench(object):
+
+    def __init__(self, mock, concurrency):
+        self.mock = mock
+        self.concurrency = concurrency
+        self.auth = dict(gitea_url=mock.url, api_token='benchmark', retries=10)
+        self.rows = []
+
+    def run(self, scenario, mode, ops, calls):
+        """ Run calls, a list of (module, args), as one measured scenario """
+        self.mock.reset_stats()
+        failed = 0
+        start = time.time()
+        for (name, args) in calls:
+            result = run_module(name, dict(self.auth, **args))
+            failed += bool(result.get('failed'))
+        elapsed = time.time() - start
+        row = dict(
+            scenario=scenario,
+            mode=mode,
+            ops=ops,
+            failed=failed,
+            elapsed=elapsed,
+            ops_per_sec=ops / elapsed if elapsed else 0.0,
+            p50_ms=percentile(self.mock.durations, 50) * 1000,
+            p99_ms=percentile(self.mock.durations, 99) * 1000,
+            requests=sum(self.mock.counts.values()),
+            injected_errors=self.mock.injected_errors,
+            counts=dict(('{} {} {}'.format(*k), v) for (k, v) in sorted(self.mock.counts.items(),
+                                                                        key=str)),
+        )
+        self.rows.append(row)
+        return row
+
+    def repos(self, scenario, mode, org, names, state='present'):
+        if mode == 'task':
+            calls = [('gitea_repo', dict(org=org, name=n, state=state)) for n in names]
+        else:
+            calls = [('gitea_repo', dict(org=org, state=state, concurrency=self.concurrency,
+                                         repos=[dict(name=n) for n in names]))]
+        return self.run(scenario, mode, len(names), calls)
+
+    def orgs(self, scenario, mode, names, **fields):
+        if mode == 'task':
+            calls = [('gitea_org', dict(username=n, **fields)) for n in names]
+        else:
+            calls = [('gitea_org', dict(concurrency=self.concurrency,
+                                        orgs=[dict(username=n, **fields) for n in names]))]
+        return self.run(scenario, mode, len(names), calls)
+
+
+def scenarios(bench, args):
+    repos = ['repo-{:05d}'.format(i) for i in range(args.repos)]
+    orgs = ['org-{:03d}'.format(i) for i in range(args.orgs)]
+    for mode in ('task', 'bulk'):
+        org = 'bench-{}'.format(mode)
+        bench.orgs('org create', mode, [org] + ['{}-{}'.format(o, mode) for o in orgs], full_name='Bench')
+        bench.repos('fresh create', mode, org, repos)
+        bench.repos('idempotent re-run', mode, org, repos)
+        bench.orgs('org re-run', mode, [org] + ['{}-{}'.format(o, mode) for o in orgs], full_name='Bench')
+
+        # Mixed: half the repos are deleted while as many new ones are created
+        half = len(repos) // 2
+        new = ['new-{:05d}'.format(i) for i in range(half)]
+        if mode == 'task':
+            calls = ([('gitea_repo', dict(org=org, name=n, state='absent')) for n in repos[:half]] +
+                     [('gitea_repo', dict(org=org, name=n)) for n in new])
+        else:
+            items = ([dict(name=n, state='absent') for n in repos[:half]] + [dict(name=n) for n in new])
+            calls = [('gitea_repo', dict(org=org, concurrency=bench.concurrency, repos=items))]
+        bench.run('mixed', mode, half * 2, calls)
+
+        bench.repos('delete', mode, org, repos[half:] + new, state='absent')
+
+
+def report(rows, verbose=False):
+    header = '{:<20} {:<5} {:>6} {:>7} {:>9} {:>10} {:>8} {:>8} {:>9} {:>8}'.format(
+        'scenario', 'mode', 'ops', 'failed', 'elapsed', 'ops/sec', 'p50 ms', 'p99 ms', 'requests', 'errors')
+    print(header)
+    print('-' * len(header))
+    for row in rows:
+        print('{scenario:<20} {mode:<5} {ops:>6} {failed:>7} {elapsed:>8.2f}s {ops_per_sec:>10.1f} '
+              '{p50_ms:>8.2f} {p99_ms:>8.2f} {requests:>9} {injected_errors:>8}'.format(**row))
+        if verbose:
+            for (key, count) in row['counts'].items():
+                print('    {:>6}  {}'.format(count, key))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repos', type=int, default=200, help='repositories per scenario')
+    parser.add_argument('--orgs', type=int, default=20, help='extra organizations per scenario')
+    parser.add_argument('--concurrency', type=int, default=8, help='bulk mode concurrency')
+    parser.add_argument('--latency', type=float, default=0.002, help='seconds added to every request')
+    parser.add_argument('--jitter', type=float, default=0.001)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered 503')
+    parser.add_argument('--capacity', type=int, default=0,
+                        help='requests the mock handles at once before answering 503, 0 for no limit')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', metavar='FILE', help='also write the results to FILE')
+    parser.add_argument('-v', '--verbose', action='store_true', help='show request counts per endpoint')
+    args = parser.parse_args()
+
+    mock = MockGitea(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                     seed=args.seed, capacity=args.capacity)
+    mock.start()
+    try:
+        bench = Bench(mock, args.concurrency)
+        scenarios(bench, args)
+    finally:
+        mock.stop()
+
+    report(bench.rows, args.verbose)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(dict(args=vars(args), results=bench.rows), f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
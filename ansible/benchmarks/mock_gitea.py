@@ -0,0 +1,597 @@
+#!/usr/bin/env python
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""
+Local stand-in for the gitea API endpoints used by the gitea Ansible modules.
+
+State is kept in memory. Latency and transient 503 errors can be injected,
+and the server follows gitea's semantics where the modules depend on them:
+409 when creating a repository that exists, 404 for missing objects, 422
+when deleting an organization which still owns repositories, and
+X-Total-Count on paginated list endpoints. JSON bodies are gzip compressed
+for clients accepting it, as with ENABLE_GZIP.
+
+Run it standalone to point playbooks at it:
+
+    python mock_gitea.py --port 3000 --latency 0.005 --error-rate 0.01
+
+or embed it, as bench_gitea does, with MockGitea(...).start().
+"""
+
+import argparse
+import base64
+import gzip
+import hashlib
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+API_PREFIX = '/api/v1'
+ADMIN_USER = 'crayvcs'
+
+# Gitea does not compress bodies smaller than this
+GZIP_MIN_SIZE = 1024
+
+ROUTES = []
+
+
+def route(method, template):
+    """ Register a handler for a path template such as /orgs/{org} """
+    # {filepath} spans several segments, as the * of Gitea's routes
+    pattern = re.compile('^' + re.sub(r'\{(\w+)\}', lambda m: r'(?P<{}>{})'.format(
+        m.group(1), '.+' if m.group(1) == 'filepath' else '[^/]+'), template) + '$')
+
+    def decorator(func):
+        ROUTES.append((method, template, pattern, func))
+        return func
+    return decorator
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super(ApiError, self).__init__(message)
+        self.status = status
+
+
+def _now():
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+
+
+def _blob_sha(content):
+    return hashlib.sha1(b'blob %d\0' % len(content) + content).hexdigest()
+
+
+def _head_sha(files):
+    return hashlib.sha1(json.dumps(sorted((p, _blob_sha(c)) for (p, c) in files.items())).encode()).hexdigest()
+
+
+class GiteaState(object):
+    """ The in-memory orgs, repos, teams and files """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.orgs = {}
+        self.repos = {}
+        self.teams = {}
+        self.members = {}
+        self.files = {}
+
+    def org(self, name):
+        if name not in self.orgs:
+            raise ApiError(404, 'org does not exist [name: {}]'.format(name))
+        return self.orgs[name]
+
+    def repo(self, owner, name):
+        if (owner, name) not in self.repos:
+            raise ApiError(404, 'repository does not exist [owner: {}, name: {}]'.format(owner, name))
+        return self.repos[(owner, name)]
+
+    def team(self, team_id):
+        team_id = int(team_id)
+        if team_id not in self.teams:
+            raise ApiError(404, 'team does not exist [id: {}]'.format(team_id))
+        return self.teams[team_id]
+
+    def add_org(self, data):
+        if data['username'] in self.orgs:
+            raise ApiError(422, 'user already exists [name: {}]'.format(data['username']))
+        org = dict(id=next(self.ids), username=data['username'], full_name=data.get('full_name', ''),
+                   description=data.get('description', ''), website=data.get('website', ''),
+                   location=data.get('location', ''), visibility=data.get('visibility', 'public'))
+        self.orgs[org['username']] = org
+        owners = self.add_team(org['username'], dict(name='Owners', permission='owner'))
+        self.members[owners['id']].add(ADMIN_USER)
+        return org
+
+    def add_repo(self, owner, data):
+        if (owner, data['name']) in self.repos:
+            raise ApiError(409, 'repository already exists [uname: {}, name: {}]'.format(owner, data['name']))
+        repo = dict(id=next(self.ids), owner=dict(login=owner), name=data['name'],
+                    full_name='{}/{}'.format(owner, data['name']),
+                    description=data.get('description', ''), private=data.get('private', False),
+                    mirror=data.get('mirror', False), empty=not data.get('auto_init', False),
+                    archived=False, default_branch='main', updated_at=_now())
+        self.repos[(owner, data['name'])] = repo
+        return repo
+
+    def add_team(self, org, data):
+        team = dict(id=next(self.ids), name=data['name'], description=data.get('description', ''),
+                    permission=data.get('permission', 'read'), units=data.get('units') or [],
+                    includes_all_repositories=data.get('includes_all_repositories', False),
+                    can_create_org_repo=data.get('can_create_org_repo', False),
+                    organization=dict(username=org))
+        self.teams[team['id']] = team
+        self.members[team['id']] = set()
+        return team
+
+
+class MockGitea(object):
+    """
+    A threaded mock gitea API server.
+
+    latency seconds (plus up to jitter seconds) are added to every request;
+    a fraction error_rate of requests is answered 503 with Retry-After: 0
+    before being processed, as the API gateway does under load. With a
+    capacity, requests arriving while that many are already being handled
+    are answered 503 too, as a saturated gitea pod would.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 max_items=50, seed=None, capacity=0):
+        self.latency = latency
+        self.capacity = capacity
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.max_items = max_items
+        self.random = random.Random(seed)
+        self.state = GiteaState()
+        self.counts = Counter()
+        self.durations = []
+        self.injected_errors = 0
+        self._stats_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return 'http://{}:{}{}'.format(host, port, API_PREFIX)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.counts.clear()
+            self.durations = []
+            self.injected_errors = 0
+            self.peak_in_flight = 0
+
+    def _enter(self):
+        """ Count a request in, returning whether it is over capacity """
+        with self._stats_lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            return bool(self.capacity) and self.in_flight > self.capacity
+
+    def _leave(self):
+        with self._stats_lock:
+            self.in_flight -= 1
+
+    def _record(self, key, duration, injected):
+        with self._stats_lock:
+            self.counts[key] += 1
+            self.durations.append(duration)
+            self.injected_errors += injected
+
+    def _delay(self):
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+    def _paginate(self, items, query):
+        limit = min(int(query.get('limit', [self.max_items])[0]), self.max_items)
+        page = max(1, int(query.get('page', ['1'])[0]))
+        return items[(page - 1) * limit:page * limit], {'X-Total-Count': str(len(items))}
+
+    def dispatch(self, method, path, query, body):
+        """ Run the handler of a request, returning (template, status, json, headers) """
+        for (m, template, pattern, func) in ROUTES:
+            match = pattern.match(path)
+            if m == method and match:
+                args = dict((k, unquote(v)) for (k, v) in match.groupdict().items())
+                try:
+                    with self.state.lock:
+                        status, obj, headers = func(self, query, body, **args)
+                except ApiError as e:
+                    status, obj, headers = e.status, dict(message=str(e)), {}
+                return template, status, obj, headers
+        return None, 404, dict(message='not found'), {}
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are written separately; do not let Nagle's
+            # algorithm hold the body back waiting for a delayed ACK.
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, obj, headers):
+                if isinstance(obj, bytes):
+                    data, content_type = obj, 'application/octet-stream'
+                else:
+                    data = json.dumps(obj).encode('utf-8') if obj is not None else b''
+                    content_type = 'application/json'
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                # As gitea with ENABLE_GZIP, which leaves small bodies alone
+                if content_type == 'application/json' and len(data) >= GZIP_MIN_SIZE and \
+                        'gzip' in (self.headers.get('Accept-Encoding') or ''):
+                    data = gzip.compress(data)
+                    self.send_header('Content-Encoding', 'gzip')
+                self.send_header('Content-Length', str(len(data)))
+                for (k, v) in headers.items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _handle(self):
+                start = time.time()
+                url = urlparse(self.path)
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b''
+                overloaded = mock._enter()
+                try:
+                    mock._delay()
+                finally:
+                    mock._leave()
+                injected = overloaded or (mock.error_rate and mock.random.random() < mock.error_rate)
+                if injected:
+                    template, status, obj, headers = None, 503, dict(message='busy'), {'Retry-After': '0'}
+                elif not self.headers.get('Authorization'):
+                    template, status, obj, headers = None, 401, dict(message='unauthorized'), {}
+                elif not url.path.startswith(API_PREFIX):
+                    template, status, obj, headers = None, 404, dict(message='not found'), {}
+                else:
+                    body = json.loads(raw) if raw else None
+                    query = parse_qs(url.query)
+                    if self.headers.get('Range'):
+                        query['range'] = [self.headers['Range']]
+                    template, status, obj, headers = mock.dispatch(
+                        self.command, url.path[len(API_PREFIX):], query, body)
+                self._send(status, obj, headers)
+                mock._record((self.command, template or url.path, status), time.time() - start,
+                             int(bool(injected)))
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle
+
+        return Handler
+
+
+# Users
+
+@route('GET', '/user')
+def get_user(mock, query, body):
+    return 200, dict(id=1, login=ADMIN_USER, is_admin=True), {}
+
+
+# Organizations
+
+@route('GET', '/orgs')
+def list_orgs(mock, query, body):
+    items, headers = mock._paginate(sorted(mock.state.orgs.values(), key=lambda o: o['id']), query)
+    return 200, items, headers
+
+
+@route('POST', '/orgs')
+def create_org(mock, query, body):
+    return 201, mock.state.add_org(body), {}
+
+
+@route('GET', '/orgs/{org}')
+def get_org(mock, query, body, org):
+    return 200, mock.state.org(org), {}
+
+
+@route('PATCH', '/orgs/{org}')
+def edit_org(mock, query, body, org):
+    current = mock.state.org(org)
+    current.update((k, v) for (k, v) in body.items() if k != 'username')
+    return 200, current, {}
+
+
+@route('DELETE', '/orgs/{org}')
+def delete_org(mock, query, body, org):
+    mock.state.org(org)
+    if any(owner == org for (owner, _) in mock.state.repos):
+        raise ApiError(422, 'organization still has ownership of repositories')
+    del mock.state.orgs[org]
+    for team_id in [t['id'] for t in mock.state.teams.values() if t['organization']['username'] == org]:
+        del mock.state.teams[team_id]
+        del mock.state.members[team_id]
+    return 204, None, {}
+
+
+# Repositories
+
+@route('GET', '/orgs/{org}/repos')
+def list_org_repos(mock, query, body, org):
+    mock.state.org(org)
+    repos = [r for ((owner, _), r) in sorted(mock.state.repos.items()) if owner == org]
+    items, headers = mock._paginate(repos, query)
+    return 200, items, headers
+
+
+@route('POST', '/org/{org}/repos')
+@route('POST', '/orgs/{org}/repos')
+def create_org_repo(mock, query, body, org):
+    mock.state.org(org)
+    return 201, mock.state.add_repo(org, body), {}
+
+
+@route('POST', '/user/repos')
+def create_user_repo(mock, query, body):
+    return 201, mock.state.add_repo(ADMIN_USER, body), {}
+
+
+@route('POST', '/repos/migrate')
+def migrate_repo(mock, query, body):
+    owner = body.get('repo_owner') or ADMIN_USER
+    repo = mock.state.add_repo(owner, dict(name=body['repo_name'], description=body.get('description'),
+                                           private=body.get('private', False),
+                                           mirror=body.get('mirror', False), auto_init=True))
+    return 201, repo, {}
+
+
+@route('GET', '/repos/search')
+def search_repos(mock, query, body):
+    keyword = query.get('q', [''])[0]
+    repos = sorted(mock.state.repos.values(), key=lambda r: r['id'])
+    if keyword:
+        repos = [r for r in repos if keyword in r['name']]
+    if query.get('sort', [''])[0] == 'updated':
+        repos.sort(key=lambda r: r['updated_at'], reverse=query.get('order', ['asc'])[0] == 'desc')
+    items, headers = mock._paginate(repos, query)
+    return 200, dict(ok=True, data=items), headers
+
+
+@route('GET', '/repos/{owner}/{repo}')
+def get_repo(mock, query, body, owner, repo):
+    return 200, mock.state.repo(owner, repo), {}
+
+
+@route('PATCH', '/repos/{owner}/{repo}')
+def edit_repo(mock, query, body, owner, repo):
+    repo = mock.state.repo(owner, repo)
+    repo.update(body)
+    repo['updated_at'] = _now()
+    return 200, repo, {}
+
+
+@route('DELETE', '/repos/{owner}/{repo}')
+def delete_repo(mock, query, body, owner, repo):
+    mock.state.repo(owner, repo)
+    del mock.state.repos[(owner, repo)]
+    mock.state.files.pop((owner, repo), None)
+    return 204, None, {}
+
+
+# Teams
+
+@route('GET', '/orgs/{org}/teams')
+def list_teams(mock, query, body, org):
+    mock.state.org(org)
+    teams = [t for t in mock.state.teams.values() if t['organization']['username'] == org]
+    items, headers = mock._paginate(teams, query)
+    return 200, items, headers
+
+
+@route('POST', '/orgs/{org}/teams')
+def create_team(mock, query, body, org):
+    mock.state.org(org)
+    return 201, mock.state.add_team(org, body), {}
+
+
+@route('PATCH', '/teams/{id}')
+def edit_team(mock, query, body, id):
+    team = mock.state.team(id)
+    team.update(body)
+    return 200, team, {}
+
+
+@route('DELETE', '/teams/{id}')
+def delete_team(mock, query, body, id):
+    team = mock.state.team(id)
+    del mock.state.teams[team['id']]
+    del mock.state.members[team['id']]
+    return 204, None, {}
+
+
+@route('GET', '/teams/{id}/members')
+def list_members(mock, query, body, id):
+    team = mock.state.team(id)
+    members = [dict(login=login) for login in sorted(mock.state.members[team['id']])]
+    items, headers = mock._paginate(members, query)
+    return 200, items, headers
+
+
+def _member(members, user):
+    """ The member of a team with this login, which gitea matches case-insensitively """
+    return next((login for login in members if login.lower() == user.lower()), None)
+
+
+@route('PUT', '/teams/{id}/members/{user}')
+def add_member(mock, query, body, id, user):
+    members = mock.state.members[mock.state.team(id)['id']]
+    if _member(members, user) is None:
+        members.add(user)
+    return 204, None, {}
+
+
+@route('DELETE', '/teams/{id}/members/{user}')
+def remove_member(mock, query, body, id, user):
+    members = mock.state.members[mock.state.team(id)['id']]
+    login = _member(members, user)
+    if login is None:
+        raise ApiError(404, 'user is not a member of the team')
+    if mock.state.team(id)['name'] == 'Owners' and len(members) == 1:
+        raise ApiError(422, 'user is the last member of owner team [uid: {}]'.format(user))
+    members.discard(login)
+    return 204, None, {}
+
+
+# Contents
+
+@route('GET', '/repos/{owner}/{repo}/git/trees/{ref}')
+def get_tree(mock, query, body, owner, repo, ref):
+    mock.state.repo(owner, repo)
+    files = mock.state.files.get((owner, repo))
+    if not files:
+        raise ApiError(404, 'GetTreeBySHA: object does not exist [id: {}]'.format(ref))
+    tree = [dict(path=path, type='blob', sha=_blob_sha(content)) for (path, content) in sorted(files.items())]
+    return 200, dict(sha=ref, tree=tree, truncated=False, page=1, total_count=len(tree)), {}
+
+
+def _change_file(mock, owner, repo, filepath, body, content):
+    """ Commit one file change to the default branch, as the contents API does """
+    current = mock.state.repo(owner, repo)
+    if current['empty'] or body.get('branch', current['default_branch']) != current['default_branch']:
+        raise ApiError(404, 'branch does not exist [name: {}]'.format(body.get('branch')))
+    files = mock.state.files.setdefault((owner, repo), {})
+    if content is not None:
+        files[filepath] = content
+    else:
+        del files[filepath]
+    current.update(updated_at=_now())
+    return dict(commit=dict(sha=_head_sha(files)))
+
+
+def _check_sha(mock, owner, repo, filepath, body):
+    files = mock.state.files.get((owner, repo)) or {}
+    if filepath not in files:
+        raise ApiError(404, 'object does not exist [id: , rel_path: {}]'.format(filepath))
+    if _blob_sha(files[filepath]) != body.get('sha'):
+        raise ApiError(409, 'sha does not match [given: {}]'.format(body.get('sha')))
+
+
+@route('POST', '/repos/{owner}/{repo}/contents/{filepath}')
+def create_file(mock, query, body, owner, repo, filepath):
+    if filepath in (mock.state.files.get((owner, repo)) or {}):
+        raise ApiError(422, 'repository file already exists [path: {}]'.format(filepath))
+    return 201, _change_file(mock, owner, repo, filepath, body, base64.b64decode(body['content'])), {}
+
+
+@route('PUT', '/repos/{owner}/{repo}/contents/{filepath}')
+def update_file(mock, query, body, owner, repo, filepath):
+    _check_sha(mock, owner, repo, filepath, body)
+    return 200, _change_file(mock, owner, repo, filepath, body, base64.b64decode(body['content'])), {}
+
+
+@route('DELETE', '/repos/{owner}/{repo}/contents/{filepath}')
+def delete_file(mock, query, body, owner, repo, filepath):
+    _check_sha(mock, owner, repo, filepath, body)
+    return 200, _change_file(mock, owner, repo, filepath, body, None), {}
+
+
+# Branches and archives
+
+@route('GET', '/repos/{owner}/{repo}/branches')
+def list_branches(mock, query, body, owner, repo):
+    current = mock.state.repo(owner, repo)
+    branches = [] if current['empty'] else [get_branch(mock, query, body, owner, repo,
+                                                       current['default_branch'])[1]]
+    items, headers = mock._paginate(branches, query)
+    return 200, items, headers
+
+
+@route('GET', '/repos/{owner}/{repo}/branches/{branch}')
+def get_branch(mock, query, body, owner, repo, branch):
+    current = mock.state.repo(owner, repo)
+    if current['empty'] or branch != current['default_branch']:
+        raise ApiError(404, 'branch does not exist [name: {}]'.format(branch))
+    return 200, dict(name=branch, commit=dict(id=_head_sha(mock.state.files.get((owner, repo)) or {}))), {}
+
+
+@route('GET', '/repos/{owner}/{repo}/archive/{archive}')
+def get_archive(mock, query, body, owner, repo, archive):
+    current = mock.state.repo(owner, repo)
+    files = mock.state.files.get((owner, repo)) or {}
+    if current['empty']:
+        raise ApiError(404, 'repository is empty')
+    # A deterministic body per commit, large enough to be read in chunks
+    seed = ('{}/{}:{}:{}'.format(owner, repo, archive, _head_sha(files))).encode()
+    data = b''.join(hashlib.sha256(seed + b'%d' % i).digest() for i in range(4096))
+    headers = {'Accept-Ranges': 'bytes'}
+    match = re.match(r'bytes=(\d+)-$', query.get('range', [''])[0])
+    if match:
+        start = int(match.group(1))
+        if start >= len(data):
+            raise ApiError(416, 'range not satisfiable')
+        headers['Content-Range'] = 'bytes {}-{}/{}'.format(start, len(data) - 1, len(data))
+        return 206, data[start:], headers
+    return 200, data, headers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3000)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every request')
+    parser.add_argument('--jitter', type=float, default=0.0, help='up to this many more seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered 503')
+    parser.add_argument('--capacity', type=int, default=0,
+                        help='requests handled at once before answering 503, 0 for no limit')
+    args = parser.parse_args()
+
+    mock = MockGitea(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                     error_rate=args.error_rate, capacity=args.capacity)
+    print('Serving mock gitea API at {}'.format(mock.url))
+    try:
+        mock._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,493 @@
+#!/usr/bin/python
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = '''
+---
+module: gitea_backup
+short_description: Backs up Gitea repositories as archives over the API.
+version_added: "2.5"
+description:
+    - Downloads an archive of every repository of the given organizations,
+      or of every repository visible to the login user, into dest, one file
+      per repository at dest/OWNER/NAME.FORMAT.
+    - Archives are downloaded concurrently and streamed to disk in
+      chunk_size reads, so memory use does not grow with repository size.
+      An interrupted download is resumed with a Range request on the next
+      attempt or run.
+    - A manifest (dest/manifest.json) records the HEAD commit, size and
+      SHA-256 of each archive, and a SHA256SUMS file allows checking them
+      with sha256sum -c. Repositories whose HEAD commit is unchanged since
+      the last run are skipped, and those whose updated_at is unchanged are
+      not even asked for their HEAD, so a run costs in proportion to what
+      changed.
+    - Empty repositories have no archive and are skipped.
+    - The archives of repositories no longer listed, such as deleted ones,
+      are kept along with their manifest entries unless prune is set.
+    - Supports check mode, reporting which repositories would be downloaded.
+
+options:
+    dest:
+        description:
+            - Directory to write the archives and manifest to. It is created
+              if it does not exist.
+        required: true
+        type: path
+    orgs:
+        description:
+            - Organizations whose repositories are backed up. All
+              repositories visible to the login user are backed up when not
+              given.
+        required: false
+        type: list
+        elements: str
+    format:
+        description:
+            - Archive format. A bundle holds the full history of the
+              repository and can be cloned from; tar.gz and zip only hold
+              the files of the HEAD commit.
+            - bundle needs Gitea 1.17 or later.
+        required: false
+        default: bundle
+        choices: [bundle, tar.gz, zip]
+        type: str
+    concurrency:
+        description:
+            - Maximum number of archives downloaded at once
+            - With adaptive_concurrency, the upper bound of the number of
+              requests in flight, which adapts to the server below it
+        required: false
+        default: 4
+        type: int
+    chunk_size:
+        description:
+            - Size in bytes of the reads the archives are streamed in
+        required: false
+        default: 1048576
+        type: int
+    prune:
+        description:
+            - Delete the archives and manifest entries of the repositories
+              of the orgs, or of any owner when orgs is not given, which are
+              no longer listed
+        required: false
+        default: false
+        type: bool
+    login_user:
+        description:
+            - The gitea user name to read the repositories as
+            - Required if using basic auth
+        required: false
+    login_password:
+        description:
+            - Password of the login_user.
+            - Required if using basic auth
+        required: false
+        no_log: true
+    api_token:
+         description:
+             - If using token-based auth, the token to use
+             - Not required if using basic auth
+         required: false
+         no_log: true
+    gitea_url:
+         description:
+             - Base Url to the gitea API server
+         required: true
+    validate_certs:
+         description:
+             - Whether to validate the TLS certificate of the gitea API server
+         required: false
+         default: true
+         type: bool
+    timeout:
+         description:
+             - Timeout in seconds for each request to the gitea API server
+         required: false
+         default: 30
+         type: int
+    retries:
+         description:
+             - Number of times a request is retried after a connection error
+               or a 429, 502, 503 or 504 response, with exponential backoff.
+               A retried download resumes where it stopped.
+         required: false
+         default: 5
+         type: int
+    cache_dir:
+         description:
+             - Directory of an on-disk cache of GET responses. Cached responses
+               are revalidated with If-None-Match/If-Modified-Since and reused
+               when the server answers 304 Not Modified. Archives are never
+               cached.
+             - The cache is disabled when not set
+         required: false
+         type: path
+    cache_max_entries:
+         description:
+             - Maximum number of entries kept in cache_dir, least recently used
+               entries being evicted first
+         required: false
+         default: 1024
+         type: int
+    instrument:
+         description:
+             - Return the timings of every API call made, and counters
+               aggregated over them, in the timings result
+         required: false
+         default: false
+         type: bool
+    trace_file:
+         description:
+             - Append one JSON line per API call made to this file, to profile
+               API use across a whole run
+         required: false
+         type: path
+    prometheus_textfile:
+         description:
+             - Accumulate request counters and durations into this file, in the
+               format of the Prometheus node exporter textfile collector
+         required: false
+         type: path
+    adaptive_concurrency:
+         description:
+             - Adapt the number of requests in flight to what the server
+               sustains, up to concurrency, growing it while responses come
+               back quickly and shrinking it on 429, 502, 503 or 504
+               responses, connection errors, rate-limit headers or rising
+               latency. When false, concurrency requests are always sent at
+               once.
+         required: false
+         default: true
+         type: bool
+    write_rate:
+         description:
+             - Maximum average number of requests changing state (POST, PUT,
+               PATCH, DELETE) sent per second, with bursts of up to as many.
+               Unlimited when 0.
+         required: false
+         default: 0
+         type: float
+
+author:
+    - Cray-HPE CMS team
+'''
+
+EXAMPLES = '''
+# Back up the product repositories before an upgrade
+- name: Back up VCS content
+  gitea_backup:
+    dest: /root/vcs-backup
+    orgs: [cray]
+    login_user: crayvcs
+    login_password: "{{ vcs_password }}"
+    gitea_url: https://api-gw-service-nmn.local/vcs/api/v1
+'''
+
+RETURN = '''
+msg:
+  description: Success or failure message
+  returned: always
+  type: str
+  sample: "120 repositories, 3 downloaded, 117 unchanged, 0 empty, 0 failed."
+repos:
+  description: Per-repository results, with the status downloaded, unchanged, empty or failed
+  returned: always
+  type: list
+  elements: dict
+  sample:
+    - name: cray/csm-config-management
+      status: downloaded
+      sha: 5f2b0f7c3a9d4ef1a0f8e3b6c1d2a4b5c6d7e8f9
+      file: cray/csm-config-management.bundle
+      size: 10485760
+      resumed: false
+      msg: ""
+bytes_downloaded:
+  description: Total size of the archives downloaded during this run
+  returned: always
+  type: int
+pruned:
+  description: Repositories whose archive and manifest entry were deleted, with prune
+  returned: always
+  type: list
+  elements: str
+  sample: ["cray/retired-repo"]
+manifest:
+  description: Path of the manifest written
+  returned: always
+  type: str
+timings:
+  description:
+    - Per-call timings and aggregated counters of the API calls made, as
+      returned by the other gitea modules
+  returned: when instrument is true
+  type: dict
+'''
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.gitea_client import (
+    GITEA_MUTUALLY_EXCLUSIVE, GITEA_REQUIRED_ONE_OF, GITEA_REQUIRED_TOGETHER, GiteaError,
+    gitea_argument_spec, gitea_client, report_timings,
+)
+
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+MANIFEST = 'manifest.json'
+CHECKSUMS = 'SHA256SUMS'
+
+
+def load_manifest(dest):
+    """ The repository entries of the manifest in dest, if any """
+    try:
+        with open(os.path.join(dest, MANIFEST)) as f:
+            return json.load(f).get('repos', {})
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def _write_atomic(path, text):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def save_manifest(dest, repos):
+    """ Write the manifest and SHA256SUMS of the archives in dest """
+    _write_atomic(os.path.join(dest, MANIFEST),
+                  json.dumps(dict(version=1, repos=repos), indent=2, sort_keys=True) + '\n')
+    _write_atomic(os.path.join(dest, CHECKSUMS),
+                  ''.join('{}  {}\n'.format(entry['sha256'], entry['file'])
+                          for (_, entry) in sorted(repos.items())))
+
+
+def list_repos(client, orgs):
+    """ The repositories of the orgs, or all repositories visible if None """
+    if orgs is None:
+        return list(client.paginate('/repos/search', prefetch=4))
+    repos = []
+    for org in orgs:
+        repos.extend(client.paginate('/orgs/{org}/repos', prefetch=4, org=org))
+    return repos
+
+
+class Backup(object):
+    """ Downloads the archives of repositories which changed since the manifest """
+
+    def __init__(self, client, dest, fmt, chunk_size, check_mode):
+        self.client = client
+        self.dest = dest
+        self.format = fmt
+        self.chunk_size = chunk_size
+        self.check_mode = check_mode
+        self.manifest = load_manifest(dest)
+        self.lock = threading.Lock()
+
+    def _unchanged(self, entry, sha):
+        return (entry is not None and entry['sha'] == sha and entry['format'] == self.format and
+                os.path.exists(os.path.join(self.dest, entry['file'])) and
+                os.path.getsize(os.path.join(self.dest, entry['file'])) == entry['size'])
+
+    def _head(self, repo):
+        """ The HEAD commit id of a repository, or None if it is empty """
+        if repo.get('empty'):
+            return None
+        resp = self.client.get('/repos/{owner}/{repo}/branches/{branch}', cache=False,
+                               owner=repo['owner']['login'], repo=repo['name'],
+                               branch=repo['default_branch'])
+        if resp.status == 404:
+            return None
+        return resp.raise_for_status().json()['commit']['id']
+
+    def backup(self, repo):
+        """ Back up one repository, returning its result dict """
+        name = repo['full_name']
+        result = dict(name=name, status='unchanged', sha=None, file=None, size=0, resumed=False,
+                      msg='')
+        entry = self.manifest.get(name)
+        try:
+            # An unchanged updated_at means no push happened since the last run
+            if entry is not None and entry.get('updated_at') == repo.get('updated_at') and \
+                    self._unchanged(entry, entry['sha']):
+                result.update(sha=entry['sha'], file=entry['file'], size=entry['size'])
+                return result
+            sha = self._head(repo)
+            if sha is None:
+                result['status'] = 'empty'
+                return result
+            if self._unchanged(entry, sha):
+                result.update(sha=sha, file=entry['file'], size=entry['size'])
+                self._store(name, dict(entry, updated_at=repo.get('updated_at')))
+                return result
+            result.update(status='downloaded', sha=sha,
+                          file='{}/{}.{}'.format(repo['owner']['login'], repo['name'], self.format))
+            if self.check_mode:
+                return result
+            self._download(repo, result)
+            if result['status'] == 'downloaded':
+                self._store(name, dict(sha=sha, format=self.format, file=result['file'],
+                                       size=result['size'], sha256=result.pop('sha256'),
+                                       updated_at=repo.get('updated_at')))
+        except (GiteaError, IOError, OSError) as e:
+            result.update(status='failed', msg="Backing up {} failed: {}".format(name, e))
+        return result
+
+    def prune(self, repos, orgs):
+        """
+        Delete the archives and entries of the repositories of orgs, or of
+        any owner if None, which are not in repos, returning their names
+        """
+        listed = set(repo['full_name'].lower() for repo in repos)
+        owners = None if orgs is None else set(org.lower() for org in orgs)
+        pruned = []
+        for name, entry in sorted(self.manifest.items()):
+            if name.lower() in listed or (owners is not None and name.split('/')[0].lower() not in owners):
+                continue
+            pruned.append(name)
+            if self.check_mode:
+                continue
+            path = os.path.join(self.dest, entry['file'])
+            for stale in [path] + glob.glob(glob.escape(path) + '.*.part'):
+                if os.path.exists(stale):
+                    os.unlink(stale)
+            del self.manifest[name]
+        return pruned
+
+    def _download(self, repo, result):
+        path = os.path.join(self.dest, result['file'])
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Parts are named after the commit so only a part of the same archive
+        # is ever resumed; parts of older commits are stale.
+        part = '{}.{}.part'.format(path, result['sha'][:12])
+        for stale in glob.glob(glob.escape(path) + '.*.part'):
+            if stale != part:
+                os.unlink(stale)
+        result['resumed'] = os.path.exists(part)
+        resp = self.client.download('/repos/{owner}/{repo}/archive/{archive}', path, part=part,
+                                    chunk_size=self.chunk_size, hasher=hashlib.sha256,
+                                    owner=repo['owner']['login'], repo=repo['name'],
+                                    archive='{}.{}'.format(result['sha'], self.format))
+        if not resp.ok:
+            result.update(status='failed', msg=resp.message)
+            return
+        result.update(size=resp.size, sha256=resp.digest)
+
+    def _store(self, name, entry):
+        with self.lock:
+            self.manifest[name] = entry
+
+
+def run_module():
+    # define available arguments/parameters a user can pass to the module
+    module_args = dict(
+        dest=dict(type='path', required=True),
+        orgs=dict(type='list', elements='str', required=False),
+        format=dict(type='str', required=False, default='bundle', choices=['bundle', 'tar.gz', 'zip']),
+        concurrency=dict(type='int', required=False, default=4),
+        chunk_size=dict(type='int', required=False, default=1024 * 1024),
+        prune=dict(type='bool', required=False, default=False),
+    )
+    module_args.update(gitea_argument_spec(index=False))
+
+    # the AnsibleModule object will be our abstraction working with Ansible
+    # this includes instantiation, a couple of common attr would be the
+    # args/params passed to the execution, as well as if the module
+    # supports check mode
+    module = AnsibleModule(
+        argument_spec=module_args,
+        mutually_exclusive=GITEA_MUTUALLY_EXCLUSIVE,
+        required_together=GITEA_REQUIRED_TOGETHER,
+        required_one_of=GITEA_REQUIRED_ONE_OF,
+        supports_check_mode=True,
+    )
+
+    dest = module.params['dest']
+    if not module.check_mode and not os.path.isdir(dest):
+        os.makedirs(dest)
+    concurrency = max(1, module.params['concurrency'])
+    result = dict(changed=False, msg='', repos=[], bytes_downloaded=0, pruned=[],
+                  manifest=os.path.join(dest, MANIFEST))
+    with gitea_client(module, pool_size=concurrency) as client:
+        try:
+            repos = list_repos(client, module.params['orgs'])
+        except GiteaError as e:
+            result.update(msg="Unable to list the repositories.", error=str(e))
+            module.fail_json(**report_timings(module, client, result))
+        backup = Backup(client, dest, module.params['format'], max(1, module.params['chunk_size']),
+                        module.check_mode)
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                results = list(executor.map(backup.backup, repos))
+            if module.params['prune']:
+                try:
+                    result['pruned'] = backup.prune(repos, module.params['orgs'])
+                except (IOError, OSError) as e:
+                    result.update(msg="Unable to prune the archives of unlisted repositories.",
+                                  error=str(e))
+                    module.fail_json(**report_timings(module, client, result))
+        finally:
+            # Keep what was downloaded even if the run is interrupted
+            if not module.check_mode:
+                save_manifest(dest, backup.manifest)
+
+    counts = dict((status, len([r for r in results if r['status'] == status]))
+                  for status in ('downloaded', 'unchanged', 'empty', 'failed'))
+    result.update(
+        changed=counts['downloaded'] > 0 or bool(result['pruned']),
+        repos=results,
+        bytes_downloaded=sum(r['size'] for r in results if r['status'] == 'downloaded'),
+        msg="{} repositories, {downloaded} downloaded, {unchanged} unchanged, {empty} empty, "
+            "{failed} failed.".format(len(results), **counts),
+    )
+    failed = [r['name'] for r in results if r['status'] == 'failed']
+    if failed:
+        result['msg'] += " Failed: {}.".format(', '.join(failed))
+    report_timings(module, client, result)
+    if failed:
+        module.fail_json(**result)
+    module.exit_json(**result)
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
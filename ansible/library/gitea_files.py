@@ -0,0 +1,442 @@
+#!/usr/bin/python
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+
+DOCUMENTATION = '''
+---
+module: gitea_files
+short_description: Commits files to Gitea repositories through the API.
+version_added: "2.5"
+description:
+    - Creates, updates and deletes files in Gitea repositories without a
+      local clone, with one commit and one API call per changed file.
+    - The git blob SHA of each desired file is compared with the repository
+      tree, so files which are already up to date are not sent, and no
+      commit is made when nothing differs.
+    - Repositories are processed concurrently, the files of each in turn.
+    - Repositories must have a first commit, as made by auto_init, since
+      the contents API of Gitea 1.17 cannot commit to an empty repository.
+    - Supports check mode.
+
+options:
+    repos:
+        description:
+            - List of repositories to commit files to
+            - Each item accepts owner and name (required), branch, message,
+              src and files. Options not given for an item default to the
+              top-level value.
+            - src is a local directory whose files are committed at the same
+              relative paths.
+            - files is a list of dicts with path (required), and either
+              content or src (a local file). state absent deletes the path.
+              files override those found under src.
+        required: true
+        type: list
+        elements: dict
+    branch:
+        description:
+            - Branch to commit to. Defaults to the default branch of each repository.
+        required: false
+    message:
+        description:
+            - Commit message
+        required: false
+        default: Update files
+    src:
+        description:
+            - Local directory whose files are committed at the same relative
+              paths, for the repositories which do not give their own
+        required: false
+        type: path
+    author_name:
+        description:
+            - Name of the commit author, defaults to the login user
+        required: false
+    author_email:
+        description:
+            - Email of the commit author, defaults to that of the login user
+        required: false
+    concurrency:
+        description:
+            - Maximum number of repositories processed at once
+            - With adaptive_concurrency, the upper bound of the number of
+              requests in flight, which adapts to the server below it
+        required: false
+        default: 16
+        type: int
+    login_user:
+        description:
+            - Username of the user doing the operation
+            - Required if using basic auth
+        required: false
+    login_password:
+        description:
+            - Password of the login_user.
+            - Required if using basic auth
+        required: false
+        no_log: true
+    api_token:
+         description:
+             - If using token-based auth, the token to use
+             - Not required if using basic auth
+         required: false
+         no_log: true
+    gitea_url:
+         description:
+             - Base Url to the gitea API server
+         required: true
+    validate_certs:
+         description:
+             - Whether to validate the TLS certificate of the gitea API server
+         required: false
+         default: true
+         type: bool
+    timeout:
+         description:
+             - Timeout in seconds for each request to the gitea API server
+         required: false
+         default: 30
+         type: int
+    retries:
+         description:
+             - Number of times a request is retried after a connection error
+               or a 429, 502, 503 or 504 response, with exponential backoff
+         required: false
+         default: 5
+         type: int
+    instrument:
+         description:
+             - Return the timings of every API call made, and counters
+               aggregated over them, in the timings result
+         required: false
+         default: false
+         type: bool
+    trace_file:
+         description:
+             - Append one JSON line per API call made to this file, to profile
+               API use across a whole run
+         required: false
+         type: path
+    prometheus_textfile:
+         description:
+             - Accumulate request counters and durations into this file, in the
+               format of the Prometheus node exporter textfile collector
+         required: false
+         type: path
+    adaptive_concurrency:
+         description:
+             - Adapt the number of requests in flight to what the server
+               sustains, up to concurrency, growing it while responses come
+               back quickly and shrinking it on 429, 502, 503 or 504
+               responses, connection errors, rate-limit headers or rising
+               latency. When false, concurrency requests are always sent at
+               once.
+         required: false
+         default: true
+         type: bool
+    write_rate:
+         description:
+             - Maximum average number of requests changing state (POST, PUT,
+               PATCH, DELETE) sent per second, with bursts of up to as many.
+               Unlimited when 0.
+         required: false
+         default: 0
+         type: float
+
+author:
+    - Cray-HPE CMS team
+'''
+
+EXAMPLES = '''
+# Seed configuration content into many repos
+- name: Seed repo content
+  gitea_files:
+    repos:
+      - owner: my_org
+        name: my_repo
+        src: /opt/seed/my_repo
+      - owner: my_org
+        name: my_other_repo
+        files:
+          - path: README.md
+            content: "# My other repo\\n"
+          - path: config/site.yml
+            src: /opt/seed/site.yml
+          - path: obsolete.txt
+            state: absent
+    message: Seed configuration
+    api_token: d507e44cdbfe1c48b80000afc12256ce601f3648
+    gitea_url: https://my-gitea.example.com/api/v1
+'''
+
+RETURN = '''
+msg:
+  description: Success or failure message
+  returned: always
+  type: str
+  sample: "2 repositories, 1 changed, 0 failed."
+results:
+  description: Per-repository results, in the order given
+  returned: always
+  type: list
+  elements: dict
+  sample:
+    - owner: my_org
+      name: my_repo
+      branch: main
+      changed: true
+      failed: false
+      created: ["README.md"]
+      updated: []
+      deleted: []
+      unchanged: 12
+      commit: 2f1c3e0b5a3c9f3f2d6c2f1b0a9e8d7c6b5a4f3e
+timings:
+  description:
+    - Per-call timings and aggregated counters of the API calls made. Durations
+      include retries; connect_ms is the part spent in DNS, TCP and TLS setup,
+      backoff_ms that spent waiting between retries.
+  returned: when instrument is true
+  type: dict
+  sample:
+    calls:
+      - ts: 1760000000.123456
+        method: POST
+        path: /orgs/{org}/repos
+        status: 201
+        duration_ms: 38.214
+        connect_ms: 1.532
+        backoff_ms: 0.0
+        attempts: 1
+        bytes_sent: 52
+        bytes_received: 1604
+        cached: false
+    counters:
+      requests: 1
+      attempts: 1
+      retries: 0
+      errors: 0
+      cached: 0
+      bytes_sent: 52
+      bytes_received: 1604
+      duration_ms: 38.214
+      connect_ms: 1.532
+      backoff_ms: 0.0
+      by_status: {"201": 1}
+      by_endpoint: {"POST /orgs/{org}/repos": {"count": 1, "duration_ms": 38.214, "max_ms": 38.214}}
+'''
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.gitea_client import (
+    GITEA_MUTUALLY_EXCLUSIVE, GITEA_REQUIRED_ONE_OF, GITEA_REQUIRED_TOGETHER, GiteaError,
+    gitea_argument_spec, gitea_client, report_timings,
+)
+
+import hashlib
+import os
+from base64 import b64encode
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_OPTIONS = ('branch', 'message', 'src')
+
+
+def git_blob_sha(content):
+    """ The SHA-1 git gives a blob with this content """
+    digest = hashlib.sha1()
+    digest.update('blob {}\0'.format(len(content)).encode('ascii'))
+    digest.update(content)
+    return digest.hexdigest()
+
+
+def _desired_files(params):
+    """ Map each path to the bytes it should contain, or None to delete it """
+    files = {}
+    if params['src']:
+        root = os.path.expanduser(params['src'])
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if d != '.git']
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                with open(path, 'rb') as f:
+                    files[os.path.relpath(path, root).replace(os.sep, '/')] = f.read()
+    for spec in params['files'] or []:
+        if spec['state'] == 'absent':
+            files[spec['path']] = None
+        elif spec['src'] is not None:
+            with open(os.path.expanduser(spec['src']), 'rb') as f:
+                files[spec['path']] = f.read()
+        else:
+            files[spec['path']] = (spec['content'] or '').encode('utf-8')
+    return files
+
+
+def _current_blobs(client, owner, name, branch):
+    """ Map each file path in the branch to its blob SHA """
+    blobs = {}
+    page = 1
+    while True:
+        resp = client.get('/repos/{owner}/{repo}/git/trees/{ref}', owner=owner, repo=name, ref=branch,
+                          query=dict(recursive='true', page=page, per_page=1000))
+        # An empty repository has no tree yet
+        if resp.status in (404, 409) and page == 1:
+            return blobs
+        tree = resp.raise_for_status().json()
+        for entry in tree.get('tree') or []:
+            if entry['type'] == 'blob':
+                blobs[entry['path']] = entry['sha']
+        if not tree.get('truncated'):
+            return blobs
+        page += 1
+
+
+def _commit_files(client, params, author, check_mode):
+    """ Commit the files of one repository which differ, returning its result """
+    owner, name = params['owner'], params['name']
+    result = dict(owner=owner, name=name, branch=params['branch'], changed=False, failed=False,
+                  created=[], updated=[], deleted=[], unchanged=0, commit=None, msg='', error='')
+    try:
+        desired = _desired_files(params)
+        if not result['branch']:
+            repo = client.get('/repos/{owner}/{repo}', owner=owner, repo=name).raise_for_status().json()
+            result['branch'] = repo['default_branch']
+        current = _current_blobs(client, owner, name, result['branch'])
+
+        changes = []
+        for path in sorted(desired):
+            content = desired[path]
+            sha = current.get(path)
+            if content is None:
+                if sha is not None:
+                    result['deleted'].append(path)
+                    changes.append(('DELETE', path, dict(sha=sha)))
+            elif sha is None:
+                result['created'].append(path)
+                changes.append(('POST', path, dict(content=b64encode(content).decode('ascii'))))
+            elif sha != git_blob_sha(content):
+                result['updated'].append(path)
+                changes.append(('PUT', path, dict(sha=sha, content=b64encode(content).decode('ascii'))))
+            else:
+                result['unchanged'] += 1
+
+        if not changes:
+            result['msg'] = "Repository {}/{} is up to date.".format(owner, name)
+            return result
+        result['changed'] = True
+        if check_mode:
+            result['msg'] = "{} files of repository {}/{} would be changed.".format(len(changes), owner, name)
+            return result
+
+        # Each call commits one file on top of the last, so those of a
+        # repository are made in turn
+        for (method, path, data) in changes:
+            data.update(branch=result['branch'], message=params['message'])
+            if author:
+                data['author'] = author
+            commit = client.request(method, '/repos/{owner}/{repo}/contents/{filepath}', data=data,
+                                    owner=owner, repo=name, filepath=path).raise_for_status().json()
+            result['commit'] = (commit.get('commit') or {}).get('sha')
+        result['msg'] = "{} files of repository {}/{} were changed.".format(len(changes), owner, name)
+    except (GiteaError, IOError, OSError) as e:
+        result.update(changed=False, failed=True, error=str(e),
+                      msg="Committing files to repository {}/{} failed.".format(owner, name))
+    return result
+
+
+def run_module():
+    # define available arguments/parameters a user can pass to the module
+    module_args = dict(
+        repos=dict(type='list', elements='dict', required=True, options=dict(
+            owner=dict(type='str', required=True),
+            name=dict(type='str', required=True),
+            branch=dict(type='str', required=False),
+            message=dict(type='str', required=False),
+            src=dict(type='path', required=False),
+            files=dict(type='list', elements='dict', required=False, options=dict(
+                path=dict(type='str', required=True),
+                content=dict(type='str', required=False),
+                src=dict(type='path', required=False),
+                state=dict(type='str', default="present", choices=["absent", "present"]),
+            ), mutually_exclusive=[['content', 'src']]),
+        )),
+        branch=dict(type='str', required=False),
+        message=dict(type='str', required=False, default='Update files'),
+        src=dict(type='path', required=False),
+        author_name=dict(type='str', required=False),
+        author_email=dict(type='str', required=False),
+        concurrency=dict(type='int', required=False, default=16),
+    )
+    module_args.update(gitea_argument_spec(cache=False, index=False))
+
+    # the AnsibleModule object will be our abstraction working with Ansible
+    # this includes instantiation, a couple of common attr would be the
+    # args/params passed to the execution, as well as if the module
+    # supports check mode
+    module = AnsibleModule(
+        argument_spec=module_args,
+        mutually_exclusive=GITEA_MUTUALLY_EXCLUSIVE,
+        required_together=GITEA_REQUIRED_TOGETHER,
+        required_one_of=GITEA_REQUIRED_ONE_OF,
+        supports_check_mode=True,
+    )
+
+    # Options not given for an item default to the top-level value
+    items = []
+    for item in module.params['repos']:
+        params = dict(item)
+        for k in REPO_OPTIONS:
+            if params.get(k) is None:
+                params[k] = module.params[k]
+        items.append(params)
+
+    author = dict((k, module.params['author_' + k]) for k in ('name', 'email')
+                  if module.params['author_' + k])
+
+    concurrency = max(1, min(module.params['concurrency'], len(items) or 1))
+    with gitea_client(module, pool_size=concurrency) as client:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(
+                lambda p: _commit_files(client, p, author, module.check_mode), items))
+
+    failed = [r for r in results if r['failed']]
+    changed = [r for r in results if r['changed']]
+    result = dict(
+        changed=bool(changed),
+        results=results,
+        msg="{} repositories, {} changed, {} failed.".format(len(results), len(changed), len(failed)),
+    )
+    report_timings(module, client, result)
+    if failed:
+        module.fail_json(**result)
+    module.exit_json(**result)
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,539 @@
+#!/usr/bin/python
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+
+DOCUMENTATION = '''
+---
+module: gitea_import
+short_description: Imports directory trees or tarballs into Gitea repositories with git fast-import.
+version_added: "2.5"
+description:
+    - Replaces the content of a branch of existing Gitea repositories with
+      that of a local directory or tarball, as one commit per repository,
+      for seeding large trees.
+    - The files are streamed into C(git fast-import) in a scratch bare
+      repository, without a checkout and without a git process per file,
+      and the commit is pushed over HTTP as one packfile. Scratch disk use
+      is about the compressed size of the content, and is freed after each
+      repository.
+    - When the branch exists, only its last commit is fetched, as the
+      parent of the new one, and no commit is pushed if the tree is
+      unchanged.
+    - Repositories are processed concurrently.
+    - Requires git 2.31 or later on the host running the module.
+    - Supports check mode, in which the commit is built but not pushed.
+
+options:
+    repos:
+        description:
+            - List of repositories to import into
+            - Each item accepts owner and name (required), branch, message,
+              src and strip_components. Options not given for an item
+              default to the top-level value.
+        required: true
+        type: list
+        elements: dict
+    src:
+        description:
+            - Local directory, or tar archive (optionally compressed), whose
+              files make up the imported tree. .git directories are skipped.
+        required: false
+        type: path
+    strip_components:
+        description:
+            - Number of leading path components removed from the names of
+              the files of a tar archive src
+        required: false
+        default: 0
+        type: int
+    branch:
+        description:
+            - Branch to commit to. Defaults to the default branch of each repository.
+        required: false
+    message:
+        description:
+            - Commit message
+        required: false
+        default: Import content
+    author_name:
+        description:
+            - Name of the commit author, defaults to the login user
+        required: false
+    author_email:
+        description:
+            - Email of the commit author, defaults to a noreply address of the author
+        required: false
+    git_url:
+        description:
+            - Base URL of the git HTTP service the repositories are pushed
+              to, as OWNER/NAME.git under it. Defaults to gitea_url without
+              the trailing /api/v1.
+        required: false
+    scratch_dir:
+        description:
+            - Directory the scratch repositories are created in, defaults to
+              the system temporary directory
+        required: false
+        type: path
+    concurrency:
+        description:
+            - Maximum number of repositories processed at once
+            - With adaptive_concurrency, the upper bound of the number of
+              requests in flight, which adapts to the server below it
+        required: false
+        default: 4
+        type: int
+    login_user:
+        description:
+            - Username of the user doing the operation
+            - Required if using basic auth
+        required: false
+    login_password:
+        description:
+            - Password of the login_user.
+            - Required if using basic auth
+        required: false
+        no_log: true
+    api_token:
+         description:
+             - If using token-based auth, the token to use
+             - Not required if using basic auth
+         required: false
+         no_log: true
+    gitea_url:
+         description:
+             - Base Url to the gitea API server
+         required: true
+    validate_certs:
+         description:
+             - Whether to validate the TLS certificate of the gitea API server
+         required: false
+         default: true
+         type: bool
+    timeout:
+         description:
+             - Timeout in seconds for each request to the gitea API server
+         required: false
+         default: 30
+         type: int
+    retries:
+         description:
+             - Number of times a request is retried after a connection error
+               or a 429, 502, 503 or 504 response, with exponential backoff
+         required: false
+         default: 5
+         type: int
+    instrument:
+         description:
+             - Return the timings of every API call made, and counters
+               aggregated over them, in the timings result
+         required: false
+         default: false
+         type: bool
+    trace_file:
+         description:
+             - Append one JSON line per API call made to this file, to profile
+               API use across a whole run
+         required: false
+         type: path
+    prometheus_textfile:
+         description:
+             - Accumulate request counters and durations into this file, in the
+               format of the Prometheus node exporter textfile collector
+         required: false
+         type: path
+    adaptive_concurrency:
+         description:
+             - Adapt the number of requests in flight to what the server
+               sustains, up to concurrency, growing it while responses come
+               back quickly and shrinking it on 429, 502, 503 or 504
+               responses, connection errors, rate-limit headers or rising
+               latency. When false, concurrency requests are always sent at
+               once.
+         required: false
+         default: true
+         type: bool
+    write_rate:
+         description:
+             - Maximum average number of requests changing state (POST, PUT,
+               PATCH, DELETE) sent per second, with bursts of up to as many.
+               Unlimited when 0.
+         required: false
+         default: 0
+         type: float
+
+author:
+    - Cray-HPE CMS team
+'''
+
+EXAMPLES = '''
+# Seed large content into repos created with gitea_repo
+- name: Import product catalogs
+  gitea_import:
+    repos:
+      - owner: my_org
+        name: catalog
+        src: /opt/seed/catalog
+      - owner: my_org
+        name: recipes
+        src: /opt/seed/recipes.tar.gz
+        strip_components: 1
+    message: Import product content
+    login_user: crayvcs
+    login_password: "{{ vcs_password }}"
+    gitea_url: https://my-gitea.example.com/api/v1
+'''
+
+RETURN = '''
+msg:
+  description: Success or failure message
+  returned: always
+  type: str
+  sample: "2 repositories, 2 changed, 0 failed."
+results:
+  description: Per-repository results, in the order given
+  returned: always
+  type: list
+  elements: dict
+  sample:
+    - owner: my_org
+      name: catalog
+      branch: main
+      changed: true
+      failed: false
+      parent: null
+      commit: 2f1c3e0b5a3c9f3f2d6c2f1b0a9e8d7c6b5a4f3e
+      tree: 4b825dc642cb6eb9a060e54bf8d69288fbee4904
+      files: 24512
+      bytes: 183500800
+      pack_bytes: 52428800
+      seconds: 41.2
+timings:
+  description:
+    - Per-call timings and aggregated counters of the API calls made. Durations
+      include retries; connect_ms is the part spent in DNS, TCP and TLS setup,
+      backoff_ms that spent waiting between retries.
+  returned: when instrument is true
+  type: dict
+'''
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.gitea_client import (
+    GITEA_MUTUALLY_EXCLUSIVE, GITEA_REQUIRED_ONE_OF, GITEA_REQUIRED_TOGETHER, GiteaError,
+    auth_header, gitea_argument_spec, gitea_client, report_timings,
+)
+
+import os
+import shutil
+import stat
+import subprocess
+import tarfile
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_OPTIONS = ('branch', 'message', 'src', 'strip_components')
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class GitError(Exception):
+    """ A git command failed """
+
+
+def _quote(path):
+    """ A path as fast-import reads it, C-quoted when it would be ambiguous """
+    if path.startswith('"') or '\n' in path or ' ' in path or '\\' in path:
+        return '"{}"'.format(path.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+    return path
+
+
+def _tar_path(name, strip_components):
+    parts = [p for p in name.split('/') if p not in ('', '.')]
+    parts = parts[strip_components:]
+    if not parts or '.git' in parts or '..' in parts:
+        return None
+    return '/'.join(parts)
+
+
+def _entries(src, strip_components=0):
+    """
+    Generate the files of a directory or tar archive as (kind, path, mode,
+    data): a 'file' with its size and an open binary file as data, a
+    'link' with its target, or a 'copy' of the earlier file data names
+    (tar hard links). Archives are read as a stream, so each file must be
+    consumed before the next is generated.
+    """
+    src = os.path.expanduser(src)
+    if os.path.isdir(src):
+        for dirpath, dirnames, filenames in os.walk(src):
+            dirnames.sort()
+            links = [d for d in dirnames if os.path.islink(os.path.join(dirpath, d))]
+            dirnames[:] = [d for d in dirnames if d != '.git' and d not in links]
+            for filename in sorted(filenames + links):
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, src).replace(os.sep, '/')
+                st = os.lstat(path)
+                if stat.S_ISLNK(st.st_mode):
+                    yield 'link', name, '120000', os.fsencode(os.readlink(path))
+                elif stat.S_ISREG(st.st_mode):
+                    mode = '100755' if st.st_mode & stat.S_IXUSR else '100644'
+                    with open(path, 'rb') as f:
+                        yield 'file', name, mode, (os.fstat(f.fileno()).st_size, f)
+        return
+    with tarfile.open(src, 'r|*') as archive:
+        for member in archive:
+            name = _tar_path(member.name, strip_components)
+            if name is None:
+                continue
+            if member.issym():
+                yield 'link', name, '120000', member.linkname.encode('utf-8')
+            elif member.islnk():
+                target = _tar_path(member.linkname, strip_components)
+                if target is not None:
+                    yield 'copy', name, None, target
+            elif member.isreg():
+                mode = '100755' if member.mode & stat.S_IXUSR else '100644'
+                yield 'file', name, mode, (member.size, archive.extractfile(member))
+
+
+class Importer(object):
+    """ Imports src into one repository through a scratch bare repository """
+
+    def __init__(self, client, git_url, env, author, scratch_dir, check_mode):
+        self.client = client
+        self.git_url = git_url
+        self.env = env
+        self.author = author
+        self.scratch_dir = scratch_dir
+        self.check_mode = check_mode
+
+    def _git(self, git_dir, *args):
+        proc = subprocess.run(('git', '--git-dir', git_dir) + args, env=self.env,
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if proc.returncode != 0:
+            raise GitError('git {} failed: {}'.format(
+                args[0], proc.stderr.decode('utf-8', 'replace').strip()))
+        return proc.stdout.decode('utf-8').strip()
+
+    def _fast_import(self, git_dir, ref, parent, params, result):
+        """ Stream the files of src into a commit on ref with fast-import """
+        with tempfile.TemporaryFile() as errors:
+            proc = subprocess.Popen(('git', '--git-dir', git_dir, 'fast-import', '--quiet', '--done'),
+                                    env=self.env, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                    stderr=errors)
+            try:
+                out = proc.stdin
+                message = params['message'].encode('utf-8')
+                out.write('commit {}\ncommitter {} <{}> {} +0000\ndata {}\n'.format(
+                    ref, self.author[0], self.author[1], int(time.time()), len(message)).encode('utf-8'))
+                out.write(message + b'\n')
+                if parent:
+                    out.write('from {}\n'.format(parent).encode('ascii'))
+                out.write(b'deleteall\n')
+                for kind, path, mode, data in _entries(params['src'], params['strip_components']):
+                    if kind == 'copy':
+                        out.write('C {} {}\n'.format(_quote(data), _quote(path)).encode('utf-8'))
+                        continue
+                    out.write('M {} inline {}\n'.format(mode, _quote(path)).encode('utf-8'))
+                    if kind == 'link':
+                        out.write('data {}\n'.format(len(data)).encode('ascii') + data + b'\n')
+                    else:
+                        size, f = data
+                        out.write('data {}\n'.format(size).encode('ascii'))
+                        remaining = size
+                        while remaining:
+                            chunk = f.read(min(CHUNK_SIZE, remaining))
+                            if not chunk:
+                                raise GitError('{} changed size while being read'.format(path))
+                            out.write(chunk)
+                            remaining -= len(chunk)
+                        out.write(b'\n')
+                        result['bytes'] += size
+                    result['files'] += 1
+                out.write(b'done\n')
+                out.close()
+            except BrokenPipeError:
+                # fast-import stopped reading; its errors say why
+                pass
+            finally:
+                try:
+                    out.close()
+                except BrokenPipeError:
+                    pass
+                returncode = proc.wait()
+            if returncode != 0:
+                errors.seek(0)
+                raise GitError('git fast-import failed: {}'.format(
+                    errors.read().decode('utf-8', 'replace').strip()))
+
+    def run(self, params):
+        """ Import into one repository, returning its result """
+        owner, name = params['owner'], params['name']
+        result = dict(owner=owner, name=name, branch=params['branch'], changed=False, failed=False,
+                      parent=None, commit=None, tree=None, files=0, bytes=0, pack_bytes=0,
+                      seconds=0.0, msg='', error='')
+        start = time.monotonic()
+        git_dir = None
+        try:
+            if not params['src']:
+                raise GitError('src is required')
+            repo = self.client.get('/repos/{owner}/{repo}', owner=owner, repo=name).raise_for_status().json()
+            branch = result['branch'] = result['branch'] or repo['default_branch']
+            ref = 'refs/heads/{}'.format(branch)
+            url = '{}/{}/{}.git'.format(self.git_url, owner, name)
+
+            git_dir = tempfile.mkdtemp(prefix='gitea-import-', dir=self.scratch_dir)
+            self._git(git_dir, 'init', '--quiet', '--bare')
+            parent = None
+            if not repo.get('empty') and self._git(git_dir, 'ls-remote', url, ref):
+                # Only the last commit is needed, as the parent and for its tree
+                self._git(git_dir, 'fetch', '--quiet', '--depth=1', '--no-tags', url,
+                          '+{0}:refs/remotes/origin/{1}'.format(ref, branch))
+                parent = self._git(git_dir, 'rev-parse', 'refs/remotes/origin/{}'.format(branch))
+            result['parent'] = parent
+
+            self._fast_import(git_dir, ref, parent, params, result)
+            result['commit'] = self._git(git_dir, 'rev-parse', ref)
+            result['tree'] = self._git(git_dir, 'rev-parse', ref + '^{tree}')
+            result['pack_bytes'] = sum(os.path.getsize(os.path.join(dirpath, f))
+                                       for dirpath, _, files in os.walk(os.path.join(git_dir, 'objects'))
+                                       for f in files)
+            if parent and result['tree'] == self._git(git_dir, 'rev-parse', parent + '^{tree}'):
+                result['commit'] = parent
+                result['msg'] = "Repository {}/{} is up to date.".format(owner, name)
+                return result
+            result['changed'] = True
+            if self.check_mode:
+                result['msg'] = "Repository {}/{} would be imported.".format(owner, name)
+                return result
+            self._git(git_dir, 'push', '--quiet', url, '{0}:{0}'.format(ref))
+            result['msg'] = "{} files were imported into repository {}/{}.".format(result['files'], owner, name)
+        except (GiteaError, GitError, IOError, OSError, tarfile.TarError) as e:
+            result.update(changed=False, failed=True, error=str(e),
+                          msg="Importing into repository {}/{} failed.".format(owner, name))
+        finally:
+            if git_dir:
+                shutil.rmtree(git_dir, ignore_errors=True)
+            result['seconds'] = round(time.monotonic() - start, 3)
+        return result
+
+
+def git_env(params):
+    """
+    The environment of the git commands: credentials are passed as an
+    http.extraheader in GIT_CONFIG_* variables, so they are not visible on
+    command lines and are never written to disk
+    """
+    config = [('http.extraheader', 'Authorization: ' + auth_header(
+        params['api_token'], params['login_user'], params['login_password']))]
+    if not params['validate_certs']:
+        config.append(('http.sslVerify', 'false'))
+    env = dict(os.environ, GIT_TERMINAL_PROMPT='0', GIT_CONFIG_COUNT=str(len(config)))
+    for i, (key, value) in enumerate(config):
+        env['GIT_CONFIG_KEY_{}'.format(i)] = key
+        env['GIT_CONFIG_VALUE_{}'.format(i)] = value
+    return env
+
+
+def run_module():
+    # define available arguments/parameters a user can pass to the module
+    module_args = dict(
+        repos=dict(type='list', elements='dict', required=True, options=dict(
+            owner=dict(type='str', required=True),
+            name=dict(type='str', required=True),
+            branch=dict(type='str', required=False),
+            message=dict(type='str', required=False),
+            src=dict(type='path', required=False),
+            strip_components=dict(type='int', required=False),
+        )),
+        src=dict(type='path', required=False),
+        strip_components=dict(type='int', required=False, default=0),
+        branch=dict(type='str', required=False),
+        message=dict(type='str', required=False, default='Import content'),
+        author_name=dict(type='str', required=False),
+        author_email=dict(type='str', required=False),
+        git_url=dict(type='str', required=False),
+        scratch_dir=dict(type='path', required=False),
+        concurrency=dict(type='int', required=False, default=4),
+    )
+    module_args.update(gitea_argument_spec(cache=False, index=False))
+
+    # the AnsibleModule object will be our abstraction working with Ansible
+    # this includes instantiation, a couple of common attr would be the
+    # args/params passed to the execution, as well as if the module
+    # supports check mode
+    module = AnsibleModule(
+        argument_spec=module_args,
+        mutually_exclusive=GITEA_MUTUALLY_EXCLUSIVE,
+        required_together=GITEA_REQUIRED_TOGETHER,
+        required_one_of=GITEA_REQUIRED_ONE_OF,
+        supports_check_mode=True,
+    )
+    module.get_bin_path('git', required=True)
+
+    # Options not given for an item default to the top-level value
+    items = []
+    for item in module.params['repos']:
+        params = dict(item)
+        for k in REPO_OPTIONS:
+            if params.get(k) is None:
+                params[k] = module.params[k]
+        items.append(params)
+
+    author_name = module.params['author_name'] or module.params['login_user'] or 'gitea_import'
+    author = (author_name, module.params['author_email'] or '{}@noreply.localhost'.format(author_name))
+    git_url = module.params['git_url'] or module.params['gitea_url']
+    if not module.params['git_url'] and git_url.rstrip('/').endswith('/api/v1'):
+        git_url = git_url.rstrip('/')[:-len('/api/v1')]
+
+    concurrency = max(1, min(module.params['concurrency'], len(items) or 1))
+    with gitea_client(module, pool_size=concurrency) as client:
+        importer = Importer(client, git_url.rstrip('/'), git_env(module.params), author,
+                            module.params['scratch_dir'], module.check_mode)
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(importer.run, items))
+
+    failed = [r for r in results if r['failed']]
+    changed = [r for r in results if r['changed']]
+    result = dict(
+        changed=bool(changed),
+        results=results,
+        msg="{} repositories, {} changed, {} failed.".format(len(results), len(changed), len(failed)),
+    )
+    report_timings(module, client, result)
+    if failed:
+        module.fail_json(**result)
+    module.exit_json(**result)
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,7 @@
 #
 # MIT License
 #
-# (C) Copyright 2019, 2021-2022 Hewlett Packard Enterprise Development LP
+# (C) Copyright 2019, 2021-2022, 2026 Hewlett Packard Enterprise Development LP
 #
 # Permission is hereby granted, free of charge, to any person obtaining a
 # copy of this software and associated documentation files (the "Software"),
@@ -35,12 +35,58 @@ short_description: Creates, updates, deletes Organizations in Gitea.
 version_added: "2.5"
 description:
     - Creates, updates, and deletes Gitea organizations.
+    - An existing organization is only updated with the fields that differ
+      from the desired ones, and not at all when none differ.
+    - Optionally reconciles the teams of the organization and their members.
+      Existing teams and members are listed once per organization, and only
+      the create, update, PUT and DELETE calls needed are sent.
+    - Many organizations can be reconciled concurrently in a single task with
+      the orgs option.
+    - Supports check mode.
 
 options:
     username:
         description:
             - Name of the organization
-        required: true
+            - Required unless orgs is given
+        required: false
+    orgs:
+        description:
+            - List of organizations to reconcile in bulk instead of a single one
+            - Each item accepts username, website, description, full_name,
+              location, teams, purge_teams and state. Options not given for an
+              item default to the top-level value.
+            - Do not specify both username and orgs
+        required: false
+        type: list
+        elements: dict
+    teams:
+        description:
+            - Teams of the organization. Teams not listed are left alone
+              unless purge_teams is set.
+            - Each item accepts name (required), description, permission
+              (read, write or admin), units, includes_all_repositories,
+              can_create_org_repo, members and state (present or absent).
+              Fields not given are not changed on an existing team.
+            - When members is given, team members not listed are removed.
+        required: false
+        type: list
+        elements: dict
+    purge_teams:
+        description:
+            - Delete the teams of the organization not listed in teams, except
+              the Owners team
+        required: false
+        default: false
+        type: bool
+    concurrency:
+        description:
+            - Maximum number of requests in flight when using orgs
+            - With adaptive_concurrency, the upper bound of the number of
+              requests in flight, which adapts to the server below it
+        required: false
+        default: 16
+        type: int
     description:
         description:
             - Description of the organization
@@ -83,6 +129,91 @@ options:
              - State of the organization, either present or absent.
          required: false
          default: present
+    validate_certs:
+         description:
+             - Whether to validate the TLS certificate of the gitea API server
+         required: false
+         default: true
+         type: bool
+    timeout:
+         description:
+             - Timeout in seconds for each request to the gitea API server
+         required: false
+         default: 30
+         type: int
+    retries:
+         description:
+             - Number of times a request is retried after a connection error
+               or a 429, 502, 503 or 504 response, with exponential backoff
+         required: false
+         default: 5
+         type: int
+    cache_dir:
+         description:
+             - Directory of an on-disk cache of GET responses. Cached responses
+               are revalidated with If-None-Match/If-Modified-Since and reused
+               when the server answers 304 Not Modified.
+             - Entries are keyed by URL and credentials. Use with delegate_to
+               localhost to keep the cache on the controller.
+             - The cache is disabled when not set
+         required: false
+         type: path
+    cache_max_entries:
+         description:
+             - Maximum number of entries kept in cache_dir, least recently used
+               entries being evicted first
+         required: false
+         default: 1024
+         type: int
+    index_path:
+         description:
+             - Path of an on-disk SQLite snapshot index of the organizations
+               and repositories visible to the login user. It is refreshed
+               once per run, listing the organizations, and organizations
+               it shows to be absent, or present with the wanted fields, are
+               answered without a request.
+             - Use with delegate_to localhost to keep the index on the
+               controller.
+         required: false
+         type: path
+    instrument:
+         description:
+             - Return the timings of every API call made, and counters
+               aggregated over them, in the timings result
+         required: false
+         default: false
+         type: bool
+    trace_file:
+         description:
+             - Append one JSON line per API call made to this file, to profile
+               API use across a whole run
+         required: false
+         type: path
+    prometheus_textfile:
+         description:
+             - Accumulate request counters and durations into this file, in the
+               format of the Prometheus node exporter textfile collector
+         required: false
+         type: path
+    adaptive_concurrency:
+         description:
+             - Adapt the number of requests in flight to what the server
+               sustains, up to concurrency, growing it while responses come
+               back quickly and shrinking it on 429, 502, 503 or 504
+               responses, connection errors, rate-limit headers or rising
+               latency. When false, concurrency requests are always sent at
+               once.
+         required: false
+         default: true
+         type: bool
+    write_rate:
+         description:
+             - Maximum average number of requests changing state (POST, PUT,
+               PATCH, DELETE) sent per second, with bursts of up to as many.
+               Unlimited when 0.
+         required: false
+         default: 0
+         type: float
 
 author:
     - Randy Kleinman (rkleinman@cray.com)
@@ -126,6 +257,28 @@ EXAMPLES = '''
     login_password: mypassword
     state: absent
     gitea_url: https://my-gitea.example.com/api/v1
+
+# Onboard a tenant: organizations with their teams and members
+- name: Create tenant organizations
+  gitea_org:
+    orgs:
+      - username: tenant_a
+        full_name: Tenant A
+        teams:
+          - name: Owners
+            members: [admin_user, alice]
+          - name: developers
+            permission: write
+            units: [repo.code, repo.pulls]
+            members: [bob, carol]
+      - username: tenant_b
+        teams:
+          - name: readers
+            permission: read
+            members: [dave]
+        purge_teams: true
+    api_token: d507e44cdbfe1c48b80000afc12256ce601f3648
+    gitea_url: https://my-gitea.example.com/api/v1
 '''
 
 RETURN = '''
@@ -143,148 +296,396 @@ error:
   returned: failed
   type: str
   sample: "401: Unauthorized"
+updated_fields:
+  description: The fields of an existing organization that were (or in check mode would be) updated
+  returned: when the organization exists and state is present
+  type: list
+  elements: str
+  sample: ["full_name"]
+teams:
+  description: The teams created, updated and deleted, and the members added and removed per team
+  returned: when teams is given and state is present
+  type: dict
+  sample:
+    created: ["developers"]
+    updated: []
+    deleted: []
+    members_added: {"developers": ["bob", "carol"]}
+    members_removed: {}
+results:
+  description: Per-organization results, in the order given, when using orgs
+  returned: when orgs is given
+  type: list
+  elements: dict
+timings:
+  description:
+    - Per-call timings and aggregated counters of the API calls made. Durations
+      include retries; connect_ms is the part spent in DNS, TCP and TLS setup,
+      backoff_ms that spent waiting between retries.
+  returned: when instrument is true
+  type: dict
+  sample:
+    calls:
+      - ts: 1760000000.123456
+        method: POST
+        path: /orgs/{org}/repos
+        status: 201
+        duration_ms: 38.214
+        connect_ms: 1.532
+        backoff_ms: 0.0
+        attempts: 1
+        bytes_sent: 52
+        bytes_received: 1604
+        cached: false
+    counters:
+      requests: 1
+      attempts: 1
+      retries: 0
+      errors: 0
+      cached: 0
+      bytes_sent: 52
+      bytes_received: 1604
+      duration_ms: 38.214
+      connect_ms: 1.532
+      backoff_ms: 0.0
+      by_status: {"201": 1}
+      by_endpoint: {"POST /orgs/{org}/repos": {"count": 1, "duration_ms": 38.214, "max_ms": 38.214}}
 '''
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.urls import fetch_url
+from ansible.module_utils.gitea_client import (
+    GITEA_MUTUALLY_EXCLUSIVE, GITEA_REQUIRED_ONE_OF, GITEA_REQUIRED_TOGETHER, GiteaError,
+    gitea_argument_spec, gitea_client, report_timings,
+)
+from ansible.module_utils.gitea_fields import (
+    OWNERS_TEAM, TEAM_FIELDS, org_changes, team_changes, team_spec,
+)
 
-import json
-from base64 import b64encode
+from concurrent.futures import ThreadPoolExecutor
 
-def run_module():
-    # define available arguments/parameters a user can pass to the module
-    module_args = dict(
-        username=dict(type='str', required=True),
-        website=dict(type='str', required=False),
-        description=dict(type='str', required=False),
-        full_name=dict(type='str', required=False),
-        location=dict(type='str', required=False),
-        api_token=dict(type='str', required=False, no_log=True),
-        login_user=dict(type='str', required=False),
-        login_password=dict(type='str', required=False, no_log=True),
-        gitea_url=dict(type='str', required=True),
-        state=dict(type='str', default="present", choices=["absent", "present"]),
-    )
+ORG_OPTIONS = ('username', 'website', 'description', 'full_name', 'location', 'state', 'teams',
+               'purge_teams')
 
-    mutually_exclusive=[
-        ['api_token', 'login_user'],
-        ['api_token', 'login_password'],
-    ]
 
-    required_together=[
-        ['login_user', 'login_password'],
-    ]
+def _org_fields(params):
+    return {
+        'username': params['username'],
+        'website': params['website'] or None,
+        'description': params['description'] or None,
+        'full_name': params['full_name'] or None,
+        'location': params['location'] or None
+    }
 
-    required_one_of=[
-        ['api_token', 'login_user']
-    ]
 
-    # seed the result dict in the object
-    # we primarily care about changed and state
-    # change is if this module effectively modified the target
-    # state will include any data that you want your module to pass back
-    # for consumption, for example, in a subsequent task
+def _reconcile_org(client, params, check_mode):
+    """ Create, update or delete one org, returning its result dict """
+    org_fields = _org_fields(params)
+    username = org_fields['username']
     result = dict(
+        username=username,
+        state=params['state'],
         changed=False,
+        failed=False,
         msg='',
         json='',
         error='',
     )
 
-    # the AnsibleModule object will be our abstraction working with Ansible
-    # this includes instantiation, a couple of common attr would be the
-    # args/params passed to the execution, as well as if the module
-    # supports check mode
-    module = AnsibleModule(
-        argument_spec=module_args,
-        mutually_exclusive=mutually_exclusive,
-        required_together=required_together,
-        required_one_of=required_one_of,
-        supports_check_mode=False,
-    )
-
-    org_fields = {
-        'username': module.params['username'],
-        'website': module.params['website'] or None,
-        'description': module.params['description'] or None,
-        'full_name': module.params['full_name'] or None,
-        'location': module.params['location'] or None
-    }
-
-    api_token = module.params['api_token'] or None
-    gitea_url = module.params['gitea_url']
-    state = module.params['state']
-    headers = {'Content-type': 'application/json'}
-
-    # Determine auth method
-    if api_token:
-        headers['Authorization'] = 'token {}'.format(api_token)
-    else:
-        credentials = module.params['login_user'] + ':' + module.params['login_password']
-        headers['Authorization'] = 'Basic {}'.format(b64encode(credentials))
+    # With an index_path, orgs already as wanted need no request, and those
+    # known to be missing no GET
+    known = client.org_exists(username)
 
     # Create/Update an Org
-    if state == 'present':
+    if params['state'] == 'present':
+        if known and not org_changes(known, org_fields):
+            result.update(json=known, updated_fields=[], status=200,
+                          msg="Organization {} is up to date.".format(username))
+            return result
+
         # Determine if this is a create, or an update. Try to GET it first.
-        # If that fails, try to create it, else update it.
-        url = '{}/orgs/{}'.format(gitea_url, org_fields['username'])
-        method = 'GET'
-        resp, info = fetch_url(module, url, headers=headers, method=method)
+        # If that fails, try to create it, else update only the fields
+        # which differ.
+        resp = None if known is False else client.get('/orgs/{org}', org=username)
 
         # Not found, try creating it
-        if info['status'] == 404:
-            url = '{}/orgs'.format(gitea_url)
-            method = 'POST'
-            data=module.jsonify({k : v for (k, v) in org_fields.items() if v})
+        if resp is None or resp.status == 404:
+            result['status'] = 404
+            result['changed'] = True
+            if check_mode:
+                result['msg'] = "Organization {} would be created.".format(username)
+            else:
+                data = {k : v for (k, v) in org_fields.items() if v}
+                resp = client.post('/orgs', data=data)
+                action = 'created'
 
         # Found, try patching it
-        elif info['status'] == 200:
-            url = '{}/orgs/{}'.format(gitea_url, org_fields['username'])
-            method = 'PATCH'
-            data = module.jsonify({k : v for (k, v) in org_fields.items() if v and k != 'username'})
+        elif resp.status == 200:
+            current = resp.json()
+            data = org_changes(current, org_fields)
+            result.update(json=current, updated_fields=sorted(data))
+            if not data:
+                result['msg'] = "Organization {} is up to date.".format(username)
+            elif check_mode:
+                result.update(changed=True, msg="Organization {} would be updated.".format(username))
+            else:
+                resp = client.patch('/orgs/{org}', data=data, org=username)
+                action = 'updated'
 
         # Something went wrong
         else:
-            module.fail_json(msg="Unable to find the org.", changed=False, error=info['msg'])
+            result.update(failed=True, status=resp.status, msg="Unable to find the org.",
+                          error=resp.error)
+            return result
 
     # Delete an org
     else:
-        url = '{}/orgs/{}'.format(gitea_url, org_fields['username'])
-        method = 'DELETE'
-        data = {}
+        if known is False:
+            result.update(status=404, msg="Organization {} removed.".format(username))
+            return result
+        if check_mode:
+            resp = client.get('/orgs/{org}', org=username)
+            if resp.status == 200:
+                result.update(changed=True, msg="Organization {} would be deleted.".format(username))
+        else:
+            resp = client.delete('/orgs/{org}', org=username)
+            action = 'deleted'
 
-    # Make the request
-    resp, info = fetch_url(module, url, headers=headers, method=method, data=data)
-    status_code = info["status"]
-    result.update(info)
+    # Nothing more to send, or check mode
+    if result['msg']:
+        if resp is not None:
+            result['status'] = resp.status
+        return result
 
-    # Failure status code
-    if status_code >= 400:
-        result.pop('body')  # loaded in 'msg' field
+    result['status'] = resp.status
 
+    # Failure status code
+    if not resp.ok:
         # Deleting an org that doesn't exist
-        if state == 'absent' and status_code == 404:
-            result['msg'] = "Organization {} removed.".format(org_fields['username'])
-            module.exit_json(**result)
+        if params['state'] == 'absent' and resp.status == 404:
+            result['msg'] = "Organization {} removed.".format(username)
+            client.org_indexed(username, None)
 
         # Something else went wrong
         else:
-            try:
-                result['error'] = info['msg']
-                result['msg'] = json.loads(info['body'])['message']
-                module.fail_json(**result)
-            except:
-                pass
-            info['new_gitea_url'] = gitea_url
-            module.fail_json(**info)
+            result.update(failed=True, error=resp.error, msg=resp.message)
 
     # Success
     else:
-        body = resp.read()
-        result['json'] = json.loads(body) if body else {}
+        result['json'] = resp.json()
         result['changed'] = True
-        result['msg'] = "Organization {} was {}.".format(org_fields['username'],
-                                                         ('deleted', 'created')[state == 'present'])
+        result['msg'] = "Organization {} was {}.".format(username, action)
+        client.org_indexed(username, result['json'] if action != 'deleted' else None)
+
+    return result
+
+
+def _reconcile_teams(client, params, check_mode, result):
+    """
+    Create, update and delete the teams of an org. Existing teams and their
+    members are listed once; the member PUT/DELETE calls needed are returned
+    as (method, team_name, team_id, user) operations rather than sent, so
+    they can be spread over the pool with those of other orgs. Team names
+    and logins are case-insensitive, and at most one operation is returned
+    for a member of a team.
+    """
+    org = params['username']
+    teams = params['teams'] or []
+    summary = dict(created=[], updated=[], deleted=[], members_added={}, members_removed={})
+    result['teams'] = summary
+    # The operation on each member of each team, by lower-cased names
+    ops = {}
+
+    # The org itself would only be created in check mode, with its Owners team
+    if check_mode and result['status'] == 404:
+        existing = {OWNERS_TEAM.lower(): dict(id=None, name=OWNERS_TEAM)}
+    else:
+        existing = dict((t['name'].lower(), t) for t in client.paginate('/orgs/{org}/teams', org=org))
+
+    for team in teams:
+        name = team['name']
+        current = existing.get(name.lower())
+        if team['state'] == 'absent':
+            if current:
+                summary['deleted'].append(name)
+                if not check_mode:
+                    client.delete('/teams/{id}', id=current['id']).raise_for_status()
+            continue
+
+        members = set()
+        if current is None:
+            summary['created'].append(name)
+            data = dict((k, team[k]) for k in ('name',) + TEAM_FIELDS if team[k] is not None)
+            data.setdefault('permission', 'read')
+            if check_mode:
+                current = dict(id=None)
+            else:
+                current = client.post('/orgs/{org}/teams', data=data, org=org).raise_for_status().json()
+        else:
+            changes = team_changes(current, team)
+            if changes:
+                summary['updated'].append(name)
+                if not check_mode:
+                    # The team name is required by the edit endpoint
+                    changes['name'] = name
+                    client.patch('/teams/{id}', data=changes, id=current['id']).raise_for_status()
+            if team['members'] is not None and current['id'] is not None:
+                members = set(m['login'] for m in client.paginate('/teams/{id}/members', id=current['id']))
 
+        if team['members'] is None:
+            continue
+        # Name each user as listed for additions, as gitea spells it for removals
+        desired = dict((user.lower(), user) for user in team['members'])
+        members = dict((user.lower(), user) for user in members)
+        for user in set(desired) - set(members):
+            ops[(name.lower(), user)] = ('PUT', name, current['id'], desired[user])
+        for user in set(members) - set(desired):
+            ops[(name.lower(), user)] = ('DELETE', name, current['id'], members[user])
+
+    ops = [op for (_, op) in sorted(ops.items())]
+    for method, name, _, user in ops:
+        key = 'members_added' if method == 'PUT' else 'members_removed'
+        summary[key].setdefault(name, []).append(user)
+
+    if params['purge_teams']:
+        managed = set(team['name'].lower() for team in teams)
+        for name, current in sorted(existing.items()):
+            if name not in managed and name != OWNERS_TEAM.lower():
+                summary['deleted'].append(current['name'])
+                if not check_mode:
+                    client.delete('/teams/{id}', id=current['id']).raise_for_status()
+
+    if summary['created'] or summary['updated'] or summary['deleted'] or ops:
+        result['changed'] = True
+    return ops
+
+
+def _plan_org(client, params, check_mode):
+    """ Reconcile an org and its teams, returning (result, member operations) """
+    try:
+        result = _reconcile_org(client, params, check_mode)
+        if result['failed'] or params['state'] == 'absent' or params['teams'] is None:
+            return result, []
+        return result, _reconcile_teams(client, params, check_mode, result)
+    except GiteaError as e:
+        result = dict(username=params['username'], state=params['state'], changed=False,
+                      failed=True, json='', error=str(e),
+                      msg="Request for organization {} failed.".format(params['username']))
+        return result, []
+
+
+def _apply_member_op(client, op):
+    method, _, team_id, user = op
+    try:
+        resp = client.request(method, '/teams/{id}/members/{user}', id=team_id, user=user)
+    except GiteaError as e:
+        return str(e)
+    # Removing a member who already left is not an error
+    if resp.ok or (method == 'DELETE' and resp.status == 404):
+        return None
+    return '{} member {} of team {}: {}'.format(method, user, team_id, resp.message)
+
+
+def reconcile_orgs(client, items, check_mode, concurrency):
+    """
+    Reconcile orgs concurrently in phases: first each org with its teams,
+    computing the member operations needed, then the member additions of all
+    orgs at once, and only then their removals, as the last member of an
+    Owners team cannot be removed before the new ones are in.
+    """
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        planned = list(executor.map(lambda p: _plan_org(client, p, check_mode), items))
+        if check_mode:
+            return [result for (result, _) in planned]
+
+        for method in ('PUT', 'DELETE'):
+            owners = []
+            ops = []
+            for result, org_ops in planned:
+                org_ops = [op for op in org_ops if op[0] == method]
+                owners.extend([result] * len(org_ops))
+                ops.extend(org_ops)
+            for result, error in zip(owners, executor.map(lambda op: _apply_member_op(client, op), ops)):
+                if error:
+                    result['failed'] = True
+                    result.setdefault('member_errors', []).append(error)
+                    result['msg'] = "Updating the team members of organization {} failed.".format(
+                        result['username'])
+    return [result for (result, _) in planned]
+
+
+def run_module():
+    # define available arguments/parameters a user can pass to the module
+    module_args = dict(
+        username=dict(type='str', required=False),
+        orgs=dict(type='list', elements='dict', required=False, options=dict(
+            username=dict(type='str', required=True),
+            website=dict(type='str', required=False),
+            description=dict(type='str', required=False),
+            full_name=dict(type='str', required=False),
+            location=dict(type='str', required=False),
+            teams=dict(type='list', elements='dict', required=False, options=team_spec()),
+            purge_teams=dict(type='bool', required=False),
+            state=dict(type='str', required=False, choices=["absent", "present"]),
+        )),
+        concurrency=dict(type='int', required=False, default=16),
+        website=dict(type='str', required=False),
+        description=dict(type='str', required=False),
+        full_name=dict(type='str', required=False),
+        location=dict(type='str', required=False),
+        teams=dict(type='list', elements='dict', required=False, options=team_spec()),
+        purge_teams=dict(type='bool', required=False, default=False),
+        state=dict(type='str', default="present", choices=["absent", "present"]),
+    )
+    module_args.update(gitea_argument_spec())
+
+    mutually_exclusive = GITEA_MUTUALLY_EXCLUSIVE + [
+        ['username', 'orgs'],
+    ]
+
+    required_together = GITEA_REQUIRED_TOGETHER
+
+    required_one_of = GITEA_REQUIRED_ONE_OF + [
+        ['username', 'orgs'],
+    ]
+
+    # the AnsibleModule object will be our abstraction working with Ansible
+    # this includes instantiation, a couple of common attr would be the
+    # args/params passed to the execution, as well as if the module
+    # supports check mode
+    module = AnsibleModule(
+        argument_spec=module_args,
+        mutually_exclusive=mutually_exclusive,
+        required_together=required_together,
+        required_one_of=required_one_of,
+        supports_check_mode=True,
+    )
+
+    # Options not given for an item of orgs default to the top-level value
+    if module.params['orgs'] is not None:
+        items = [dict((k, module.params[k] if item.get(k) is None else item[k]) for k in ORG_OPTIONS)
+                 for item in module.params['orgs']]
+    else:
+        items = [dict((k, module.params[k]) for k in ORG_OPTIONS)]
+
+    concurrency = max(1, min(module.params['concurrency'], len(items) or 1))
+    with gitea_client(module, pool_size=concurrency) as client:
+        results = reconcile_orgs(client, items, module.check_mode, concurrency)
+
+    if module.params['orgs'] is None:
+        result = report_timings(module, client, results[0])
+        if result.pop('failed'):
+            module.fail_json(**result)
+        module.exit_json(**result)
+
+    failed = [r for r in results if r['failed']]
+    changed = [r for r in results if r['changed']]
+    result = dict(
+        changed=bool(changed),
+        results=results,
+        msg="{} organizations, {} changed, {} failed.".format(len(results), len(changed), len(failed)),
+    )
+    report_timings(module, client, result)
+    if failed:
+        module.fail_json(**result)
     module.exit_json(**result)
 
 def main():
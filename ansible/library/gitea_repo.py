@@ -2,7 +2,7 @@
 #
 # MIT License
 #
-# (C) Copyright 2019, 2021-2022 Hewlett Packard Enterprise Development LP
+# (C) Copyright 2019, 2021-2022, 2026 Hewlett Packard Enterprise Development LP
 #
 # Permission is hereby granted, free of charge, to any person obtaining a
 # copy of this software and associated documentation files (the "Software"),
@@ -35,12 +35,38 @@ short_description: Creates and deletes Repositories in Gitea.
 version_added: "2.5"
 description:
     - Creates or deletes Gitea repositories
+    - Repositories can instead be migrated (imported) from a clone_addr.
+      Migrations whose request times out at the API gateway are polled for
+      until they complete, and run concurrently when using repos.
+    - Many repositories can be reconciled in a single task with the repos
+      option. Requests are then spread over a pool of keep-alive connections
+      to the API server.
 
 options:
     name:
         description:
             - Name of the repository
-        required: true
+            - Required unless repos is given
+        required: false
+    repos:
+        description:
+            - List of repositories to reconcile in bulk instead of a single one
+            - Each item accepts name, org, user, description, auto_init,
+              gitignores, license, private, readme, clone_addr, mirror and
+              state. Options not
+              given for an item default to the top-level value.
+            - Do not specify both name and repos
+        required: false
+        type: list
+        elements: dict
+    concurrency:
+        description:
+            - Maximum number of requests in flight when using repos
+            - With adaptive_concurrency, the upper bound of the number of
+              requests in flight, which adapts to the server below it
+        required: false
+        default: 16
+        type: int
     org:
         description:
             - Name of the organization which owns/will own the repo
@@ -79,6 +105,36 @@ options:
         description:
             - Readme of the repository to create
         required: false
+    clone_addr:
+        description:
+            - URL of a git repository to migrate into the new repository
+              instead of creating an empty one, for example a file:// path
+              visible to the gitea server or a local HTTP mirror
+            - Local paths require IMPORT_LOCAL_PATHS in the gitea security
+              settings and an admin login_user; local network addresses
+              require ALLOW_LOCALNETWORKS in the migrations settings
+            - An existing repository is left untouched
+        required: false
+    mirror:
+        description:
+            - Whether a migrated repository is kept as a pull mirror of clone_addr
+        required: false
+        default: false
+        type: bool
+    migrate_timeout:
+        description:
+            - Seconds to wait for migrations whose outcome is not yet known
+            - A migration is complete once the repository is not empty and
+              has a branch, so the migration of an empty repository times out
+        required: false
+        default: 1800
+        type: int
+    poll_interval:
+        description:
+            - Seconds between checks on migrations whose outcome is not yet known
+        required: false
+        default: 5
+        type: int
     login_user:
         description:
             - Username of the user doing the operation
@@ -105,6 +161,92 @@ options:
              - State of the repository, either present (create it) or absent (delete it)
          required: false
          default: present
+    validate_certs:
+         description:
+             - Whether to validate the TLS certificate of the gitea API server
+         required: false
+         default: true
+         type: bool
+    timeout:
+         description:
+             - Timeout in seconds for each request to the gitea API server
+         required: false
+         default: 30
+         type: int
+    retries:
+         description:
+             - Number of times a request is retried after a connection error
+               or a 429, 502, 503 or 504 response, with exponential backoff
+         required: false
+         default: 5
+         type: int
+    cache_dir:
+         description:
+             - Directory of an on-disk cache of GET responses. Cached responses
+               are revalidated with If-None-Match/If-Modified-Since and reused
+               when the server answers 304 Not Modified.
+             - Entries are keyed by URL and credentials. Use with delegate_to
+               localhost to keep the cache on the controller.
+             - The cache is disabled when not set
+         required: false
+         type: path
+    cache_max_entries:
+         description:
+             - Maximum number of entries kept in cache_dir, least recently used
+               entries being evicted first
+         required: false
+         default: 1024
+         type: int
+    index_path:
+         description:
+             - Path of an on-disk SQLite snapshot index of the organizations
+               and repositories visible to the login user. It is refreshed
+               once per run, listing only the repositories updated since the
+               last refresh, and the repositories of organizations it shows
+               to be already present or absent are answered without a
+               request.
+             - Use with delegate_to localhost to keep the index on the
+               controller.
+         required: false
+         type: path
+    instrument:
+         description:
+             - Return the timings of every API call made, and counters
+               aggregated over them, in the timings result
+         required: false
+         default: false
+         type: bool
+    trace_file:
+         description:
+             - Append one JSON line per API call made to this file, to profile
+               API use across a whole run
+         required: false
+         type: path
+    prometheus_textfile:
+         description:
+             - Accumulate request counters and durations into this file, in the
+               format of the Prometheus node exporter textfile collector
+         required: false
+         type: path
+    adaptive_concurrency:
+         description:
+             - Adapt the number of requests in flight to what the server
+               sustains, up to concurrency, growing it while responses come
+               back quickly and shrinking it on 429, 502, 503 or 504
+               responses, connection errors, rate-limit headers or rising
+               latency. When false, concurrency requests are always sent at
+               once.
+         required: false
+         default: true
+         type: bool
+    write_rate:
+         description:
+             - Maximum average number of requests changing state (POST, PUT,
+               PATCH, DELETE) sent per second, with bursts of up to as many.
+               Unlimited when 0.
+         required: false
+         default: 0
+         type: float
 
 author:
     - Randy Kleinman (rkleinman@cray.com)
@@ -138,6 +280,34 @@ EXAMPLES = '''
     login_password: mypassword
     state: absent
     gitea_url: https://my-gitea.example.com/api/v1
+
+# Create many repos in the my_org organization in one task
+- name: Create product repos
+  gitea_repo:
+    org: my_org
+    repos:
+      - name: my_repo
+      - name: my_other_repo
+        private: true
+      - name: my_old_repo
+        state: absent
+    concurrency: 16
+    api_token: d507e44cdbfe1c48b80000afc12256ce601f3648
+    gitea_url: https://my-gitea.example.com/api/v1
+
+# Seed repos from on-node git mirrors, several at a time
+- name: Import product repos
+  gitea_repo:
+    org: my_org
+    repos:
+      - name: my_repo
+        clone_addr: file:///var/lib/gitea/seed/my_repo.git
+      - name: my_other_repo
+        clone_addr: http://localhost:8080/my_other_repo.git
+    concurrency: 4
+    login_user: admin_user
+    login_password: mypassword
+    gitea_url: https://my-gitea.example.com/api/v1
 '''
 
 RETURN = '''
@@ -155,28 +325,292 @@ error:
   returned: failed
   type: str
   sample: "401: Unauthorized"
+results:
+  description: Per-repository results, in the order given, when using repos
+  returned: when repos is given
+  type: list
+  elements: dict
+  sample:
+    - name: my_repo
+      owner: my_org
+      state: present
+      changed: true
+      failed: false
+      status: 201
+      msg: "Repository my_repo was created."
+timings:
+  description:
+    - Per-call timings and aggregated counters of the API calls made. Durations
+      include retries; connect_ms is the part spent in DNS, TCP and TLS setup,
+      backoff_ms that spent waiting between retries.
+  returned: when instrument is true
+  type: dict
+  sample:
+    calls:
+      - ts: 1760000000.123456
+        method: POST
+        path: /orgs/{org}/repos
+        status: 201
+        duration_ms: 38.214
+        connect_ms: 1.532
+        backoff_ms: 0.0
+        attempts: 1
+        bytes_sent: 52
+        bytes_received: 1604
+        cached: false
+    counters:
+      requests: 1
+      attempts: 1
+      retries: 0
+      errors: 0
+      cached: 0
+      bytes_sent: 52
+      bytes_received: 1604
+      duration_ms: 38.214
+      connect_ms: 1.532
+      backoff_ms: 0.0
+      by_status: {"201": 1}
+      by_endpoint: {"POST /orgs/{org}/repos": {"count": 1, "duration_ms": 38.214, "max_ms": 38.214}}
 '''
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.urls import fetch_url
+from ansible.module_utils.gitea_client import (
+    GITEA_MUTUALLY_EXCLUSIVE, GITEA_REQUIRED_TOGETHER, RETRY_STATUSES, GiteaError, GiteaTimeout,
+    gitea_argument_spec, gitea_client, report_timings,
+)
+from ansible.module_utils.gitea_fields import repo_fields
 
-import json
-from base64 import b64encode
+import time
+from concurrent.futures import ThreadPoolExecutor
 
+REPO_OPTIONS = ('name', 'org', 'user', 'description', 'auto_init', 'gitignores',
+                'license', 'private', 'readme', 'clone_addr', 'mirror', 'state')
 
-def _add_auth_headers(headers, module):
-    """ Add auth headers depending on the auth type """
-    if module.params['api_token']:  # token
-        headers['Authorization'] = 'token {}'.format(module.params['api_token'])
-    else:  # basic
-        credentials = module.params['login_user'] + ':' + module.params['login_password']
-        headers['Authorization'] = 'Basic {}'.format(b64encode(credentials))
-    return headers
+
+def _migrate_fields(params):
+    """ The fields of the repository migration request body """
+    return {
+        'clone_addr': params['clone_addr'],
+        'repo_name': params['name'],
+        'repo_owner': params['org'] or params['user'],
+        'mirror': params['mirror'] or False,
+        'private': params['private'] or False,
+        'description': params['description'] or None,
+    }
+
+
+def _migrate_repo(client, params):
+    """
+    Start a migration, returning the response or None if its outcome is
+    unknown. The migrate call runs for as long as the clone does, so it is
+    never retried blindly: a timeout or gateway error leaves the migration
+    to be polled for instead.
+    """
+    data = {k: v for (k, v) in _migrate_fields(params).items() if v is not None}
+    try:
+        resp = client.post('/repos/migrate', data=data, retry=False)
+    except GiteaTimeout:
+        return None
+    if resp.status in RETRY_STATUSES:
+        return None
+    return resp
+
+
+def _reconcile_repo(client, params):
+    """ Create, migrate or delete one repository, returning its result dict """
+    result = dict(
+        name=params['name'],
+        owner=params['org'] or params['user'],
+        state=params['state'],
+        changed=False,
+        failed=False,
+        pending=False,
+        status=-1,
+        msg='',
+        json={},
+        error='',
+    )
+    action = 'created'
+
+    # Repositories already as wanted need no request if the client keeps a
+    # repository index, as when run by the action plugin, or an index_path
+    if params['org']:
+        exists = client.repo_exists(params['org'], params['name'])
+        if exists is not None and exists == (params['state'] == 'present'):
+            result.update(status=200 if exists else 404,
+                          msg="Repository {} {}.".format(params['name'], ('removed', 'exists')[exists]))
+            return result
+
+    try:
+        # Migrate a Repo
+        if params['state'] == 'present' and params['clone_addr']:
+            action = 'migrated'
+            resp = _migrate_repo(client, params)
+            if resp is None:
+                result['pending'] = True
+                return result
+
+        # Create a Repo
+        elif params['state'] == 'present':
+            # Try creating it, if a 409 is returned it already exists. Gitea does
+            # not allow patching, so if it exists, that has to be good enough.
+            # See: https://github.com/go-gitea/gitea/issues/5960 for patching RFE.
+            data = {k: v for (k, v) in repo_fields(params).items() if v}
+            if params['org']:
+                resp = client.post('/org/{org}/repos', data=data, org=params['org'])
+            else:
+                resp = client.post('/user/repos', data=data)
+
+        # Delete a repo
+        else:
+            action = 'deleted'
+            resp = client.delete('/repos/{owner}/{repo}', owner=result['owner'], repo=params['name'])
+    except GiteaError as e:
+        result.update(failed=True, error=str(e),
+                      msg="Request for repository {} failed.".format(params['name']))
+        return result
+
+    result['status'] = resp.status
+
+    # Deleting a repo that doesn't exist
+    if params['state'] == 'absent' and resp.status == 404:
+        result['msg'] = "Repository {} removed.".format(params['name'])
+
+    # Creating a repo that already exists
+    elif params['state'] == 'present' and resp.status == 409:
+        result['msg'] = "Repository {} exists.".format(params['name'])
+
+    # Something else went wrong
+    elif not resp.ok:
+        result.update(failed=True, error=resp.error, msg=resp.message)
+
+    # Success
+    else:
+        result['json'] = resp.json()
+        result['changed'] = True
+        result['msg'] = "Repository {} was {}.".format(params['name'], action)
+        client.repo_indexed(result['owner'], params['name'], params['state'] == 'present',
+                            result['json'])
+    return result
+
+
+def _has_branch(client, owner, name):
+    """ Whether the repository has at least one branch """
+    resp = client.get('/repos/{owner}/{repo}/branches', query=dict(limit=1), owner=owner,
+                      repo=name, cache=False)
+    return resp.ok and bool(resp.json())
+
+
+def _poll_migration(client, result, params):
+    """
+    Check on a migration whose outcome was unknown. Gitea creates the
+    repository before cloning into it, so the migration is only complete
+    once the repository is not empty and has a branch; if it is not there
+    the migration never started or was rolled back, and it is submitted
+    again.
+    """
+    try:
+        resp = client.get('/repos/{owner}/{repo}', owner=result['owner'], repo=params['name'],
+                          cache=False)
+        if resp.ok:
+            repo = resp.json()
+            result['visible'] = True
+            if repo.get('empty', True) or not _has_branch(client, result['owner'], params['name']):
+                return result
+    except GiteaError:
+        return result
+    if resp.ok:
+        result.update(pending=False, changed=True, status=resp.status, json=repo,
+                      msg="Repository {} was migrated.".format(params['name']))
+        return result
+    if resp.status != 404:
+        return result
+    result['resubmitted'] = result.get('resubmitted', 0) + 1
+    if result['resubmitted'] > client.retries:
+        result.update(pending=False, failed=True, status=resp.status,
+                      msg="Migration of repository {} did not start.".format(params['name']))
+        return result
+    retry = _reconcile_repo(client, params)
+    retry['resubmitted'] = result['resubmitted']
+    return retry
+
+
+def reconcile_repos(client, items, concurrency, migrate_timeout=1800, poll_interval=5):
+    """
+    Reconcile repositories concurrently. Migrations whose outcome is unknown
+    are then polled for together, until done or migrate_timeout expires,
+    rather than blocking a worker each.
+    """
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda p: _reconcile_repo(client, p), items))
+
+        deadline = time.time() + migrate_timeout
+        pending = [i for (i, r) in enumerate(results) if r['pending']]
+        while pending and time.time() < deadline:
+            time.sleep(poll_interval)
+            polled = executor.map(lambda i: _poll_migration(client, results[i], items[i]), pending)
+            for i, result in zip(pending, list(polled)):
+                results[i] = result
+            pending = [i for i in pending if results[i]['pending']]
+
+    for result in results:
+        visible = result.pop('visible', False)
+        if result.pop('pending'):
+            result.update(failed=True, msg="Migration of repository {} timed out{}.".format(
+                result['name'], ', it is still empty' if visible else ''))
+    return results
+
+
+def run_bulk(module, client):
+    """ Reconcile every repository in the repos option """
+    items = []
+    for item in module.params['repos']:
+        params = dict((k, module.params[k] if item.get(k) is None else item[k]) for k in REPO_OPTIONS)
+        # An owner given on the item replaces the top-level one entirely
+        if item.get('org') is not None or item.get('user') is not None:
+            params['org'], params['user'] = item.get('org'), item.get('user')
+        if bool(params['org']) == bool(params['user']):
+            module.fail_json(msg="Repository {} needs exactly one of org or user.".format(params['name']))
+        items.append(params)
+
+    results = reconcile_repos(client, items, _concurrency(module, len(items)),
+                              module.params['migrate_timeout'], module.params['poll_interval'])
+
+    failed = [r for r in results if r['failed']]
+    changed = [r for r in results if r['changed']]
+    result = dict(
+        changed=bool(changed),
+        results=results,
+        msg="{} repositories, {} changed, {} failed.".format(len(results), len(changed), len(failed)),
+    )
+    report_timings(module, client, result)
+    if failed:
+        module.fail_json(**result)
+    module.exit_json(**result)
+
+
+def _concurrency(module, count):
+    return max(1, min(module.params['concurrency'], count or 1))
 
 
 def run_module():
     # define available arguments/parameters a user can pass to the module
     module_args = dict(
-        name=dict(type='str', required=True),
+        name=dict(type='str', required=False),
+        repos=dict(type='list', elements='dict', required=False, options=dict(
+            name=dict(type='str', required=True),
+            org=dict(type='str', required=False),
+            user=dict(type='str', required=False),
+            description=dict(type='str', required=False),
+            auto_init=dict(type='bool', required=False),
+            gitignores=dict(type='str', required=False),
+            license=dict(type='str', required=False),
+            private=dict(type='bool', required=False),
+            readme=dict(type='str', required=False),
+            clone_addr=dict(type='str', required=False),
+            mirror=dict(type='bool', required=False),
+            state=dict(type='str', required=False, choices=["absent", "present"]),
+        )),
+        concurrency=dict(type='int', required=False, default=16),
         org=dict(type='str', required=False),
         user=dict(type='str', required=False),
         description=dict(type='str', required=False),
@@ -185,41 +619,27 @@ def run_module():
         license=dict(type='str', required=False),
         private=dict(type='bool', required=False, default=False),
         readme=dict(type='str', required=False),
-        api_token=dict(type='str', required=False, no_log=True),
-        login_user=dict(type='str', required=False),
-        login_password=dict(type='str', required=False, no_log=True),
-        gitea_url=dict(type='str', required=True),
+        clone_addr=dict(type='str', required=False),
+        mirror=dict(type='bool', required=False, default=False),
+        migrate_timeout=dict(type='int', required=False, default=1800),
+        poll_interval=dict(type='int', required=False, default=5),
         state=dict(type='str', default="present", choices=["absent", "present"]),
     )
+    module_args.update(gitea_argument_spec())
 
-    mutually_exclusive=[
-        ['api_token', 'login_user'],
-        ['api_token', 'login_password'],
+    mutually_exclusive = GITEA_MUTUALLY_EXCLUSIVE + [
         ['org', 'user'],
+        ['name', 'repos'],
     ]
 
-    required_together=[
-        ['login_user', 'login_password'],
-    ]
+    required_together = GITEA_REQUIRED_TOGETHER
 
     required_one_of=[
         ['api_token', 'login_user'],
         ['api_token', 'login_password'],
-        ['org', 'user']
+        ['name', 'repos'],
     ]
 
-    # seed the result dict in the object
-    # we primarily care about changed and state
-    # change is if this module effectively modified the target
-    # state will include any data that you want your module to pass back
-    # for consumption, for example, in a subsequent task
-    result = dict(
-        changed=False,
-        msg='',
-        json='',
-        error='',
-    )
-
     # the AnsibleModule object will be our abstraction working with Ansible
     # this includes instantiation, a couple of common attr would be the
     # args/params passed to the execution, as well as if the module
@@ -232,83 +652,20 @@ def run_module():
         supports_check_mode=False,
     )
 
-    repo_fields = {
-        'name': module.params['name'],
-        'auto_init': module.params['auto_init'] or False,
-        'description': module.params['description'] or None,
-        'gitignores': module.params['gitignores'] or None,
-        'license': module.params['license'] or None,
-        'private': module.params['private'] or False,
-        'readme': module.params['readme'] or None,
-    }
-
-    org = module.params['org'] or None
-    user = module.params['user'] or None
-    gitea_url = module.params['gitea_url']
-    login_user = module.params['login_user']
-    state = module.params['state']
-    headers = {'Content-type': 'application/json'}
-    _add_auth_headers(headers, module)
-
-    # Set urls
-    if org:
-        create_url = '{}/org/{}/repos'.format(gitea_url, org) # org repo create
-        delete_url = '{}/repos/{}/{}'.format(gitea_url, org, repo_fields['name'])  # org repo delete
-    else:
-        create_url = '{}/user/repos'.format(gitea_url)  # user repo create
-        delete_url = '{}/repos/{}/{}'.format(gitea_url, user, repo_fields['name'])  # user repo delete
-
-    # Create a Repo
-    if state == 'present':
-        # Try creating it, if a 409 is returned it already exists. Gitea does
-        # not allow patching, so if it exists, that has to be good enough.
-        # See: https://github.com/go-gitea/gitea/issues/5960 for patching RFE.
-        url = create_url
-        method = 'POST'
-        data=module.jsonify({k : v for (k, v) in repo_fields.items() if v})
-
-    # Delete a repo
-    else:
-        url = delete_url
-        method = 'DELETE'
-        data = {}
-
-    # Make the request
-    resp, info = fetch_url(module, url, headers=headers, method=method, data=data)
-
-    status_code = info["status"]
-    result.update(info)
+    if module.params['repos'] is not None:
+        with gitea_client(module, pool_size=_concurrency(module, len(module.params['repos']))) as client:
+            run_bulk(module, client)
 
-    # Failure status code
-    if status_code >= 400:
-        # Deleting a repo that doesn't exist
-        if state == 'absent' and status_code == 404:
-            result['msg'] = "Repository {} removed.".format(repo_fields['name'])
-            module.exit_json(**result)
+    if not (module.params['org'] or module.params['user']):
+        module.fail_json(msg="one of the following is required: org, user")
 
-        # Creating a repo that already exists
-        if state == 'present' and status_code == 409:
-            result['msg'] = "Repository {} exists.".format(repo_fields['name'])
-            module.exit_json(**result)
-
-        # Something else went wrong
-        else:
-            try:
-                result['error'] = info['msg']
-                result['msg'] = json.loads(info['body'])['message']
-                module.fail_json(**result)
-            except:
-                pass
-            module.fail_json(**info)
-
-    # Success
-    else:
-        body = resp.read()
-        result['json'] = json.loads(body) if body else {}
-        result['changed'] = True
-        result['msg'] = "Repository {} was {}.".format(repo_fields['name'],
-                                                       ('deleted', 'created')[state == 'present'])
+    with gitea_client(module) as client:
+        result = reconcile_repos(client, [module.params], 1, module.params['migrate_timeout'],
+                                 module.params['poll_interval'])[0]
 
+    report_timings(module, client, result)
+    if result.pop('failed'):
+        module.fail_json(**result)
     module.exit_json(**result)
 
 def main():
@@ -0,0 +1,661 @@
+#!/usr/bin/python
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = '''
+---
+module: gitea_state
+short_description: Converges Gitea organizations, repositories and teams to a desired state.
+version_added: "2.5"
+description:
+    - Takes the whole desired state of a set of organizations, with their
+      repositories, teams and team members, and converges Gitea to it.
+    - Current state is snapshotted first with paginated list calls, one per
+      collection, instead of probing every object. The operations needed are
+      then computed and applied in dependency-ordered waves (organizations,
+      then repositories, then teams, then added team members, then
+      deletions and removed team members),
+      the operations of a wave being sent concurrently.
+    - A system already in the desired state costs only the list calls.
+    - Operations depending on an organization that failed are skipped.
+    - Supports check mode, returning the operations that would be applied.
+
+options:
+    orgs:
+        description:
+            - The desired organizations.
+            - Each item accepts username (required), full_name, description,
+              website, location, repos, teams and state (present or absent).
+              Fields not given are not changed on an existing organization.
+            - Each item of repos accepts name (required), description, private,
+              website, auto_init, gitignores, license, readme and state.
+              Only description, private and website are updated on an
+              existing repository.
+            - Each item of teams accepts name (required), description,
+              permission (read, write or admin), units,
+              includes_all_repositories, can_create_org_repo, members and
+              state. When members is given, team members not listed are
+              removed, including from the Owners team of a new organization
+              the login user which Gitea adds to it on creation.
+            - Repositories and teams of an organization are left alone when
+              repos, respectively teams, is not given for it.
+        required: true
+        type: list
+        elements: dict
+    prune:
+        description:
+            - Delete the repositories and teams of the listed organizations
+              which are not in the desired state. Only collections given for
+              an organization are pruned, and the Owners team never is.
+            - Organizations which are not listed are left alone, see
+              prune_orgs.
+        required: false
+        default: false
+        type: bool
+    prune_orgs:
+        description:
+            - Delete the organizations visible to the login user which are not
+              listed in orgs, along with their repositories and teams.
+            - With an admin login user, this is every other organization of
+              the server.
+        required: false
+        default: false
+        type: bool
+    concurrency:
+        description:
+            - Maximum number of requests in flight
+            - With adaptive_concurrency, the upper bound of the number of
+              requests in flight, which adapts to the server below it
+        required: false
+        default: 16
+        type: int
+    login_user:
+        description:
+            - The gitea user name to make the changes as
+            - Required if using basic auth
+        required: false
+    login_password:
+        description:
+            - Password of the login_user.
+            - Required if using basic auth
+        required: false
+        no_log: true
+    api_token:
+         description:
+             - If using token-based auth, the token to use
+             - Not required if using basic auth
+         required: false
+         no_log: true
+    gitea_url:
+         description:
+             - Base Url to the gitea API server
+         required: true
+    validate_certs:
+         description:
+             - Whether to validate the TLS certificate of the gitea API server
+         required: false
+         default: true
+         type: bool
+    timeout:
+         description:
+             - Timeout in seconds for each request to the gitea API server
+         required: false
+         default: 30
+         type: int
+    retries:
+         description:
+             - Number of times a request is retried after a connection error
+               or a 429, 502, 503 or 504 response, with exponential backoff
+         required: false
+         default: 5
+         type: int
+    cache_dir:
+         description:
+             - Directory of an on-disk cache of GET responses. Cached responses
+               are revalidated with If-None-Match/If-Modified-Since and reused
+               when the server answers 304 Not Modified.
+             - Entries are keyed by URL and credentials. Use with delegate_to
+               localhost to keep the cache on the controller.
+             - The cache is disabled when not set
+         required: false
+         type: path
+    cache_max_entries:
+         description:
+             - Maximum number of entries kept in cache_dir, least recently used
+               entries being evicted first
+         required: false
+         default: 1024
+         type: int
+    instrument:
+         description:
+             - Return the timings of every API call made, and counters
+               aggregated over them, in the timings result
+         required: false
+         default: false
+         type: bool
+    trace_file:
+         description:
+             - Append one JSON line per API call made to this file, to profile
+               API use across a whole run
+         required: false
+         type: path
+    prometheus_textfile:
+         description:
+             - Accumulate request counters and durations into this file, in the
+               format of the Prometheus node exporter textfile collector
+         required: false
+         type: path
+    adaptive_concurrency:
+         description:
+             - Adapt the number of requests in flight to what the server
+               sustains, up to concurrency, growing it while responses come
+               back quickly and shrinking it on 429, 502, 503 or 504
+               responses, connection errors, rate-limit headers or rising
+               latency. When false, concurrency requests are always sent at
+               once.
+         required: false
+         default: true
+         type: bool
+    write_rate:
+         description:
+             - Maximum average number of requests changing state (POST, PUT,
+               PATCH, DELETE) sent per second, with bursts of up to as many.
+               Unlimited when 0.
+         required: false
+         default: 0
+         type: float
+
+author:
+    - Cray-HPE CMS team
+'''
+
+EXAMPLES = '''
+# Converge the product organizations, removing anything unmanaged in them
+- name: Converge the state of gitea
+  gitea_state:
+    orgs:
+      - username: cray
+        full_name: Cray Products
+        repos:
+          - name: csm-config-management
+          - name: uan-config-management
+            description: UAN configuration
+        teams:
+          - name: Owners
+            members: [crayvcs]
+          - name: readers
+            permission: read
+            units: [repo.code]
+            members: [alice, bob]
+      - username: old_org
+        state: absent
+    prune: true
+    api_token: d507e44cdbfe1c48b80000afc12256ce601f3648
+    gitea_url: https://my-gitea.example.com/api/v1
+
+# Keep only the cray organization, deleting every other one with its repositories
+- name: Remove the organizations not managed here
+  gitea_state:
+    orgs:
+      - username: cray
+    prune_orgs: true
+    api_token: d507e44cdbfe1c48b80000afc12256ce601f3648
+    gitea_url: https://my-gitea.example.com/api/v1
+'''
+
+RETURN = '''
+msg:
+  description: Success or failure message
+  returned: always
+  type: str
+  sample: "12 operations in 3 waves, 0 failed."
+operations:
+  description:
+    - The operations applied (or in check mode that would be applied), in
+      the order they were sent. target is org, org/repo, org:team or
+      org:team/user for organizations, repositories, teams and members.
+  returned: always
+  type: list
+  elements: dict
+  sample:
+    - wave: 1
+      kind: repo
+      action: create
+      target: cray/csm-config-management
+      status: 201
+      failed: false
+      msg: ""
+summary:
+  description: Number of operations per kind and action
+  returned: always
+  type: dict
+  sample: {"repo": {"create": 1}, "member": {"add": 2}}
+timings:
+  description:
+    - Per-call timings and aggregated counters of the API calls made, as
+      returned by the other gitea modules
+  returned: when instrument is true
+  type: dict
+'''
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.gitea_client import (
+    GITEA_MUTUALLY_EXCLUSIVE, GITEA_REQUIRED_ONE_OF, GITEA_REQUIRED_TOGETHER, GiteaError,
+    gitea_argument_spec, gitea_client, report_timings,
+)
+from ansible.module_utils.gitea_fields import (
+    ORG_FIELDS, OWNERS_TEAM, TEAM_FIELDS, org_changes, repo_changes, repo_fields, team_changes,
+    team_spec,
+)
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# The wave of each kind of operation. A wave only starts once every
+# operation of the earlier ones completed: repositories and teams need their
+# organization, members need their team, members are only removed once the
+# new ones are in, as the last owner of an organization cannot be, and an
+# organization can only be deleted once it is empty.
+WAVES = {
+    ('org', 'create'): 0,
+    ('org', 'update'): 0,
+    ('repo', 'create'): 1,
+    ('repo', 'update'): 1,
+    ('team', 'create'): 2,
+    ('team', 'update'): 2,
+    ('member', 'add'): 3,
+    ('member', 'remove'): 4,
+    ('team', 'delete'): 4,
+    ('repo', 'delete'): 4,
+    ('org', 'delete'): 5,
+}
+
+
+def repo_spec():
+    """ The argument spec of a repository of an organization """
+    return dict(
+        name=dict(type='str', required=True),
+        description=dict(type='str', required=False),
+        private=dict(type='bool', required=False),
+        website=dict(type='str', required=False),
+        auto_init=dict(type='bool', required=False),
+        gitignores=dict(type='str', required=False),
+        license=dict(type='str', required=False),
+        readme=dict(type='str', required=False),
+        state=dict(type='str', default="present", choices=["absent", "present"]),
+    )
+
+
+def _by_name(items, key='name'):
+    """ Index API objects by lower-cased name, as gitea names are case-insensitive """
+    return dict((item[key].lower(), item) for item in items)
+
+
+def list_orgs(client):
+    """ The existing organizations, by lower-cased name """
+    return _by_name(client.paginate('/orgs', prefetch=2), key='username')
+
+
+def unlisted_orgs(orgs, existing):
+    """ The existing organizations not in orgs, as absent ones to prune """
+    listed = set(org['username'].lower() for org in orgs)
+    return [dict(username=org['username'], state='absent', repos=None, teams=None, pruned=True)
+            for (name, org) in sorted(existing.items()) if name not in listed]
+
+
+def snapshot(client, orgs, existing, executor):
+    """
+    The current state of the desired organizations: for each, a dict of the
+    org itself (None if it does not exist) and of its repos, teams and team
+    members, listed only when the desired state manages them. The repos of
+    an organization being pruned are listed, to delete them first.
+    """
+    def org_state(org):
+        state = dict(org=existing.get(org['username'].lower()), repos={}, teams={}, members={})
+        if state['org'] is None:
+            return state
+        name = state['org']['username']
+        if org.get('pruned'):
+            state['repos'] = _by_name(client.paginate('/orgs/{org}/repos', org=name))
+        if org['state'] == 'absent':
+            return state
+        if org['repos'] is not None:
+            state['repos'] = _by_name(client.paginate('/orgs/{org}/repos', org=name))
+        if org['teams'] is not None:
+            state['teams'] = _by_name(client.paginate('/orgs/{org}/teams', org=name))
+            for team in org['teams']:
+                current = state['teams'].get(team['name'].lower())
+                if current and team['members'] is not None and team['state'] == 'present':
+                    state['members'][current['id']] = set(
+                        m['login'] for m in client.paginate('/teams/{id}/members', id=current['id']))
+        return state
+
+    return list(executor.map(org_state, orgs))
+
+
+def _op(kind, action, org, name=None, team=None, data=None, id=None):
+    """ An operation to apply, in the wave of its kind """
+    if kind == 'org':
+        target = org
+    elif kind == 'repo':
+        target = '{}/{}'.format(org, name)
+    elif kind == 'team':
+        target = '{}:{}'.format(org, name)
+    else:
+        target = '{}:{}/{}'.format(org, team, name)
+    return dict(wave=WAVES[(kind, action)], kind=kind, action=action, target=target, org=org,
+                name=name, team=team, data=data, id=id)
+
+
+def _plan_repos(org, state, new, prune):
+    ops = []
+    current = state['repos']
+    for repo in org['repos']:
+        existing = None if new else current.get(repo['name'].lower())
+        if repo['state'] == 'absent':
+            if existing:
+                ops.append(_op('repo', 'delete', org['username'], existing['name']))
+        elif existing is None:
+            data = dict((k, v) for (k, v) in repo_fields(repo).items() if v)
+            if repo['website']:
+                data['website'] = repo['website']
+            ops.append(_op('repo', 'create', org['username'], repo['name'], data=data))
+        else:
+            changes = repo_changes(existing, repo)
+            if changes:
+                ops.append(_op('repo', 'update', org['username'], existing['name'], data=changes))
+
+    if prune and not new:
+        managed = set(repo['name'].lower() for repo in org['repos'])
+        for name, existing in sorted(current.items()):
+            if name not in managed:
+                ops.append(_op('repo', 'delete', org['username'], existing['name']))
+    return ops
+
+
+def _plan_teams(org, state, new, prune, creator):
+    ops = []
+    username = org['username']
+    current = state['teams']
+    for team in org['teams']:
+        name = team['name']
+        existing = None if new else current.get(name.lower())
+        if team['state'] == 'absent':
+            if existing and existing['name'] != OWNERS_TEAM:
+                ops.append(_op('team', 'delete', username, existing['name'], id=existing['id']))
+            continue
+
+        members = set()
+        if new and name.lower() == OWNERS_TEAM.lower():
+            # Created along with the org, holding its creator
+            name = OWNERS_TEAM
+            members = set([creator]) if creator else set()
+            changes = team_changes({}, team)
+            changes.pop('permission', None)
+            if changes:
+                changes['name'] = name
+                ops.append(_op('team', 'update', username, name, data=changes))
+        elif existing is None:
+            data = dict((k, team[k]) for k in ('name',) + TEAM_FIELDS if team[k] is not None)
+            data.setdefault('permission', 'read')
+            ops.append(_op('team', 'create', username, name, data=data))
+        else:
+            name = existing['name']
+            changes = team_changes(existing, team)
+            if changes:
+                # The team name is required by the edit endpoint
+                changes['name'] = name
+                ops.append(_op('team', 'update', username, name, data=changes, id=existing['id']))
+            members = state['members'].get(existing['id'], set())
+
+        if team['members'] is None:
+            continue
+        # Logins are case-insensitive: compare them lower-cased, naming each
+        # user as listed for additions and as gitea spells it for removals
+        desired = dict((user.lower(), user) for user in team['members'])
+        members = dict((user.lower(), user) for user in members)
+        ops.extend(_op('member', 'add', username, desired[user], team=name)
+                   for user in sorted(set(desired) - set(members)))
+        ops.extend(_op('member', 'remove', username, members[user], team=name)
+                   for user in sorted(set(members) - set(desired)))
+
+    if prune and not new:
+        managed = set(team['name'].lower() for team in org['teams'])
+        for name, existing in sorted(current.items()):
+            if name not in managed and existing['name'] != OWNERS_TEAM:
+                ops.append(_op('team', 'delete', username, existing['name'], id=existing['id']))
+    return ops
+
+
+def plan(orgs, states, prune, creator=None):
+    """
+    The operations converging the current states to the desired orgs.
+    creator is the login user, which Gitea makes an owner of the orgs it
+    creates.
+    """
+    ops = []
+    for org, state in zip(orgs, states):
+        username = org['username']
+        current = state['org']
+        if org['state'] == 'absent':
+            if current:
+                # An organization cannot be deleted while it owns repositories
+                ops.extend(_op('repo', 'delete', current['username'], repo['name'])
+                           for (_, repo) in sorted(state['repos'].items()))
+                ops.append(_op('org', 'delete', current['username']))
+            continue
+
+        fields = dict((k, org[k]) for k in ORG_FIELDS)
+        new = current is None
+        if new:
+            data = dict((k, v) for (k, v) in fields.items() if v)
+            data['username'] = username
+            ops.append(_op('org', 'create', username, data=data))
+        else:
+            # Use the name as gitea spells it for every later operation
+            org = dict(org, username=current['username'])
+            changes = org_changes(current, fields)
+            if changes:
+                ops.append(_op('org', 'update', org['username'], data=changes))
+
+        if org['repos'] is not None:
+            ops.extend(_plan_repos(org, state, new, prune))
+        if org['teams'] is not None:
+            ops.extend(_plan_teams(org, state, new, prune, creator))
+    ops.sort(key=lambda op: op['wave'])
+    return ops
+
+
+def login_user(client, params):
+    """ The name of the user the requests are made as """
+    if params['login_user']:
+        return params['login_user']
+    return client.get('/user').raise_for_status().json()['login']
+
+
+def _team_id(client, op, team_ids):
+    """ The id of the team of an operation, listing the teams of a new org """
+    key = (op['org'].lower(), op['team'].lower())
+    if key not in team_ids:
+        for team in client.paginate('/orgs/{org}/teams', org=op['org']):
+            team_ids.setdefault((op['org'].lower(), team['name'].lower()), team['id'])
+    return team_ids.get(key)
+
+
+def _send(client, op, team_ids):
+    """ Send the request of an operation, returning the response """
+    kind, action, org, name = op['kind'], op['action'], op['org'], op['name']
+    if kind == 'org':
+        if action == 'create':
+            return client.post('/orgs', data=op['data'])
+        if action == 'update':
+            return client.patch('/orgs/{org}', data=op['data'], org=org)
+        return client.delete('/orgs/{org}', org=org)
+    if kind == 'repo':
+        if action == 'create':
+            return client.post('/org/{org}/repos', data=op['data'], org=org)
+        if action == 'update':
+            return client.patch('/repos/{owner}/{repo}', data=op['data'], owner=org, repo=name)
+        return client.delete('/repos/{owner}/{repo}', owner=org, repo=name)
+    if kind == 'team':
+        if action == 'create':
+            resp = client.post('/orgs/{org}/teams', data=op['data'], org=org)
+            if resp.ok:
+                team_ids[(org.lower(), name.lower())] = resp.json()['id']
+            return resp
+        team_id = op['id'] or _team_id(client, dict(op, team=name), team_ids)
+        if action == 'update':
+            return client.patch('/teams/{id}', data=op['data'], id=team_id)
+        return client.delete('/teams/{id}', id=team_id)
+    team_id = _team_id(client, op, team_ids)
+    if team_id is None:
+        raise GiteaError("Team {} of organization {} does not exist.".format(op['team'], org))
+    method = 'PUT' if action == 'add' else 'DELETE'
+    return client.request(method, '/teams/{id}/members/{user}', id=team_id, user=name)
+
+
+def _apply(client, op, team_ids):
+    """ Apply one operation, recording its outcome on it """
+    try:
+        resp = _send(client, op, team_ids)
+    except GiteaError as e:
+        op.update(failed=True, msg=str(e))
+        return
+    op['status'] = resp.status
+    # Deleting what is already gone is not an error
+    if resp.ok or (resp.status == 404 and op['action'] in ('delete', 'remove')):
+        op.update(failed=False, msg='')
+    else:
+        op.update(failed=True, msg=resp.message)
+
+
+def apply(client, ops, states, executor):
+    """
+    Apply the operations wave by wave, the operations of a wave concurrently.
+    Operations on an org whose creation or update failed are skipped.
+    """
+    team_ids = {}
+    for state in states:
+        for name, team in state['teams'].items():
+            team_ids[(state['org']['username'].lower(), name)] = team['id']
+
+    failed_orgs = set()
+    waves = defaultdict(list)
+    for op in ops:
+        waves[op['wave']].append(op)
+    for wave in sorted(waves):
+        batch = []
+        for op in waves[wave]:
+            if op['org'].lower() in failed_orgs:
+                op.update(status=None, failed=True,
+                          msg="Skipped, as organization {} failed.".format(op['org']))
+            else:
+                batch.append(op)
+        list(executor.map(lambda op: _apply(client, op, team_ids), batch))
+        failed_orgs.update(op['org'].lower() for op in batch if op['failed'] and op['kind'] == 'org')
+
+
+def run_module():
+    # define available arguments/parameters a user can pass to the module
+    module_args = dict(
+        orgs=dict(type='list', elements='dict', required=True, options=dict(
+            username=dict(type='str', required=True),
+            full_name=dict(type='str', required=False),
+            description=dict(type='str', required=False),
+            website=dict(type='str', required=False),
+            location=dict(type='str', required=False),
+            repos=dict(type='list', elements='dict', required=False, options=repo_spec()),
+            teams=dict(type='list', elements='dict', required=False, options=team_spec()),
+            state=dict(type='str', default="present", choices=["absent", "present"]),
+        )),
+        prune=dict(type='bool', required=False, default=False),
+        prune_orgs=dict(type='bool', required=False, default=False),
+        concurrency=dict(type='int', required=False, default=16),
+    )
+    module_args.update(gitea_argument_spec(index=False))
+
+    # the AnsibleModule object will be our abstraction working with Ansible
+    # this includes instantiation, a couple of common attr would be the
+    # args/params passed to the execution, as well as if the module
+    # supports check mode
+    module = AnsibleModule(
+        argument_spec=module_args,
+        mutually_exclusive=GITEA_MUTUALLY_EXCLUSIVE,
+        required_together=GITEA_REQUIRED_TOGETHER,
+        required_one_of=GITEA_REQUIRED_ONE_OF,
+        supports_check_mode=True,
+    )
+
+    orgs = module.params['orgs']
+    concurrency = max(1, module.params['concurrency'])
+    result = dict(changed=False, msg='', operations=[], summary={})
+    with gitea_client(module, pool_size=concurrency) as client:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            try:
+                existing = list_orgs(client)
+                if module.params['prune_orgs']:
+                    orgs = orgs + unlisted_orgs(orgs, existing)
+                states = snapshot(client, orgs, existing, executor)
+            except GiteaError as e:
+                result.update(msg="Unable to read the current state.", error=str(e))
+                module.fail_json(**report_timings(module, client, result))
+            creator = None
+            if any(state['org'] is None for state in states):
+                try:
+                    creator = login_user(client, module.params)
+                except GiteaError as e:
+                    result.update(msg="Unable to read the login user.", error=str(e))
+                    module.fail_json(**report_timings(module, client, result))
+            ops = plan(orgs, states, module.params['prune'], creator)
+            if not module.check_mode:
+                apply(client, ops, states, executor)
+
+    summary = defaultdict(lambda: defaultdict(int))
+    for op in ops:
+        summary[op['kind']][op['action']] += 1
+    operations = [dict((k, op.get(k)) for k in ('wave', 'kind', 'action', 'target', 'status',
+                                                 'failed', 'msg'))
+                  for op in ops]
+    failed = [op for op in operations if op['failed']]
+    result.update(
+        changed=any(not op['failed'] for op in operations),
+        operations=operations,
+        summary=dict((k, dict(v)) for (k, v) in summary.items()),
+        msg="{} operations in {} waves, {} failed.".format(
+            len(ops), len(set(op['wave'] for op in ops)), len(failed)),
+    )
+    report_timings(module, client, result)
+    if failed:
+        module.fail_json(**result)
+    module.exit_json(**result)
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
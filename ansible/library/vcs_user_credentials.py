@@ -0,0 +1,191 @@
+#!/usr/bin/python
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+
+DOCUMENTATION = '''
+---
+module: vcs_user_credentials
+short_description: Reads the VCS user credentials from their Kubernetes secret.
+version_added: "2.5"
+description:
+    - Reads the username and password of the VCS admin user from the
+      vcs-user-credentials secret with one Kubernetes API call, and returns
+      them decoded as the vcs_username and vcs_password facts.
+    - Uses the kubernetes Python client if it is installed, with the
+      kubeconfig if there is one or else the in-cluster configuration;
+      otherwise runs kubectl get secret once, without a shell, so the
+      password never goes through a pipeline.
+    - Supports check mode.
+
+options:
+    name:
+        description:
+            - Name of the secret
+        required: false
+        default: vcs-user-credentials
+    namespace:
+        description:
+            - Namespace of the secret
+        required: false
+        default: services
+    username_key:
+        description:
+            - Key of the username in the secret
+        required: false
+        default: vcs_username
+    password_key:
+        description:
+            - Key of the password in the secret
+        required: false
+        default: vcs_password
+    kubeconfig:
+        description:
+            - Path of the kubeconfig file to use, defaults to that of the
+              kubernetes client or kubectl
+        required: false
+        type: path
+
+author:
+    - Cray-HPE CMS team
+'''
+
+EXAMPLES = '''
+# Set vcs_username and vcs_password once for all hosts of the play
+- name: Read gitea credentials
+  vcs_user_credentials:
+  run_once: true
+  no_log: true
+  when: vcs_password is not defined
+'''
+
+RETURN = '''
+ansible_facts:
+  description: The decoded credentials
+  returned: success
+  type: dict
+  contains:
+    vcs_username:
+      description: The VCS username
+      type: str
+    vcs_password:
+      description: The VCS password
+      type: str
+source:
+  description: How the secret was read, api or kubectl
+  returned: success
+  type: str
+  sample: api
+'''
+from ansible.module_utils.basic import AnsibleModule
+
+import base64
+import json
+import os
+
+try:
+    import kubernetes.client
+    import kubernetes.config
+    HAS_KUBERNETES = True
+except ImportError:
+    HAS_KUBERNETES = False
+
+
+def _read_with_client(module):
+    """ The data of the secret through the kubernetes client, or None if unconfigured """
+    params = module.params
+    try:
+        if params['kubeconfig'] or os.environ.get('KUBECONFIG') or \
+                os.path.exists(os.path.expanduser('~/.kube/config')):
+            kubernetes.config.load_kube_config(config_file=params['kubeconfig'])
+        else:
+            kubernetes.config.load_incluster_config()
+    except kubernetes.config.ConfigException:
+        return None
+    try:
+        secret = kubernetes.client.CoreV1Api().read_namespaced_secret(
+            params['name'], params['namespace'])
+    except kubernetes.client.rest.ApiException as e:
+        module.fail_json(msg="Could not read secret {}/{}: {} {}".format(
+            params['namespace'], params['name'], e.status, e.reason))
+    return secret.data or {}
+
+
+def _read_with_kubectl(module):
+    """ The data of the secret from one kubectl get, run without a shell """
+    params = module.params
+    cmd = [module.get_bin_path('kubectl', required=True)]
+    if params['kubeconfig']:
+        cmd += ['--kubeconfig', params['kubeconfig']]
+    cmd += ['get', 'secret', '-n', params['namespace'], params['name'], '-o', 'json']
+    rc, out, err = module.run_command(cmd)
+    if rc != 0:
+        module.fail_json(msg="Could not read secret {}/{}: {}".format(
+            params['namespace'], params['name'], err.strip()))
+    return json.loads(out).get('data') or {}
+
+
+def run_module():
+    # define available arguments/parameters a user can pass to the module
+    module_args = dict(
+        name=dict(type='str', required=False, default='vcs-user-credentials'),
+        namespace=dict(type='str', required=False, default='services'),
+        username_key=dict(type='str', required=False, default='vcs_username', no_log=False),
+        password_key=dict(type='str', required=False, default='vcs_password', no_log=False),
+        kubeconfig=dict(type='path', required=False),
+    )
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True,
+    )
+
+    data, source = None, 'api'
+    if HAS_KUBERNETES:
+        data = _read_with_client(module)
+    if data is None:
+        data, source = _read_with_kubectl(module), 'kubectl'
+
+    credentials = {}
+    for fact, key in (('vcs_username', 'username_key'), ('vcs_password', 'password_key')):
+        key = module.params[key]
+        if key not in data:
+            module.fail_json(msg="Secret {}/{} has no {} key.".format(
+                module.params['namespace'], module.params['name'], key))
+        credentials[fact] = base64.b64decode(data[key]).decode('utf-8')
+
+    module.exit_json(changed=False, source=source, ansible_facts=credentials)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
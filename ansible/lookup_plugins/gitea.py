@@ -0,0 +1,166 @@
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+---
+lookup: gitea
+short_description: Lists Gitea organizations and repositories.
+description:
+    - Enumerates organizations, the repositories of organizations, or
+      repositories matching a search, walking the paginated Gitea API.
+    - Pages are fetched concurrently ahead of processing, bounded by
+      prefetch, and each item is reduced to a compact record of its key
+      fields as soon as its page is decoded.
+options:
+    _terms:
+        description:
+            - What to list, orgs or repos
+        required: true
+    org:
+        description:
+            - With repos, only list the repositories of these organizations
+        type: list
+        elements: str
+        required: false
+    query:
+        description:
+            - With repos, a search keyword for /repos/search
+        required: false
+    prefetch:
+        description:
+            - Maximum number of pages fetched concurrently
+        type: int
+        default: 4
+    limit:
+        description:
+            - Number of items per page
+        type: int
+        default: 50
+    gitea_url:
+        description:
+            - Base Url to the gitea API server
+        required: true
+    api_token:
+        description:
+            - If using token-based auth, the token to use
+        required: false
+    login_user:
+        description:
+            - Username, if using basic auth
+        required: false
+    login_password:
+        description:
+            - Password of the login_user, if using basic auth
+        required: false
+    validate_certs:
+        description:
+            - Whether to validate the TLS certificate of the gitea API server
+        type: bool
+        default: true
+    timeout:
+        description:
+            - Timeout in seconds for each request to the gitea API server
+        type: int
+        default: 30
+    retries:
+        description:
+            - Number of times a request is retried after a transient failure
+        type: int
+        default: 5
+'''
+
+EXAMPLES = '''
+- name: List every organization
+  debug:
+    msg: "{{ item.username }}"
+  loop: "{{ lookup('gitea', 'orgs', gitea_url=vcs_api_url, api_token=token, wantlist=True) }}"
+
+- name: Names of the repositories of two organizations
+  set_fact:
+    product_repos: "{{ lookup('gitea', 'repos', org=['cray', 'tenant_a'], gitea_url=vcs_api_url,
+                              login_user=vcs_username, login_password=vcs_password,
+                              wantlist=True) | map(attribute='full_name') | list }}"
+'''
+
+RETURN = '''
+_list:
+    description:
+        - One record per organization (id, username, full_name, visibility)
+          or repository (id, owner, name, full_name, private, mirror, empty,
+          archived, default_branch, updated)
+    type: list
+    elements: dict
+'''
+
+import os
+import runpy
+
+from ansible.errors import AnsibleError
+from ansible.plugins.lookup import LookupBase
+
+# The module_utils next to library/ are only put on the path of modules
+runpy.run_path(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'module_utils',
+                            'gitea_plugins.py'))
+
+from ansible.module_utils.gitea_client import GiteaClient, GiteaError  # noqa: E402
+from ansible.module_utils.gitea_inventory import walk_org_repos, walk_orgs, walk_repos  # noqa: E402
+
+
+class LookupModule(LookupBase):
+
+    def run(self, terms, variables=None, **kwargs):
+        self.set_options(var_options=variables, direct=kwargs)
+        prefetch = self.get_option('prefetch')
+        limit = self.get_option('limit')
+        client = GiteaClient(
+            self.get_option('gitea_url'),
+            api_token=self.get_option('api_token'),
+            login_user=self.get_option('login_user'),
+            login_password=self.get_option('login_password'),
+            validate_certs=self.get_option('validate_certs'),
+            timeout=self.get_option('timeout'),
+            retries=self.get_option('retries'),
+            pool_size=prefetch,
+        )
+
+        ret = []
+        try:
+            for term in terms:
+                if term == 'orgs':
+                    records = walk_orgs(client, limit=limit, prefetch=prefetch)
+                elif term == 'repos' and self.get_option('org'):
+                    records = (repo for org in self.get_option('org')
+                               for repo in walk_org_repos(client, org, limit=limit, prefetch=prefetch))
+                elif term == 'repos':
+                    records = walk_repos(client, self.get_option('query'), limit=limit, prefetch=prefetch)
+                else:
+                    raise AnsibleError("gitea lookup: unknown term {!r}, expected orgs or repos".format(term))
+                ret.extend(record._asdict() for record in records)
+        except GiteaError as e:
+            raise AnsibleError("gitea lookup failed: {}".format(e))
+        finally:
+            client.close()
+        return ret
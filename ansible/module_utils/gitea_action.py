@@ -0,0 +1,121 @@
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""
+Controller-side execution of the gitea modules, for the gitea action plugins.
+
+When the gitea_in_process variable is true, GiteaAction runs the module of
+its task, as found in ansible/library, in the controller process instead of
+shipping it to the target with AnsiballZ, so a task costs its API calls
+rather than a module transfer and a Python start. The clients of the module
+runs are shared (see gitea_client.share_clients) for the life of the worker
+process, which Ansible forks per task and host: the items of a loop
+therefore reuse the same keep-alive connections, and gitea_repo answers the
+items whose repository is already as wanted from one listing of the
+organization's repositories instead of a request each.
+
+Loop items are still run one at a time, each with its own API calls; to
+spread many items over concurrent requests, pass them to the bulk repos or
+orgs option of the module in a single task instead.
+
+Otherwise, as when the task runs asynchronously, the module runs on the
+target as usual.
+
+This module is only used on the controller; it is not shipped to targets.
+"""
+
+import contextlib
+import importlib.util
+import io
+import json
+import os
+
+from ansible.module_utils import basic
+from ansible.module_utils.gitea_client import share_clients
+from ansible.module_utils.parsing.convert_bool import boolean
+from ansible.plugins.action import ActionBase
+
+_LIBRARY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'library')
+
+# Module files loaded in this process, by path
+_modules = {}
+
+
+def _load(path):
+    if path not in _modules:
+        name = 'ansible_gitea_action_' + os.path.splitext(os.path.basename(path))[0]
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _modules[path] = module
+    return _modules[path]
+
+
+def run_in_process(path, args):
+    """ Run the module at path with args in this process, returning its result """
+    basic._ANSIBLE_ARGS = json.dumps(dict(ANSIBLE_MODULE_ARGS=args)).encode('utf-8')
+    if hasattr(basic, '_ANSIBLE_PROFILE'):
+        basic._ANSIBLE_PROFILE = 'legacy'
+    out = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(out):
+            try:
+                _load(path).main()
+            except SystemExit:
+                pass
+    finally:
+        basic._ANSIBLE_ARGS = None
+    try:
+        return json.loads(out.getvalue())
+    except ValueError:
+        return dict(failed=True, msg="Module {} returned no result.".format(os.path.basename(path)),
+                    module_stdout=out.getvalue())
+
+
+class GiteaAction(ActionBase):
+    """ Runs the gitea module of the task in the controller process """
+
+    def _module_path(self):
+        name = self._task.action.split('.')[-1]
+        path = self._shared_loader_obj.module_loader.find_plugin(name)
+        return path or os.path.join(_LIBRARY, name + '.py')
+
+    def run(self, tmp=None, task_vars=None):
+        task_vars = task_vars or {}
+        result = super(GiteaAction, self).run(tmp, task_vars)
+        del tmp  # tmp no longer has any effect
+
+        in_process = boolean(self._templar.template(task_vars.get('gitea_in_process', False)),
+                             strict=False)
+        if self._task.async_val or not in_process:
+            result.update(self._execute_module(task_vars=task_vars,
+                                               wrap_async=self._task.async_val))
+            return result
+
+        args = dict(self._task.args)
+        self._update_module_args(self._task.action, args, task_vars)
+        # Index repositories only for loops, where one listing saves a
+        # request per item
+        share_clients(index_repos=bool(self._task.loop or self._task.loop_with))
+        result.update(run_in_process(self._module_path(), args))
+        return result
@@ -0,0 +1,160 @@
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""
+On-disk cache of gitea GET responses for conditional requests.
+
+Responses carrying an ETag or Last-Modified validator are stored one file per
+entry, keyed by a hash of the URL and of the credentials used, so responses
+are never shared between identities and no secret is written to disk. The
+cache is bounded by entry count and total size; the least recently used
+entries are evicted first.
+
+The size of each entry is tracked in memory from one scan of the directory,
+so a put costs no directory listing. Only once a bound is crossed is the
+directory scanned again, to find the least recently used entries and pick up
+those written by other processes, and trimmed to LOW_WATER of its bounds so
+the next scan is many puts away.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+# The fraction of its bounds eviction trims the cache to
+LOW_WATER = 0.9
+
+
+class ResponseCache(object):
+    """ Size-bounded, file-per-entry cache of validated GET responses """
+
+    def __init__(self, path, max_entries=1024, max_bytes=64 * 1024 * 1024):
+        self.path = os.path.expanduser(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # The size of each entry file by name, and their total, once scanned
+        self._sizes = None
+        self._total = 0
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path, mode=0o700)
+
+    @staticmethod
+    def key(url, identity):
+        """ The cache key of a URL requested with the given Authorization """
+        digest = hashlib.sha256()
+        digest.update(hashlib.sha256(identity.encode('utf-8')).digest())
+        digest.update(url.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.path, key + '.json')
+
+    def get(self, key):
+        """ The cached entry for key, or None """
+        try:
+            with open(self._file(key)) as f:
+                entry = json.load(f)
+            # Mark the entry as recently used for eviction
+            os.utime(self._file(key), None)
+        except (IOError, OSError, ValueError):
+            return None
+        return entry
+
+    def conditional_headers(self, entry):
+        """ The If-None-Match/If-Modified-Since headers validating an entry """
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def put(self, key, url, headers, body):
+        """ Store a 200 response if it carries a validator """
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if not (etag or last_modified):
+            return
+        entry = dict(url=url, etag=etag, last_modified=last_modified,
+                     body=body.decode('utf-8'))
+        data = json.dumps(entry).encode('utf-8')
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, self._file(key))
+        except (IOError, OSError):
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            if self._sizes is None:
+                self._scan()
+            else:
+                name = key + '.json'
+                self._total += len(data) - self._sizes.get(name, 0)
+                self._sizes[name] = len(data)
+            if self._over(1.0):
+                self._evict()
+
+    def evict(self):
+        """ Remove least recently used entries until within LOW_WATER of the bounds """
+        with self._lock:
+            self._evict()
+
+    def _over(self, fraction):
+        return (len(self._sizes) > self.max_entries * fraction or
+                self._total > self.max_bytes * fraction)
+
+    def _scan(self):
+        """ List the entries with their sizes, least recently used first """
+        entries = []
+        for name in os.listdir(self.path):
+            if not name.endswith('.json'):
+                continue
+            try:
+                st = os.stat(os.path.join(self.path, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+        entries.sort()
+        self._sizes = dict((name, size) for (_, size, name) in entries)
+        self._total = sum(self._sizes.values())
+        return entries
+
+    def _evict(self):
+        entries = self._scan()
+        # The newest entry is kept unless it is beyond the bounds on its own
+        while entries and self._over(LOW_WATER) and (len(entries) > 1 or self._over(1.0)):
+            _, size, name = entries.pop(0)
+            try:
+                os.unlink(os.path.join(self.path, name))
+            except OSError:
+                pass
+            del self._sizes[name]
+            self._total -= size
@@ -0,0 +1,955 @@
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""
+Shared HTTP client for the gitea Ansible modules.
+
+The client keeps a pool of keep-alive connections to the gitea API server,
+computes the Authorization header once, and retries requests that fail with
+a connection error or a transient status (429, 502, 503, 504) using
+exponential backoff with full jitter, honouring any Retry-After header.
+Requests in flight are bounded by an AdaptiveLimiter adjusting to the
+server's latency and overload responses, and writes may be rate limited
+(see gitea_limiter).
+
+GET responses may be cached on disk (see gitea_cache) and revalidated with
+conditional requests, a 304 being served from the cache. Every call may be
+timed and accounted by a RequestRecorder (see gitea_metrics). Large bodies,
+such as repository archives, can be streamed to disk and resumed with
+download().
+
+With index_path, whether organizations and repositories exist, and their
+key attributes, are looked up in an on-disk snapshot index refreshed
+incrementally (see gitea_index) instead of being asked of the server.
+
+Responses are requested gzip compressed and decompressed as they are read.
+paginate() decodes each page of a list endpoint while it is received (see
+gitea_json), yielding items without holding the page in memory.
+
+When the modules are run in the controller process by the gitea action
+plugins, share_clients() makes gitea_client() reuse one client, and its
+connections, for every module run with the same server and credentials.
+
+It only depends on the standard library so it can be shipped to targets by
+AnsiballZ as well as used from controller-side plugins.
+"""
+
+import http.client as http_client
+import json
+import os
+import queue
+import random
+import socket
+import ssl
+import threading
+import time
+import zlib
+from base64 import b64encode
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from urllib.parse import quote, urlencode, urlparse
+
+from ansible.module_utils.gitea_cache import ResponseCache
+from ansible.module_utils.gitea_index import SnapshotIndex
+from ansible.module_utils.gitea_json import ItemDecoder
+from ansible.module_utils.gitea_limiter import AdaptiveLimiter, TokenBucket
+from ansible.module_utils.gitea_metrics import RequestRecorder
+
+RETRY_STATUSES = frozenset((429, 502, 503, 504))
+
+# Bytes read from a response at a time
+READ_SIZE = 64 * 1024
+
+# Methods which do not change state, and are not subject to write_rate
+SAFE_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+
+# Path template fields holding a file path, whose slashes are not quoted
+PATH_FIELDS = frozenset(('filepath',))
+
+# Clients handed out by gitea_client() while sharing, see share_clients()
+_shared_clients = None
+_index_repos = False
+_shared_lock = threading.Lock()
+
+
+def gitea_argument_spec(cache=True, index=True):
+    """
+    Connection and auth options shared by all gitea modules. The response
+    cache (cache_dir) and snapshot index (index_path) options are only
+    added with cache and index, for the modules which make use of them.
+    """
+    spec = dict(
+        api_token=dict(type='str', required=False, no_log=True),
+        login_user=dict(type='str', required=False),
+        login_password=dict(type='str', required=False, no_log=True),
+        gitea_url=dict(type='str', required=True),
+        validate_certs=dict(type='bool', required=False, default=True),
+        timeout=dict(type='int', required=False, default=30),
+        retries=dict(type='int', required=False, default=5),
+        instrument=dict(type='bool', required=False, default=False),
+        trace_file=dict(type='path', required=False),
+        prometheus_textfile=dict(type='path', required=False),
+        adaptive_concurrency=dict(type='bool', required=False, default=True),
+        write_rate=dict(type='float', required=False, default=0),
+    )
+    if cache:
+        spec.update(
+            cache_dir=dict(type='path', required=False),
+            cache_max_entries=dict(type='int', required=False, default=1024),
+        )
+    if index:
+        spec.update(index_path=dict(type='path', required=False))
+    return spec
+
+
+GITEA_MUTUALLY_EXCLUSIVE = [
+    ['api_token', 'login_user'],
+    ['api_token', 'login_password'],
+]
+
+GITEA_REQUIRED_TOGETHER = [
+    ['login_user', 'login_password'],
+]
+
+GITEA_REQUIRED_ONE_OF = [
+    ['api_token', 'login_user'],
+]
+
+
+def auth_header(api_token=None, login_user=None, login_password=None):
+    """ The Authorization header value for token or basic auth """
+    if api_token:  # token
+        return 'token {}'.format(api_token)
+    credentials = '{}:{}'.format(login_user, login_password)  # basic
+    return 'Basic {}'.format(b64encode(credentials.encode('utf-8')).decode('ascii'))
+
+
+def gitea_client(module, pool_size=1):
+    """ Build a GiteaClient from the parameters of a gitea module """
+    params = module.params
+    cache = None
+    if params.get('cache_dir'):
+        cache = ResponseCache(params['cache_dir'], max_entries=params['cache_max_entries'])
+    recorder = None
+    if params['instrument'] or params['trace_file'] or params['prometheus_textfile']:
+        recorder = RequestRecorder(source=getattr(module, '_name', None),
+                                   trace_file=params['trace_file'],
+                                   prometheus_textfile=params['prometheus_textfile'])
+    if _shared_clients is not None:
+        return _shared_client(params, pool_size, cache, recorder)
+    snapshot = None
+    if params.get('index_path'):
+        snapshot = _snapshot_index(params)
+    limiter = None
+    if params['adaptive_concurrency'] and pool_size > 1:
+        limiter = AdaptiveLimiter(pool_size)
+    write_bucket = None
+    if params['write_rate'] > 0:
+        write_bucket = TokenBucket(params['write_rate'])
+    return GiteaClient(
+        params['gitea_url'],
+        api_token=params['api_token'],
+        login_user=params['login_user'],
+        login_password=params['login_password'],
+        validate_certs=params['validate_certs'],
+        timeout=params['timeout'],
+        retries=params['retries'],
+        pool_size=pool_size,
+        cache=cache,
+        recorder=recorder,
+        limiter=limiter,
+        write_bucket=write_bucket,
+        snapshot=snapshot,
+    )
+
+
+def _snapshot_index(params):
+    """ The snapshot index of index_path, for the server and credentials of params """
+    identity = '{}\0{}'.format(
+        params['gitea_url'].rstrip('/'),
+        auth_header(params['api_token'], params['login_user'], params['login_password']))
+    return SnapshotIndex(params['index_path'], identity)
+
+
+def share_clients(index_repos=False):
+    """
+    Make gitea_client() return one long-lived client per server, credentials
+    and connection settings instead of a new one per call, for modules run
+    in a long-lived process; closing such a client keeps its connections.
+    With index_repos the clients keep a repository index, see
+    GiteaClient.repo_exists.
+    """
+    global _shared_clients, _index_repos
+    with _shared_lock:
+        if _shared_clients is None:
+            _shared_clients = {}
+        _index_repos = index_repos
+        for client in _shared_clients.values():
+            client.repo_index = {} if index_repos else None
+
+
+def _shared_client(params, pool_size, cache, recorder):
+    key = (params['gitea_url'].rstrip('/'),
+           auth_header(params['api_token'], params['login_user'], params['login_password']),
+           params['validate_certs'], params['timeout'])
+    with _shared_lock:
+        client = _shared_clients.get(key)
+        if client is None:
+            client = GiteaClient(
+                params['gitea_url'],
+                api_token=params['api_token'],
+                login_user=params['login_user'],
+                login_password=params['login_password'],
+                validate_certs=params['validate_certs'],
+                timeout=params['timeout'],
+            )
+            client.shared = True
+            client.repo_index = {} if _index_repos else None
+            _shared_clients[key] = client
+    # The other settings are those of the current module run
+    client.retries = max(0, params['retries'])
+    client.cache = cache
+    client.recorder = recorder
+    client.pool.resize(pool_size)
+    # The limit learnt and the write tokens left carry over to the next run
+    if not params['adaptive_concurrency']:
+        client.limiter = None
+    elif client.limiter is None:
+        client.limiter = AdaptiveLimiter(max(pool_size, 2))
+    else:
+        client.limiter.resize(pool_size)
+    if params['write_rate'] <= 0:
+        client.write_bucket = None
+    elif client.write_bucket is None or client.write_bucket.rate != params['write_rate']:
+        client.write_bucket = TokenBucket(params['write_rate'])
+    # The index is refreshed once, when first consulted, for the whole play
+    if not params.get('index_path'):
+        client.snapshot = None
+    elif client.snapshot is None or client.snapshot.path != os.path.expanduser(params['index_path']):
+        client.snapshot = _snapshot_index(params)
+    return client
+
+
+def report_timings(module, client, result):
+    """
+    Add the timings of the client's calls to result if instrument is set,
+    with the state of its concurrency limiter, write rate limit and snapshot
+    index, if any.
+    """
+    if module.params['instrument'] and client.recorder is not None:
+        result['timings'] = client.recorder.timings()
+        if client.limiter is not None:
+            result['timings']['limiter'] = client.limiter.stats()
+        if client.write_bucket is not None:
+            result['timings']['write_wait_ms'] = round(client.write_bucket.waited * 1000.0, 3)
+        if client.snapshot is not None:
+            result['timings']['index'] = client.snapshot.stats()
+    return result
+
+
+class GiteaError(Exception):
+    """ A request to the gitea API server could not be completed """
+
+
+class GiteaTimeout(GiteaError):
+    """ No response was received from the gitea API server in time """
+
+
+class GiteaResponse(object):
+    """ A fully read response from the gitea API server """
+
+    def __init__(self, method, url, status, reason, headers, body, cached=False):
+        self.method = method
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+        self.cached = cached
+
+    @property
+    def ok(self):
+        return self.status < 400
+
+    def json(self):
+        """ The decoded JSON body, or an empty dict if there is none """
+        return json.loads(self.body) if self.body else {}
+
+    @property
+    def error(self):
+        return 'HTTP Error {}: {}'.format(self.status, self.reason)
+
+    @property
+    def message(self):
+        """ The gitea error message of a failed response, if it sent one """
+        try:
+            return self.json()['message']
+        except Exception:
+            return self.error
+
+    def raise_for_status(self):
+        """ Raise GiteaError for an error status, else return self """
+        if not self.ok:
+            raise GiteaError('{} {} failed: {}: {}'.format(self.method, self.url, self.error,
+                                                           self.message))
+        return self
+
+
+class ConnectionPool(object):
+    """ Thread-safe pool of keep-alive connections to one HTTP(S) server """
+
+    def __init__(self, base_url, maxsize=1, timeout=30, validate_certs=True):
+        parsed = urlparse(base_url)
+        self.scheme = parsed.scheme
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.base_path = parsed.path.rstrip('/')
+        self.timeout = timeout
+        self._context = None
+        if self.scheme == 'https':
+            self._context = ssl.create_default_context()
+            if not validate_certs:
+                self._context.check_hostname = False
+                self._context.verify_mode = ssl.CERT_NONE
+        self._idle = queue.LifoQueue(maxsize)
+
+    def _connect(self, timing=None):
+        if self.scheme == 'https':
+            conn = http_client.HTTPSConnection(self.host, self.port, timeout=self.timeout,
+                                               context=self._context)
+        else:
+            conn = http_client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        # Connect eagerly so the DNS, TCP and TLS setup can be timed apart
+        start = time.monotonic()
+        try:
+            conn.connect()
+        finally:
+            if timing is not None:
+                timing['connect'] = timing.get('connect', 0.0) + time.monotonic() - start
+        return conn
+
+    def _send(self, conn, method, path, body, headers):
+        conn.request(method, self.base_path + path, body=body, headers=headers)
+        return conn.getresponse()
+
+    def open(self, method, path, body=None, headers=None, timing=None):
+        """
+        Send a request, returning the (connection, response) pair with the
+        response body left unread, so it can be streamed. The caller must
+        read the body to the end and release() the connection, or close it.
+
+        If a timing dict is given, the seconds spent opening new connections
+        are added to its connect entry.
+        """
+        headers = headers or {}
+        try:
+            conn, reused = self._idle.get_nowait(), True
+        except queue.Empty:
+            conn, reused = self._connect(timing), False
+        try:
+            resp = self._send(conn, method, path, body, headers)
+        except (http_client.HTTPException, socket.error) as e:
+            conn.close()
+            if not (reused and isinstance(e, (ConnectionResetError, BrokenPipeError,
+                                              http_client.BadStatusLine))):
+                raise
+            # The server closed an idle keep-alive connection before reading
+            # the request; retry once on a fresh one.
+            conn = self._connect(timing)
+            try:
+                resp = self._send(conn, method, path, body, headers)
+            except (http_client.HTTPException, socket.error):
+                conn.close()
+                raise
+        return conn, resp
+
+    def request(self, method, path, body=None, headers=None, timing=None):
+        """
+        Send a request, returning the (response, body) pair, the body being
+        decompressed. If a timing dict is given, the bytes received are
+        added to its received entry.
+        """
+        conn, resp = self.open(method, path, body=body, headers=headers, timing=timing)
+        try:
+            data = b''.join(body_chunks(resp, timing))
+        except (http_client.HTTPException, socket.error):
+            conn.close()
+            raise
+        self.release(conn, resp)
+        return resp, data
+
+    def release(self, conn, resp):
+        """ Return a connection to the pool unless the server is closing it """
+        if resp.will_close:
+            conn.close()
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def resize(self, maxsize):
+        """ Keep up to maxsize idle connections, if more than now """
+        with self._idle.mutex:
+            self._idle.maxsize = max(self._idle.maxsize, maxsize)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def body_chunks(resp, timing=None, size=READ_SIZE):
+    """
+    Yield the body of a response in chunks as it is read, decompressed if it
+    is gzip encoded. The bytes received on the wire are added to the
+    received entry of timing, if given.
+    """
+    decompressor = None
+    if (resp.getheader('Content-Encoding') or '').lower() == 'gzip':
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        while True:
+            chunk = resp.read(size)
+            if not chunk:
+                break
+            if timing is not None:
+                timing['received'] = timing.get('received', 0) + len(chunk)
+            if decompressor is not None:
+                chunk = decompressor.decompress(chunk)
+            if chunk:
+                yield chunk
+        if decompressor is not None:
+            if not decompressor.eof:
+                raise http_client.IncompleteRead(b'')
+            chunk = decompressor.flush()
+            if chunk:
+                yield chunk
+    except zlib.error as e:
+        raise http_client.HTTPException('Invalid gzip encoded body: {}'.format(e))
+
+
+def _range_start(headers):
+    """ The first byte position of a Content-Range header, if any """
+    value = headers.get('Content-Range') or ''
+    try:
+        return int(value.split()[1].split('-')[0])
+    except (IndexError, ValueError):
+        return None
+
+
+def _retry_after(headers):
+    """ The delay in seconds requested by a Retry-After header, if any """
+    value = headers.get('Retry-After') if headers is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class GiteaClient(object):
+    """ Client for the gitea REST API with connection reuse and retries """
+
+    def __init__(self, base_url, api_token=None, login_user=None, login_password=None,
+                 validate_certs=True, timeout=30, retries=5, backoff=0.5, max_backoff=30.0,
+                 pool_size=1, cache=None, recorder=None, limiter=None, write_bucket=None,
+                 snapshot=None):
+        self.base_url = base_url.rstrip('/')
+        self.cache = cache
+        self.recorder = recorder
+        self.limiter = limiter
+        self.write_bucket = write_bucket
+        self.snapshot = snapshot
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.headers = {
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip',
+            'Authorization': auth_header(api_token, login_user, login_password),
+        }
+        self.pool = ConnectionPool(self.base_url, maxsize=max(1, pool_size), timeout=timeout,
+                                   validate_certs=validate_certs)
+        self.shared = False
+        # owner -> lower-case repository names, or None if not indexable
+        self.repo_index = None
+        self._index_lock = threading.Lock()
+
+    def close(self):
+        if not self.shared:
+            self.pool.close()
+            if self.snapshot is not None:
+                self.snapshot.close()
+        if self.recorder is not None:
+            self.recorder.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def url(self, path, query=None, **params):
+        """ Expand a path template such as /repos/{owner}/{repo} """
+        path = path.format(**dict((k, quote(str(v), safe='/' if k in PATH_FIELDS else ''))
+                                  for (k, v) in params.items()))
+        if query:
+            path += '?' + urlencode(dict((k, v) for (k, v) in query.items() if v is not None))
+        return path
+
+    def _delay(self, attempt, headers=None):
+        delay = _retry_after(headers)
+        if delay is None:
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+        return min(delay, self.max_backoff)
+
+    def request(self, method, path, data=None, query=None, headers=None, cache=True, retry=True,
+                **params):
+        """
+        Send a request to the API, retrying transient failures.
+
+        path is a template relative to gitea_url whose fields are filled from
+        params, URL-quoted. data, if not None, is sent as a JSON body. Error
+        statuses are returned, not raised, so callers can treat 404 or 409 as
+        they see fit; GiteaError is raised once retries are exhausted on
+        connection errors. GETs are revalidated against the response cache,
+        if any, unless cache is False. With retry False the request is sent
+        once, for calls which must not be repeated blindly.
+
+        Each call, including its retries, is timed by the recorder, if any,
+        under the path template rather than the expanded URL.
+        """
+        url = self.url(path, query, **params)
+        req_headers = dict(self.headers)
+        body = None
+        if data is not None:
+            req_headers['Content-Type'] = 'application/json'
+            body = json.dumps(data).encode('utf-8')
+        if headers:
+            req_headers.update(headers)
+
+        cache_key = entry = None
+        if method == 'GET' and cache and self.cache is not None:
+            cache_key = self.cache.key(self.base_url + url, self.headers['Authorization'])
+            entry = self.cache.get(cache_key)
+            if entry:
+                req_headers.update(self.cache.conditional_headers(entry))
+
+        retries = self.retries if retry else 0
+        attempt = 0
+        timing = dict(start=time.monotonic(), connect=0.0, backoff=0.0, received=0)
+        while True:
+            if self.write_bucket is not None and method not in SAFE_METHODS:
+                self.write_bucket.take()
+            self._acquire()
+            sent = time.monotonic()
+            try:
+                resp, resp_body = self.pool.request(method, url, body=body, headers=req_headers,
+                                                    timing=timing)
+            except (http_client.HTTPException, socket.error) as e:
+                self._release(path, None)
+                if attempt >= retries:
+                    self._record(method, path, -1, body, attempt, timing)
+                    error = GiteaTimeout if isinstance(e, socket.timeout) else GiteaError
+                    raise error('{} {}{} failed: {}'.format(method, self.base_url, url, e))
+                self._sleep(self._delay(attempt), timing)
+            else:
+                self._release(path, resp.status, time.monotonic() - sent, resp.headers)
+                if resp.status not in RETRY_STATUSES or attempt >= retries:
+                    response = GiteaResponse(method, self.base_url + url, resp.status, resp.reason,
+                                             resp.headers, resp_body)
+                    if cache_key is not None:
+                        response = self._cached(cache_key, entry, response)
+                    self._record(method, path, resp.status, body, attempt, timing, response.cached)
+                    return response
+                self._sleep(self._delay(attempt, resp.headers), timing)
+            attempt += 1
+
+    def download(self, path, filename, part=None, chunk_size=1024 * 1024, hasher=None,
+                 query=None, **params):
+        """
+        Stream the body of a GET to filename, chunk_size bytes at a time.
+
+        The body is written to part (filename.part by default), which is
+        renamed to filename once complete and synced, so filename is never
+        left truncated. A part left by an earlier attempt or call is resumed
+        with a Range request; the server may answer 200 instead of 206, in
+        which case it is overwritten. Connection errors and transient
+        statuses are retried like in request(), each retry resuming where
+        the last one stopped.
+
+        If hasher is given, such as hashlib.sha256, the digest of the whole
+        file is computed as it is written. The response is returned with an
+        empty body and with size and digest attributes; error responses are
+        returned with their body, and nothing is renamed.
+        """
+        url = self.url(path, query, **params)
+        part = part or filename + '.part'
+        # Archives are compressed already, and ranges are of the bytes stored
+        req_headers = dict(self.headers, Accept='*/*')
+        req_headers['Accept-Encoding'] = 'identity'
+        retries = self.retries
+        attempt = 0
+        digest = None
+        timing = dict(start=time.monotonic(), connect=0.0, backoff=0.0, received=0)
+        while True:
+            offset = os.path.getsize(part) if os.path.exists(part) else 0
+            if offset:
+                req_headers['Range'] = 'bytes={}-'.format(offset)
+            else:
+                req_headers.pop('Range', None)
+            self._acquire()
+            status = None
+            try:
+                conn, resp = self.pool.open('GET', url, headers=req_headers, timing=timing)
+                status = resp.status
+                try:
+                    if resp.status == 206 and _range_start(resp.headers) == offset:
+                        mode = 'ab'
+                    elif resp.status == 200:
+                        mode = 'wb'
+                    else:
+                        body = b''.join(body_chunks(resp))
+                        mode = None
+                    if mode is not None:
+                        if mode == 'wb' or digest is None:
+                            digest = self._hash_part(part, hasher, mode)
+                        with open(part, mode) as f:
+                            while True:
+                                chunk = resp.read(chunk_size)
+                                if not chunk:
+                                    break
+                                f.write(chunk)
+                                timing['received'] += len(chunk)
+                                if digest is not None:
+                                    digest.update(chunk)
+                            f.flush()
+                            os.fsync(f.fileno())
+                except BaseException:
+                    conn.close()
+                    raise
+                self.pool.release(conn, resp)
+            except (http_client.HTTPException, socket.error) as e:
+                self._release(path, None)
+                if attempt >= retries:
+                    self._record('GET', path, -1, None, attempt, timing)
+                    error = GiteaTimeout if isinstance(e, socket.timeout) else GiteaError
+                    raise error('GET {}{} failed: {}'.format(self.base_url, url, e))
+                # Hash what was written when resuming, it may be incomplete
+                digest = None
+                self._sleep(self._delay(attempt), timing)
+                attempt += 1
+                continue
+            except BaseException:
+                self._release(path, status)
+                raise
+            # The duration of a streamed body says nothing about the server
+            self._release(path, resp.status, headers=resp.headers)
+
+            if mode is not None:
+                os.replace(part, filename)
+                response = GiteaResponse('GET', self.base_url + url, resp.status, resp.reason,
+                                         resp.headers, b'')
+                response.size = os.path.getsize(filename)
+                response.digest = digest.hexdigest() if digest is not None else None
+                self._record('GET', path, resp.status, None, attempt, timing)
+                return response
+            timing['received'] += len(body)
+            if resp.status == 416 and offset:
+                # The part is not a prefix of the current content; restart
+                os.unlink(part)
+            elif resp.status not in RETRY_STATUSES or attempt >= retries:
+                self._record('GET', path, resp.status, None, attempt, timing)
+                return GiteaResponse('GET', self.base_url + url, resp.status, resp.reason,
+                                     resp.headers, body)
+            else:
+                self._sleep(self._delay(attempt, resp.headers), timing)
+            attempt += 1
+
+    def _acquire(self):
+        if self.limiter is not None:
+            self.limiter.acquire()
+
+    def _release(self, path, status, latency=None, headers=None):
+        if self.limiter is None:
+            return
+        pause = _retry_after(headers) if status in RETRY_STATUSES else None
+        self.limiter.release(path, status, latency=latency, headers=headers, pause=pause)
+
+    @staticmethod
+    def _hash_part(part, hasher, mode):
+        """ A hasher fed the part about to be appended to, or a new one """
+        if hasher is None:
+            return None
+        digest = hasher()
+        if mode == 'ab':
+            with open(part, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+        return digest
+
+    @staticmethod
+    def _sleep(delay, timing):
+        time.sleep(delay)
+        timing['backoff'] += delay
+
+    def _record(self, method, path, status, body, attempt, timing, cached=False):
+        if self.recorder is None:
+            return
+        self.recorder.record(method, path, status, time.monotonic() - timing['start'],
+                             connect=timing['connect'], backoff=timing['backoff'],
+                             attempts=attempt + 1,
+                             bytes_sent=len(body or b'') * (attempt + 1),
+                             bytes_received=timing['received'], cached=cached)
+
+    def repo_exists(self, owner, name):
+        """
+        Whether the organization owner has a repository called name, from the
+        snapshot index or the repository index, or None if that is not
+        known. For the repository index, the first call for an owner lists
+        all of its repositories; the index is then kept up to date through
+        repo_indexed. Without an index, always None.
+        """
+        if self.snapshot is not None:
+            try:
+                return self.snapshot.repo(self, owner, name) is not None
+            except GiteaError:
+                return None
+        if self.repo_index is None:
+            return None
+        owner = owner.lower()
+        with self._index_lock:
+            if owner not in self.repo_index:
+                try:
+                    self.repo_index[owner] = set(
+                        repo['name'].lower() for repo in
+                        self.paginate('/orgs/{org}/repos', limit=50, org=owner))
+                except GiteaError:
+                    self.repo_index[owner] = None
+            names = self.repo_index[owner]
+        return None if names is None else name.lower() in names
+
+    def repo_indexed(self, owner, name, exists, repo=None):
+        """
+        Record a repository created (repo being its representation, if
+        known) or deleted in the indexes, if any
+        """
+        if self.snapshot is not None and (repo or not exists):
+            self.snapshot.repo_changed(owner, name, repo if exists else None)
+        if self.repo_index is None:
+            return
+        with self._index_lock:
+            names = self.repo_index.get(owner.lower())
+            if names is not None:
+                (names.add if exists else names.discard)(name.lower())
+
+    def org_exists(self, name):
+        """
+        The indexed fields of the organization called name as a dict, from
+        the snapshot index, False if it does not exist, or None if that is
+        not known
+        """
+        if self.snapshot is None:
+            return None
+        try:
+            org = self.snapshot.org(self, name)
+        except GiteaError:
+            return None
+        return False if org is None else org
+
+    def org_indexed(self, name, org=None):
+        """ Record an organization created or updated (org being its representation) or deleted """
+        if self.snapshot is not None:
+            self.snapshot.org_changed(name, org)
+
+    def _cached(self, key, entry, response):
+        """ Serve a 304 from the cache entry, or store a fresh 200 """
+        if response.status == 304 and entry:
+            return GiteaResponse(response.method, response.url, 200, 'OK', response.headers,
+                                 entry['body'].encode('utf-8'), cached=True)
+        if response.status == 200:
+            self.cache.put(key, response.url, response.headers, response.body)
+        return response
+
+    def _page(self, path, page, limit, query, params):
+        query = dict(query or {}, page=page, limit=limit)
+        resp = self.get(path, query=query, **params).raise_for_status()
+        items = resp.json()
+        # Search endpoints wrap their results in a data field
+        if isinstance(items, dict):
+            items = items.get('data') or []
+        return resp, items
+
+    def iter_pages(self, path, limit=50, prefetch=1, query=None, **params):
+        """
+        Yield the pages (lists of items) of a list endpoint in order.
+
+        The first page is fetched alone. Gitea caps the size of pages at
+        its MAX_RESPONSE_ITEMS, so the pages are as large as the first one
+        when it is short of the total. If the server reports the total with
+        X-Total-Count, up to prefetch further pages are then fetched
+        concurrently ahead of the consumer; otherwise pages are fetched one
+        at a time until the total is reached, or else until a short or
+        empty one. At most prefetch + 1 pages are held in memory either way.
+        """
+        resp, items = self._page(path, 1, limit, query, params)
+        yield items
+        total = resp.headers.get('X-Total-Count')
+        size = min(limit, len(items))
+        if not size or (total is not None and len(items) >= int(total)):
+            return
+        if total is None or prefetch <= 1:
+            page = 1
+            seen = len(items)
+            while items and (seen < int(total) if total is not None else len(items) >= size):
+                page += 1
+                _, items = self._page(path, page, limit, query, params)
+                seen += len(items)
+                yield items
+            return
+
+        last = (int(total) + size - 1) // size
+        with ThreadPoolExecutor(max_workers=prefetch) as executor:
+            window = deque()
+            next_page = 2
+            while window or next_page <= last:
+                while next_page <= last and len(window) < prefetch:
+                    window.append(executor.submit(self._page, path, next_page, limit, query, params))
+                    next_page += 1
+                yield window.popleft().result()[1]
+
+    def _stream_page(self, path, page, limit, query, params, meta):
+        """
+        Yield the items of one page of a list endpoint as they are decoded
+        from the response, setting meta['headers'] to its headers. Failures
+        before the first item are retried like in request(); GiteaError is
+        raised for those after it and for error statuses.
+        """
+        url = self.url(path, dict(query or {}, page=page, limit=limit), **params)
+        attempt = 0
+        timing = dict(start=time.monotonic(), connect=0.0, backoff=0.0, received=0)
+        while True:
+            yielded = False
+            self._acquire()
+            sent = time.monotonic()
+            try:
+                conn, resp = self.pool.open('GET', url, headers=self.headers, timing=timing)
+            except (http_client.HTTPException, socket.error) as e:
+                self._release(path, None)
+                error = e
+            else:
+                # The slot is freed once the headers are in, as the time the
+                # consumer takes over the items says nothing of the server
+                self._release(path, resp.status, time.monotonic() - sent, resp.headers)
+                error = None
+                try:
+                    if resp.status == 200:
+                        meta['headers'] = resp.headers
+                        decoder = ItemDecoder()
+                        for chunk in body_chunks(resp, timing):
+                            for item in decoder.feed(chunk):
+                                yielded = True
+                                yield item
+                        for item in decoder.close():
+                            yield item
+                        body = b''
+                    else:
+                        body = b''.join(body_chunks(resp, timing))
+                except (http_client.HTTPException, socket.error, ValueError) as e:
+                    conn.close()
+                    error = e
+                except BaseException:
+                    # Including the consumer closing the generator early
+                    conn.close()
+                    raise
+                else:
+                    self.pool.release(conn, resp)
+            if error is not None:
+                if yielded or attempt >= self.retries:
+                    self._record('GET', path, -1, None, attempt, timing)
+                    raise GiteaError('GET {}{} failed: {}'.format(self.base_url, url, error))
+                self._sleep(self._delay(attempt), timing)
+            elif resp.status in RETRY_STATUSES and attempt < self.retries:
+                self._sleep(self._delay(attempt, resp.headers), timing)
+            else:
+                self._record('GET', path, resp.status, None, attempt, timing)
+                GiteaResponse('GET', self.base_url + url, resp.status, resp.reason, resp.headers,
+                              body).raise_for_status()
+                return
+            attempt += 1
+
+    def paginate(self, path, limit=50, prefetch=1, query=None, **params):
+        """
+        Yield the items of every page of a list endpoint.
+
+        Unless pages are prefetched or responses cached, each page is
+        decoded as it is received, so only the item being yielded is held
+        in memory. Pages are then requested until the total reported with
+        X-Total-Count is reached, or else until a short or empty page, pages
+        being as large as the first one as in iter_pages().
+        """
+        if prefetch > 1 or self.cache is not None:
+            for items in self.iter_pages(path, limit=limit, prefetch=prefetch, query=query, **params):
+                for item in items:
+                    yield item
+            return
+        page = 1
+        seen = 0
+        size = limit
+        while True:
+            meta = {}
+            count = 0
+            for item in self._stream_page(path, page, limit, query, params, meta):
+                count += 1
+                yield item
+            seen += count
+            if page == 1:
+                size = min(limit, count)
+            total = meta['headers'].get('X-Total-Count')
+            if count == 0 or (seen >= int(total) if total is not None else count < size):
+                return
+            page += 1
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, data=None, **kwargs):
+        return self.request('POST', path, data=data, **kwargs)
+
+    def put(self, path, data=None, **kwargs):
+        return self.request('PUT', path, data=data, **kwargs)
+
+    def patch(self, path, data=None, **kwargs):
+        return self.request('PATCH', path, data=data, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request('DELETE', path, **kwargs)
@@ -0,0 +1,91 @@
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""
+The fields of gitea organizations, teams and repositories managed by the
+gitea modules, and how to tell which of them differ from the current ones.
+"""
+
+ORG_FIELDS = ('full_name', 'description', 'website', 'location')
+
+TEAM_FIELDS = ('description', 'permission', 'units', 'includes_all_repositories',
+               'can_create_org_repo')
+
+# The fields of an existing repository which can be changed
+REPO_EDIT_FIELDS = ('description', 'private', 'website')
+
+# The team every organization has, which cannot be deleted
+OWNERS_TEAM = 'Owners'
+
+
+def team_spec():
+    """ The argument spec of a team, with its members """
+    return dict(
+        name=dict(type='str', required=True),
+        description=dict(type='str', required=False),
+        permission=dict(type='str', required=False, choices=['read', 'write', 'admin']),
+        units=dict(type='list', elements='str', required=False),
+        includes_all_repositories=dict(type='bool', required=False),
+        can_create_org_repo=dict(type='bool', required=False),
+        members=dict(type='list', elements='str', required=False),
+        state=dict(type='str', default="present", choices=["absent", "present"]),
+    )
+
+
+def org_changes(current, org_fields):
+    """ The desired org fields which differ from the current org, for a PATCH """
+    return dict((k, v) for (k, v) in org_fields.items()
+                if v is not None and k != 'username' and current.get(k) != v)
+
+
+def team_changes(current, team):
+    """ The desired team fields which differ from the current team, for a PATCH """
+    changes = {}
+    for k in TEAM_FIELDS:
+        v = team.get(k)
+        if v is None:
+            continue
+        if k == 'units' and sorted(current.get(k) or []) == sorted(v):
+            continue
+        if current.get(k) != v:
+            changes[k] = v
+    return changes
+
+
+def repo_fields(params):
+    """ The fields of the repository creation request body """
+    return {
+        'name': params['name'],
+        'auto_init': params['auto_init'] or False,
+        'description': params['description'] or None,
+        'gitignores': params['gitignores'] or None,
+        'license': params['license'] or None,
+        'private': params['private'] or False,
+        'readme': params['readme'] or None,
+    }
+
+
+def repo_changes(current, repo):
+    """ The desired repository fields which differ from the current repository """
+    return dict((k, repo[k]) for k in REPO_EDIT_FIELDS
+                if repo.get(k) is not None and current.get(k) != repo[k])
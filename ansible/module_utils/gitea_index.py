@@ -0,0 +1,260 @@
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""
+On-disk snapshot index of gitea organizations and repositories.
+
+The index is a SQLite database holding the key attributes of every
+organization and repository visible to one identity on one server, so the
+modules can tell whether a write is needed without asking the server about
+each item. It is brought up to date once per client before it is first
+consulted:
+
+- repositories are listed most recently updated first and only until one is
+  reached that has not been updated since the last refresh, so a refresh
+  costs a page or two plus those changed. If the server then reports a
+  different total than the index holds, repositories were deleted or
+  renamed and the index is rebuilt from a full listing;
+- organizations have no update time and are few, so they are listed in full.
+
+Lookups are point queries, and listings are written a page at a time, so
+memory use does not depend on the number of items.
+"""
+
+import contextlib
+import hashlib
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from ansible.module_utils.gitea_fields import ORG_FIELDS
+
+SCHEMA_VERSION = '1'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS orgs (
+    name TEXT PRIMARY KEY, id INTEGER, username TEXT, full_name TEXT, description TEXT,
+    website TEXT, location TEXT, visibility TEXT, generation INTEGER);
+CREATE TABLE IF NOT EXISTS repos (
+    owner TEXT, name TEXT, id INTEGER, full_name TEXT, private INTEGER, mirror INTEGER,
+    empty INTEGER, archived INTEGER, default_branch TEXT, updated REAL, generation INTEGER,
+    PRIMARY KEY (owner, name));
+'''
+
+PAGE_SIZE = 50
+
+
+def _timestamp(value):
+    """ Seconds since the epoch of a gitea RFC 3339 time, 0 if missing """
+    if not value:
+        return 0.0
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+def _fields(cursor, row):
+    return dict((c[0], v) for (c, v) in zip(cursor.description, row) if c[0] != 'generation')
+
+
+class SnapshotIndex(object):
+    """ SQLite snapshot of the orgs and repos one identity sees on one server """
+
+    def __init__(self, path, identity):
+        self.path = os.path.expanduser(path)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory, mode=0o700)
+        # The identity is only stored hashed, as the cache keys are
+        self.identity = hashlib.sha256(identity.encode('utf-8')).hexdigest()
+        self.refreshes = dict(orgs=0, repos=0, full=0)
+        self._fresh = set()
+        self._stats = None
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False,
+                                   isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(SCHEMA)
+        with self._transaction():
+            meta = dict(self._db.execute('SELECT key, value FROM meta'))
+            if meta.get('identity') != self.identity or meta.get('version') != SCHEMA_VERSION:
+                # Another server or user sees other items: start afresh
+                self._db.execute('DELETE FROM orgs')
+                self._db.execute('DELETE FROM repos')
+                self._db.execute('DELETE FROM meta')
+                self._set('identity', self.identity)
+                self._set('version', SCHEMA_VERSION)
+
+    def close(self):
+        # Kept for reporting once closed
+        self._stats = self.stats()
+        self._db.close()
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        self._db.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self._db.execute('ROLLBACK')
+            raise
+        self._db.execute('COMMIT')
+
+    def _get(self, key, default=None):
+        row = self._db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return default if row is None else row[0]
+
+    def _set(self, key, value):
+        self._db.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, str(value)))
+
+    def _ensure(self, client, kind):
+        """ Refresh the orgs or repos once for the lifetime of this index """
+        if kind in self._fresh:
+            return
+        if kind == 'orgs':
+            self._refresh_orgs(client)
+        else:
+            self._refresh_repos(client)
+        self._fresh.add(kind)
+        self.refreshes[kind] += 1
+
+    def _refresh_orgs(self, client):
+        with self._transaction():
+            generation = int(self._get('orgs_generation', 0)) + 1
+            for org in client.paginate('/orgs', limit=PAGE_SIZE):
+                self._db.execute(
+                    'INSERT OR REPLACE INTO orgs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (org['username'].lower(), org['id'], org['username'])
+                    + tuple(org.get(k) or '' for k in ORG_FIELDS)
+                    + (org.get('visibility') or 'public', generation))
+            self._db.execute('DELETE FROM orgs WHERE generation != ?', (generation,))
+            self._set('orgs_generation', generation)
+
+    def _search(self, client):
+        """ Yield (total, page) over every repository, most recently updated first """
+        page = 1
+        while True:
+            resp = client.get('/repos/search', cache=False, query=dict(
+                sort='updated', order='desc', page=page, limit=PAGE_SIZE)).raise_for_status()
+            items = resp.json().get('data') or []
+            total = resp.headers.get('X-Total-Count')
+            yield (int(total) if total is not None else None), items
+            if not items or (total is not None and (page - 1) * PAGE_SIZE + len(items) >= int(total)):
+                return
+            page += 1
+
+    def _upsert_repo(self, repo, generation):
+        self._db.execute(
+            'INSERT OR REPLACE INTO repos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (repo['owner']['login'].lower(), repo['name'].lower(), repo['id'], repo['full_name'],
+             int(bool(repo.get('private'))), int(bool(repo.get('mirror'))),
+             int(bool(repo.get('empty'))), int(bool(repo.get('archived'))),
+             repo.get('default_branch') or '', _timestamp(repo.get('updated_at')), generation))
+
+    def _indexed(self, repo, updated):
+        """ Whether the index holds repo as last updated at updated """
+        row = self._db.execute('SELECT updated FROM repos WHERE owner = ? AND name = ?',
+                               (repo['owner']['login'].lower(), repo['name'].lower())).fetchone()
+        return row is not None and row[0] == updated
+
+    def _refresh_repos(self, client):
+        with self._transaction():
+            watermark = self._get('repos_updated')
+            generation = int(self._get('repos_generation', 0))
+            if watermark is not None:
+                newest = float(watermark)
+                total = None
+                for total, items in self._search(client):
+                    stale = False
+                    for repo in items:
+                        updated = _timestamp(repo.get('updated_at'))
+                        # Repositories updated in the same second as the
+                        # last refresh may or may not have been seen by it
+                        if updated < float(watermark) or (
+                                updated == float(watermark) and self._indexed(repo, updated)):
+                            stale = True
+                            break
+                        newest = max(newest, updated)
+                        self._upsert_repo(repo, generation)
+                    if stale:
+                        break
+                count = self._db.execute('SELECT COUNT(*) FROM repos').fetchone()[0]
+                if total is not None and total == count:
+                    self._set('repos_updated', newest)
+                    return
+            # First refresh, or repositories went away: rebuild from a full listing
+            generation += 1
+            newest = 0.0
+            for _, items in self._search(client):
+                for repo in items:
+                    newest = max(newest, _timestamp(repo.get('updated_at')))
+                    self._upsert_repo(repo, generation)
+            self._db.execute('DELETE FROM repos WHERE generation != ?', (generation,))
+            self._set('repos_generation', generation)
+            self._set('repos_updated', newest)
+            self.refreshes['full'] += 1
+
+    def repo(self, client, owner, name):
+        """ The indexed fields of a repository as a dict, or None if it does not exist """
+        with self._lock:
+            self._ensure(client, 'repos')
+            cursor = self._db.execute('SELECT * FROM repos WHERE owner = ? AND name = ?',
+                                      (owner.lower(), name.lower()))
+            row = cursor.fetchone()
+            return None if row is None else _fields(cursor, row)
+
+    def org(self, client, name):
+        """ The indexed fields of an organization as a dict, or None if it does not exist """
+        with self._lock:
+            self._ensure(client, 'orgs')
+            cursor = self._db.execute('SELECT * FROM orgs WHERE name = ?', (name.lower(),))
+            row = cursor.fetchone()
+            return None if row is None else _fields(cursor, row)
+
+    def repo_changed(self, owner, name, repo=None):
+        """ Record a repository created (repo is its API representation) or deleted """
+        with self._lock, self._transaction():
+            if repo is None:
+                self._db.execute('DELETE FROM repos WHERE owner = ? AND name = ?',
+                                 (owner.lower(), name.lower()))
+            else:
+                self._upsert_repo(repo, int(self._get('repos_generation', 0)))
+
+    def org_changed(self, name, org=None):
+        """ Record an organization created or updated (org is its API representation) or deleted """
+        with self._lock, self._transaction():
+            self._db.execute('DELETE FROM orgs WHERE name = ?', (name.lower(),))
+            if org is not None:
+                self._db.execute(
+                    'INSERT INTO orgs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (org['username'].lower(), org['id'], org['username'])
+                    + tuple(org.get(k) or '' for k in ORG_FIELDS)
+                    + (org.get('visibility') or 'public', int(self._get('orgs_generation', 0))))
+
+    def stats(self):
+        if self._stats is not None:
+            return self._stats
+        with self._lock:
+            return dict(self.refreshes,
+                        orgs_indexed=self._db.execute('SELECT COUNT(*) FROM orgs').fetchone()[0],
+                        repos_indexed=self._db.execute('SELECT COUNT(*) FROM repos').fetchone()[0])
@@ -0,0 +1,74 @@
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""
+Streaming enumeration of gitea organizations and repositories.
+
+The walkers are generators over paginated list endpoints which reduce each
+item to a small namedtuple as soon as its page is decoded, so listing any
+number of repositories holds only the pages in flight in memory.
+"""
+
+from collections import namedtuple
+
+Org = namedtuple('Org', 'id username full_name visibility')
+
+Repo = namedtuple('Repo', 'id owner name full_name private mirror empty archived '
+                          'default_branch updated')
+
+
+def compact_org(item):
+    return Org(item['id'], item['username'], item.get('full_name') or '',
+               item.get('visibility') or 'public')
+
+
+def compact_repo(item):
+    return Repo(item['id'], item['owner']['login'], item['name'], item['full_name'],
+                item.get('private', False), item.get('mirror', False), item.get('empty', False),
+                item.get('archived', False), item.get('default_branch') or '',
+                item.get('updated_at') or '')
+
+
+def walk_orgs(client, limit=50, prefetch=1):
+    """ Yield every organization visible to the client """
+    for item in client.paginate('/orgs', limit=limit, prefetch=prefetch):
+        yield compact_org(item)
+
+
+def walk_org_repos(client, org, limit=50, prefetch=1):
+    """ Yield the repositories of one organization """
+    for item in client.paginate('/orgs/{org}/repos', limit=limit, prefetch=prefetch, org=org):
+        yield compact_repo(item)
+
+
+def walk_repos(client, query=None, limit=50, prefetch=1, **filters):
+    """
+    Yield the repositories matching a search, or every repository visible to
+    the client when no query is given. filters are passed through to
+    /repos/search, for example sort='updated' and order='desc'.
+    """
+    params = dict(filters)
+    if query:
+        params['q'] = query
+    for item in client.paginate('/repos/search', limit=limit, prefetch=prefetch, query=params):
+        yield compact_repo(item)
@@ -0,0 +1,158 @@
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""
+Incremental decoding of JSON list responses.
+
+An ItemDecoder is fed the body of a response in chunks as they are
+received, and returns the items of its top-level array, or of the array
+under one key of its top-level object (the data of search results), as soon
+as each is complete. Only the item being decoded is buffered, so a page of
+any size is never held whole, neither as text nor as objects.
+"""
+
+import codecs
+import json
+
+_WHITESPACE = ' \t\n\r'
+_DELIMITERS = ',]}:' + _WHITESPACE
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class ItemDecoder(object):
+    """ Streaming decoder of the items of a JSON array """
+
+    def __init__(self, key='data'):
+        self.key = key
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._state = 'start'
+        self._in_object = False
+        self._current_key = None
+
+    def feed(self, data, final=False):
+        """ Decode a chunk of the body, returning the items it completed """
+        self._buffer = self._buffer[self._pos:] + self._text.decode(data, final)
+        self._pos = 0
+        items = []
+        while self._step(items, final):
+            pass
+        return items
+
+    def close(self):
+        """ Decode the end of the body, raising ValueError if it is not a complete list """
+        items = self.feed(b'', final=True)
+        if self._state != 'done':
+            raise ValueError('Truncated JSON list at "{}"'.format(self._buffer[self._pos:][:40]))
+        return items
+
+    def _value(self, final):
+        """ Decode the value at the position, or None if it is not complete yet """
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, self._pos)
+        except ValueError:
+            if final:
+                raise
+            return None
+        # A number is only complete once followed by a delimiter: until then
+        # more digits, a fraction or an exponent may be to come, and a value
+        # such as 12. or 1e which is cut short decodes as a shorter number
+        if not final and (end == len(self._buffer) or
+                          (_is_number(value) and self._buffer[end] not in _DELIMITERS)):
+            return None
+        self._pos = end
+        return (value,)
+
+    def _step(self, items, final):
+        """ Advance over one token, returning False when more input is needed """
+        while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+            self._pos += 1
+        if self._pos >= len(self._buffer):
+            return False
+        char = self._buffer[self._pos]
+        state = self._state
+        if state == 'start':
+            if char == '[':
+                self._state = 'first_item'
+            elif char == '{':
+                self._in_object = True
+                self._state = 'first_key'
+            else:
+                raise ValueError('Expected a JSON list or object, not "{}"'.format(char))
+            self._pos += 1
+        elif state in ('first_key', 'next_key'):
+            if char == '}':
+                self._pos += 1
+                self._state = 'done'
+            elif char == ',' and state == 'next_key':
+                self._pos += 1
+                self._state = 'key'
+            elif state == 'first_key':
+                self._state = 'key'
+            else:
+                raise ValueError('Expected , or }} in JSON object, not "{}"'.format(char))
+        elif state == 'key':
+            value = self._value(final)
+            if value is None:
+                return False
+            self._current_key = value[0]
+            self._state = 'colon'
+        elif state == 'colon':
+            if char != ':':
+                raise ValueError('Expected : in JSON object, not "{}"'.format(char))
+            self._pos += 1
+            self._state = 'value'
+        elif state == 'value':
+            if self._current_key == self.key and char == '[':
+                self._pos += 1
+                self._state = 'first_item'
+            else:
+                # Other members are skipped
+                if self._value(final) is None:
+                    return False
+                self._state = 'next_key'
+        elif state in ('first_item', 'next_item'):
+            if char == ']':
+                self._pos += 1
+                self._state = 'next_key' if self._in_object else 'done'
+            elif char == ',' and state == 'next_item':
+                self._pos += 1
+                self._state = 'item'
+            elif state == 'first_item':
+                self._state = 'item'
+            else:
+                raise ValueError('Expected , or ] in JSON list, not "{}"'.format(char))
+        elif state == 'item':
+            value = self._value(final)
+            if value is None:
+                return False
+            items.append(value[0])
+            self._state = 'next_item'
+        else:
+            raise ValueError('Unexpected "{}" after the end of the JSON list'.format(char))
+        return True
@@ -0,0 +1,192 @@
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""
+Adaptive limits on the requests the gitea client sends.
+
+An AdaptiveLimiter bounds the number of requests in flight and adjusts the
+bound with AIMD, as TCP does its congestion window: it grows by one per
+response while below the first sign of congestion (slow start), then by one
+per window of responses, and shrinks multiplicatively when the server
+answers 429, 502, 503 or 504, a connection fails, latency rises well above
+the lowest seen for the same endpoint, or rate-limit headers say the quota
+is spent. Concurrent failures from one burst only shrink it once.
+
+A TokenBucket spaces out requests to a sustained rate with bursts, and is
+used for the requests which change state.
+"""
+
+import threading
+import time
+
+OVERLOAD_STATUSES = frozenset((429, 502, 503, 504))
+
+
+def _rate_limit_pause(headers):
+    """
+    Seconds to wait before the rate-limit quota is replenished, from
+    X-RateLimit-Remaining and X-RateLimit-Reset (epoch or delta seconds),
+    if the quota is spent.
+    """
+    if headers is None:
+        return None
+    remaining = headers.get('X-RateLimit-Remaining')
+    reset = headers.get('X-RateLimit-Reset')
+    try:
+        if remaining is None or int(remaining) > 0 or reset is None:
+            return None
+        reset = float(reset)
+    except ValueError:
+        return None
+    # Values larger than a day are epoch timestamps
+    return max(0.0, reset - time.time() if reset > 86400 else reset)
+
+
+class AdaptiveLimiter(object):
+    """ AIMD-controlled bound on the number of requests in flight """
+
+    def __init__(self, maximum, initial=2, minimum=1, backoff=0.5, latency_backoff=0.9,
+                 tolerance=2.0, min_delay=0.05, max_pause=30.0):
+        self.maximum = max(minimum, maximum)
+        self.minimum = minimum
+        self.limit = float(max(minimum, min(initial, self.maximum)))
+        self.backoff = backoff
+        self.latency_backoff = latency_backoff
+        self.tolerance = tolerance
+        self.min_delay = min_delay
+        self.max_pause = max_pause
+        self.in_flight = 0
+        self.peak = 0
+        self.increases = 0
+        self.decreases = 0
+        self.waits = 0
+        self._slow_start = True
+        self._baselines = {}
+        self._rtt = None
+        self._last_decrease = 0.0
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+
+    def resize(self, maximum):
+        """ Raise the ceiling on the limit, if above the current one """
+        with self._cond:
+            self.maximum = max(self.maximum, maximum)
+
+    def acquire(self):
+        """ Wait for a slot below the current limit and outside any pause """
+        with self._cond:
+            waited = False
+            while True:
+                delay = self._paused_until - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                elif self.in_flight < int(self.limit):
+                    break
+                else:
+                    self._cond.wait()
+                waited = True
+            self.waits += waited
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+
+    def release(self, key, status, latency=None, headers=None, pause=None):
+        """
+        Free a slot, adjusting the limit from the outcome of the request:
+        its status (None if no response was received), its latency in
+        seconds (None if not meaningful, e.g. for a streamed body) and the
+        response headers. key identifies the endpoint, as latencies are
+        only compared within one. pause is a delay requested by the
+        server, such as a Retry-After, which holds back every request.
+        """
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            pause = pause if pause is not None else _rate_limit_pause(headers)
+            if pause:
+                self._paused_until = max(self._paused_until, now + min(pause, self.max_pause))
+            if status is None or status in OVERLOAD_STATUSES or pause:
+                self._decrease(self.backoff, now)
+            elif latency is not None:
+                self._rtt = latency if self._rtt is None else 0.8 * self._rtt + 0.2 * latency
+                baseline = self._baselines.get(key)
+                if baseline is None or latency < baseline:
+                    self._baselines[key] = latency
+                else:
+                    # Drift up slowly, so a lastingly slower server is learnt
+                    self._baselines[key] = baseline + 0.01 * (latency - baseline)
+                if baseline is not None and latency > baseline * self.tolerance and \
+                        latency - baseline > self.min_delay:
+                    self._decrease(self.latency_backoff, now)
+                else:
+                    self._increase()
+            else:
+                self._increase()
+            self._cond.notify_all()
+
+    def _increase(self):
+        if self.limit >= self.maximum:
+            return
+        self.limit = min(self.maximum, self.limit + (1.0 if self._slow_start else 1.0 / self.limit))
+        self.increases += 1
+
+    def _decrease(self, factor, now):
+        # Decrease at most once per round trip, so the failures of requests
+        # sent together count as one congestion signal
+        if now - self._last_decrease < (self._rtt or 0.0):
+            return
+        self._slow_start = False
+        self._last_decrease = now
+        self.limit = max(self.minimum, self.limit * factor)
+        self.decreases += 1
+
+    def stats(self):
+        with self._cond:
+            return dict(limit=round(self.limit, 2), maximum=self.maximum, peak=self.peak,
+                        increases=self.increases, decreases=self.decreases, waits=self.waits)
+
+
+class TokenBucket(object):
+    """ Spaces out requests to rate per second on average, allowing bursts of burst """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self.tokens = self.burst
+        self.waited = 0.0
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        """ Take a token, sleeping until one is available; returns the seconds slept """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self._last) * self.rate)
+            self._last = now
+            # Reserve the token even if it is not there yet, so concurrent
+            # callers queue up behind each other
+            self.tokens -= 1.0
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.waited += delay
+        if delay:
+            time.sleep(delay)
+        return delay
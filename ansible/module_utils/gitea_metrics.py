@@ -0,0 +1,177 @@
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""
+Per-request timing and accounting for the gitea client.
+
+A RequestRecorder attached to a GiteaClient records every API call with its
+path template, status, duration, the part of it spent setting up
+connections (DNS, TCP and TLS) and backing off between retries, and the
+bytes exchanged. The records can be returned in module results, appended to
+an NDJSON trace file, and accumulated into a Prometheus textfile collector
+file on the controller.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+
+def _ms(seconds):
+    return round(seconds * 1000.0, 3)
+
+
+class RequestRecorder(object):
+    """ Thread-safe collector of API call records """
+
+    def __init__(self, source=None, trace_file=None, prometheus_textfile=None):
+        self.source = source
+        self.trace_file = trace_file
+        self.prometheus_textfile = prometheus_textfile
+        self.calls = []
+        self._flushed = 0
+        self._lock = threading.Lock()
+
+    def record(self, method, path, status, duration, connect=0.0, backoff=0.0, attempts=1,
+               bytes_sent=0, bytes_received=0, cached=False):
+        """ Record one API call; status is -1 if no response was received """
+        call = dict(
+            ts=round(time.time(), 6),
+            method=method,
+            path=path,
+            status=status,
+            duration_ms=_ms(duration),
+            connect_ms=_ms(connect),
+            backoff_ms=_ms(backoff),
+            attempts=attempts,
+            bytes_sent=bytes_sent,
+            bytes_received=bytes_received,
+            cached=cached,
+        )
+        with self._lock:
+            self.calls.append(call)
+
+    def counters(self):
+        """ Totals over all calls, overall and per endpoint """
+        with self._lock:
+            calls = list(self.calls)
+        totals = dict(requests=len(calls), attempts=0, retries=0, errors=0, cached=0,
+                      bytes_sent=0, bytes_received=0, duration_ms=0.0, connect_ms=0.0,
+                      backoff_ms=0.0, by_status={}, by_endpoint={})
+        by_status = defaultdict(int)
+        by_endpoint = defaultdict(lambda: dict(count=0, duration_ms=0.0, max_ms=0.0))
+        for call in calls:
+            totals['attempts'] += call['attempts']
+            totals['retries'] += call['attempts'] - 1
+            totals['errors'] += call['status'] < 0 or call['status'] >= 400
+            totals['cached'] += call['cached']
+            for k in ('bytes_sent', 'bytes_received', 'duration_ms', 'connect_ms', 'backoff_ms'):
+                totals[k] += call[k]
+            by_status[str(call['status'])] += 1
+            endpoint = by_endpoint['{} {}'.format(call['method'], call['path'])]
+            endpoint['count'] += 1
+            endpoint['duration_ms'] += call['duration_ms']
+            endpoint['max_ms'] = max(endpoint['max_ms'], call['duration_ms'])
+        for k in ('duration_ms', 'connect_ms', 'backoff_ms'):
+            totals[k] = round(totals[k], 3)
+        for endpoint in by_endpoint.values():
+            endpoint['duration_ms'] = round(endpoint['duration_ms'], 3)
+        totals['by_status'] = dict(by_status)
+        totals['by_endpoint'] = dict(by_endpoint)
+        return totals
+
+    def timings(self):
+        """ The structure returned as timings in module results """
+        with self._lock:
+            calls = list(self.calls)
+        return dict(calls=calls, counters=self.counters())
+
+    def flush(self):
+        """ Write out the calls recorded since the last flush, if configured """
+        with self._lock:
+            calls = self.calls[self._flushed:]
+            self._flushed = len(self.calls)
+        if not calls:
+            return
+        if self.trace_file:
+            self._write_trace(calls)
+        if self.prometheus_textfile:
+            self._write_prometheus(calls)
+
+    def _write_trace(self, calls):
+        extra = dict(source=self.source, pid=os.getpid())
+        data = ''.join(json.dumps(dict(call, **extra), sort_keys=True) + '\n' for call in calls)
+        # One write on an O_APPEND file keeps lines from concurrent runs whole
+        fd = os.open(os.path.expanduser(self.trace_file), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data.encode('utf-8'))
+        finally:
+            os.close(fd)
+
+    def _write_prometheus(self, calls):
+        path = os.path.expanduser(self.prometheus_textfile)
+        metrics = defaultdict(float)
+        for call in calls:
+            labels = 'method="{}",path="{}"'.format(call['method'], call['path'])
+            metrics['gitea_client_requests_total{{{},status="{}"}}'.format(labels, call['status'])] += 1
+            metrics['gitea_client_request_duration_seconds_sum{{{}}}'.format(labels)] += call['duration_ms'] / 1000.0
+            metrics['gitea_client_request_duration_seconds_count{{{}}}'.format(labels)] += 1
+            metrics['gitea_client_connect_seconds_total'] += call['connect_ms'] / 1000.0
+            metrics['gitea_client_backoff_seconds_total'] += call['backoff_ms'] / 1000.0
+            metrics['gitea_client_retries_total'] += call['attempts'] - 1
+            metrics['gitea_client_bytes_sent_total'] += call['bytes_sent']
+            metrics['gitea_client_bytes_received_total'] += call['bytes_received']
+
+        # Counters accumulate over the runs writing to the same file. The
+        # file is replaced atomically so the collector never reads it half
+        # written; concurrent writers may lose an update, not corrupt it.
+        try:
+            with open(path) as f:
+                for line in f:
+                    # Label values are path templates, which contain braces
+                    # but no spaces
+                    fields = line.split()
+                    if len(fields) == 2 and not line.startswith('#'):
+                        try:
+                            metrics[fields[0]] += float(fields[1])
+                        except ValueError:
+                            pass
+        except (IOError, OSError):
+            pass
+
+        lines = []
+        for name in ('requests_total', 'request_duration_seconds', 'connect_seconds_total',
+                     'backoff_seconds_total', 'retries_total', 'bytes_sent_total',
+                     'bytes_received_total'):
+            metric = 'gitea_client_' + name
+            lines.append('# TYPE {} {}'.format(metric, 'summary' if name.endswith('seconds') else 'counter'))
+            lines.extend('{} {}'.format(k, repr(round(v, 6))) for (k, v) in sorted(metrics.items())
+                         if k.split('{')[0] in (metric, metric + '_sum', metric + '_count'))
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
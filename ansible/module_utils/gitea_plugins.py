@@ -0,0 +1,46 @@
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""
+Makes the module_utils of this repository importable by the gitea action and
+lookup plugins.
+
+Ansible only puts the module_utils next to library/ on the path of the
+modules it ships to targets; plugins running in the controller find them
+through this file. Since it cannot be imported before it has run, plugins
+run it by path:
+
+    runpy.run_path(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'module_utils', 'gitea_plugins.py'))
+
+This module is only used on the controller; it is not shipped to targets.
+"""
+
+import os
+
+import ansible.module_utils
+
+MODULE_UTILS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+if MODULE_UTILS_DIR not in ansible.module_utils.__path__:
+    ansible.module_utils.__path__.append(MODULE_UTILS_DIR)
@@ -0,0 +1,50 @@
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""
+Makes the module_utils of this repository importable as
+ansible.module_utils, as Ansible does for the modules it runs, and
+provides a mock gitea API server to run the modules against.
+"""
+
+import os
+import sys
+
+import ansible.module_utils
+import pytest
+
+ansible.module_utils.__path__.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'module_utils'))
+
+# The mock server and the in-process module runner of the benchmarks
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'benchmarks'))
+
+
+@pytest.fixture
+def mock_gitea():
+    """ A running mock gitea API server """
+    from mock_gitea import MockGitea
+    mock = MockGitea()
+    mock.start()
+    yield mock
+    mock.stop()
@@ -0,0 +1,122 @@
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""
+Tests of the diff the Keycloak to Gitea user sync of keycloak-user.py makes.
+"""
+
+import importlib.util
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+_spec = importlib.util.spec_from_file_location('keycloak_user', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..', 'kubernetes', 'gitea', 'files',
+    'keycloak-user.py'))
+keycloak_user = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(keycloak_user)
+
+KEYCLOAK_USERS = [
+    dict(username='Alice', enabled=True),
+    dict(username='bob', enabled=True, email='bob@example.com'),
+    dict(username='carol', enabled=False),
+    dict(username='dave', enabled=True),
+    dict(username='erin', enabled=False),
+    dict(username='hank', enabled=False),
+    dict(username='service-account-gitea', enabled=True),
+]
+
+GITEA_USERS = [
+    dict(login='alice', login_name='alice', source_id=1, prohibit_login=False),
+    dict(login='carol', login_name='carol', source_id=1, prohibit_login=False),
+    dict(login='dave', login_name='dave', source_id=1, prohibit_login=True),
+    dict(login='frank', login_name='frank', source_id=1, prohibit_login=False),
+    dict(login='gina', login_name='gina', source_id=1, prohibit_login=True),
+    dict(login='hank', source_id=0, prohibit_login=False, is_admin=True),
+    dict(login='root', source_id=0, prohibit_login=False, is_admin=True),
+    dict(login='CrayVCS', source_id=0, prohibit_login=False),
+]
+
+
+class Sync(keycloak_user.GiteaUserSync):
+    """ A sync of fixed Keycloak and Gitea users """
+
+    def __init__(self, **kwargs):
+        super(Sync, self).__init__(None, 'http://gitea.invalid', 'crayvcs', 'password', source_id=1,
+                                   page_size=3, **kwargs)
+
+    def keycloak_users(self):
+        return iter(KEYCLOAK_USERS)
+
+    def gitea_users(self):
+        return iter(GITEA_USERS)
+
+
+def diff(sync):
+    db = sqlite3.connect(':memory:')
+    assert sync._gitea_table(db) == len(GITEA_USERS)
+    return dict((username, (action, data)) for (action, username, data) in sync.diff(db))
+
+
+def test_diff():
+    changes = diff(Sync())
+    assert dict((username, action) for (username, (action, _)) in changes.items()) == {
+        'alice': 'unchanged',
+        'bob': 'create',
+        'carol': 'disable',
+        'dave': 'enable',
+        'erin': 'unchanged',
+        'frank': 'disable',
+        'gina': 'unchanged',
+        'hank': 'unchanged',
+        'root': 'unchanged',
+        'crayvcs': 'unchanged',
+    }
+    # Creations carry the Keycloak user, changes the Gitea login of the account
+    assert changes['bob'][1]['email'] == 'bob@example.com'
+    assert changes['dave'][1][:2] == ('dave', 1)
+    assert changes['frank'][1][:2] == ('frank', 1)
+
+
+def test_missing_users_are_kept_without_disable_missing():
+    changes = diff(Sync(disable_missing=False))
+    assert changes['frank'][0] == 'unchanged'
+    assert changes['carol'][0] == 'disable'
+
+
+def test_dry_run_counts_the_changes(tmp_path):
+    counts = Sync(dry_run=True, scratch_dir=str(tmp_path)).run()
+    assert (counts['create'], counts['enable'], counts['disable'], counts['unchanged']) == (1, 1, 2, 6)
+    assert counts['gitea_users'] == len(GITEA_USERS)
+    # The scratch table is removed once the sync is done
+    assert os.listdir(str(tmp_path)) == []
+
+
+@pytest.mark.parametrize('window', [1, 3, 100])
+def test_bounded_map_keeps_the_order(window):
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(keycloak_user.bounded_map(executor, lambda x, y: x * y,
+                                                 ((i, 2) for i in range(20)), window))
+    assert results == [i * 2 for i in range(20)]
@@ -0,0 +1,65 @@
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""
+Tests that the options documented by each gitea module are those it accepts.
+"""
+
+import glob
+import importlib.util
+import os
+
+import pytest
+import yaml
+from ansible.module_utils import basic
+
+LIBRARY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'library')
+
+
+class ArgumentSpec(Exception):
+    pass
+
+
+def argument_spec(module):
+    """ The argument spec the module builds its AnsibleModule with """
+    def capture(self, argument_spec, **kwargs):
+        raise ArgumentSpec(argument_spec)
+    init = basic.AnsibleModule.__init__
+    basic.AnsibleModule.__init__ = capture
+    try:
+        module.run_module()
+    except ArgumentSpec as e:
+        return e.args[0]
+    finally:
+        basic.AnsibleModule.__init__ = init
+
+
+@pytest.mark.parametrize('path', sorted(glob.glob(os.path.join(LIBRARY_DIR, 'gitea_*.py'))),
+                         ids=os.path.basename)
+def test_documented_options(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    documented = yaml.safe_load(module.DOCUMENTATION)['options']
+    assert sorted(documented) == sorted(argument_spec(module))
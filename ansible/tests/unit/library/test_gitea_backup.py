@@ -0,0 +1,76 @@
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""
+Tests of gitea_backup against the mock gitea server.
+"""
+
+import json
+import os
+
+from bench_gitea import run_module
+
+
+def backup(mock, dest, **args):
+    params = dict(dest=str(dest), orgs=['org'], format='tar.gz', gitea_url=mock.url, api_token='token')
+    params.update(args)
+    return run_module('gitea_backup', params)
+
+
+def seed(mock, *names):
+    mock.state.add_org(dict(username='org'))
+    for name in names:
+        mock.state.add_repo('org', dict(name=name, auto_init=True))
+        mock.state.files[('org', name)] = {'README.md': name.encode()}
+
+
+def test_write_errors_name_the_repository(mock_gitea, tmp_path):
+    seed(mock_gitea, 'a', 'b')
+    # A file in the way of the directory of the archives
+    (tmp_path / 'org').write_text('')
+    result = backup(mock_gitea, tmp_path)
+    assert result['failed']
+    assert sorted(r['status'] for r in result['repos']) == ['failed', 'failed']
+    assert 'org/a' in result['msg'] and 'org/b' in result['msg']
+    assert result['repos'][0]['msg'].startswith('Backing up org/')
+
+
+def test_unlisted_repositories_are_kept_unless_pruned(mock_gitea, tmp_path):
+    seed(mock_gitea, 'a', 'b')
+    assert not backup(mock_gitea, tmp_path).get('failed')
+    mock_gitea.state.repos.pop(('org', 'b'))
+
+    result = backup(mock_gitea, tmp_path)
+    assert result['pruned'] == []
+    assert (tmp_path / 'org' / 'b.tar.gz').exists()
+
+    mock_gitea.state.add_org(dict(username='other'))
+    result = backup(mock_gitea, tmp_path, prune=True, orgs=['other'])
+    assert result['pruned'] == []
+
+    result = backup(mock_gitea, tmp_path, prune=True)
+    assert result['pruned'] == ['org/b'] and result['changed']
+    assert not (tmp_path / 'org' / 'b.tar.gz').exists()
+    with open(os.path.join(str(tmp_path), 'manifest.json')) as f:
+        assert sorted(json.load(f)['repos']) == ['org/a']
+    assert 'org/b' not in (tmp_path / 'SHA256SUMS').read_text()
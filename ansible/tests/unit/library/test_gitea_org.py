@@ -0,0 +1,62 @@
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""
+Tests of the team reconciliation of gitea_org against the mock gitea server.
+"""
+
+from bench_gitea import run_module
+from mock_gitea import ADMIN_USER
+
+
+def members(mock, org, name):
+    team = next(t for t in mock.state.teams.values()
+                if t['organization']['username'] == org and t['name'] == name)
+    return sorted(mock.state.members[team['id']])
+
+
+def test_members_are_compared_case_insensitively(mock_gitea):
+    mock_gitea.state.add_org(dict(username='myorg'))
+    devs = mock_gitea.state.add_team('myorg', dict(name='devs'))
+    mock_gitea.state.members[devs['id']].update(['Alice', 'bob'])
+    teams = [dict(name='Devs', members=['alice', 'BOB', 'carol'])]
+    result = run_module('gitea_org', dict(username='myorg', teams=teams, gitea_url=mock_gitea.url,
+                                          api_token='token'))
+    assert not result.get('failed'), result
+    assert result['teams']['members_added'] == {'Devs': ['carol']}
+    assert result['teams']['members_removed'] == {}
+    assert members(mock_gitea, 'myorg', 'devs') == ['Alice', 'bob', 'carol']
+
+
+def test_owners_are_replaced_additions_first(mock_gitea):
+    orgs = ['org{}'.format(i) for i in range(10)]
+    for org in orgs:
+        mock_gitea.state.add_org(dict(username=org))
+    items = [dict(username=org, teams=[dict(name='Owners', members=['alice'])]) for org in orgs]
+    result = run_module('gitea_org', dict(orgs=items, concurrency=8, gitea_url=mock_gitea.url,
+                                          api_token='token'))
+    assert not result.get('failed'), result
+    for org, org_result in zip(orgs, result['results']):
+        assert org_result['teams']['members_added'] == {'Owners': ['alice']}
+        assert org_result['teams']['members_removed'] == {'Owners': [ADMIN_USER]}
+        assert members(mock_gitea, org, 'Owners') == ['alice']
@@ -0,0 +1,109 @@
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""
+Tests of the plan gitea_state makes to converge organizations.
+"""
+
+import importlib.util
+import os
+
+import pytest
+
+_spec = importlib.util.spec_from_file_location('gitea_state', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'library', 'gitea_state.py'))
+gitea_state = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(gitea_state)
+
+
+def org(username, teams=None, repos=None, state='present'):
+    """ A desired organization, with the defaults of the argument spec """
+    return dict(dict.fromkeys(gitea_state.ORG_FIELDS), username=username, state=state,
+                teams=teams, repos=repos)
+
+
+def team(name, members=None, state='present', **fields):
+    return dict(dict.fromkeys(gitea_state.TEAM_FIELDS), name=name, members=members, state=state,
+                **fields)
+
+
+def current(username, teams=(), members=None):
+    """ The snapshot of an organization, None if it does not exist, with its teams and members """
+    teams = dict((t['name'].lower(), dict(t)) for t in teams)
+    return dict(org=dict(username=username) if username else None, repos={}, teams=teams,
+                members=members or {})
+
+
+def targets(ops):
+    return [(op['kind'], op['action'], op['target']) for op in ops]
+
+
+def test_members_are_compared_case_insensitively():
+    state = current('MyOrg', [dict(id=7, name='devs', permission='write')],
+                    {7: set(['Alice', 'bob'])})
+    ops = gitea_state.plan([org('myorg', [team('Devs', ['alice', 'BOB', 'carol'])])], [state], False)
+    assert targets(ops) == [('member', 'add', 'MyOrg:devs/carol')]
+
+
+def test_members_not_listed_are_removed_as_gitea_spells_them():
+    state = current('myorg', [dict(id=7, name='devs')], {7: set(['Alice', 'bob'])})
+    ops = gitea_state.plan([org('myorg', [team('devs', ['BOB'])])], [state], False)
+    assert targets(ops) == [('member', 'remove', 'myorg:devs/Alice')]
+
+
+@pytest.mark.parametrize('creator', ['crayvcs', 'CrayVCS'])
+def test_new_org_owners_hold_the_creator(creator):
+    ops = gitea_state.plan([org('neworg', [team('owners', ['crayvcs', 'alice'])])], [current(None)],
+                           False, creator=creator)
+    assert targets(ops) == [
+        ('org', 'create', 'neworg'),
+        ('member', 'add', 'neworg:Owners/alice'),
+    ]
+
+
+def test_new_org_owners_drop_the_creator_last():
+    ops = gitea_state.plan([org('neworg', [team('Owners', ['alice'])])], [current(None)], False,
+                           creator='crayvcs')
+    assert targets(ops) == [
+        ('org', 'create', 'neworg'),
+        ('member', 'add', 'neworg:Owners/alice'),
+        ('member', 'remove', 'neworg:Owners/crayvcs'),
+    ]
+    assert ops[1]['wave'] < ops[2]['wave']
+
+
+def test_teams_are_created_before_their_members_and_pruned():
+    state = current('myorg', [dict(id=1, name='Owners'), dict(id=2, name='old')])
+    ops = gitea_state.plan([org('myorg', [team('devs', ['alice'], permission='write')])], [state], True)
+    assert targets(ops) == [
+        ('team', 'create', 'myorg:devs'),
+        ('member', 'add', 'myorg:devs/alice'),
+        ('team', 'delete', 'myorg:old'),
+    ]
+    assert ops[0]['data'] == dict(name='devs', permission='write')
+
+
+def test_absent_org_is_emptied_before_it_is_deleted():
+    state = dict(current('myorg'), repos={'r': dict(name='R')})
+    ops = gitea_state.plan([org('MyOrg', state='absent')], [state], False)
+    assert targets(ops) == [('repo', 'delete', 'myorg/R'), ('org', 'delete', 'myorg')]
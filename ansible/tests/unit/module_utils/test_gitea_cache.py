@@ -0,0 +1,86 @@
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""
+Tests of the eviction of the on-disk response cache.
+"""
+
+import os
+
+from ansible.module_utils import gitea_cache
+from ansible.module_utils.gitea_cache import ResponseCache
+
+
+def put(cache, i, size=10):
+    cache.put(cache.key('/repos/{}'.format(i), 'token'), '/repos/{}'.format(i), {'ETag': str(i)},
+              b'x' * size)
+
+
+def entries(cache):
+    return sorted(name for name in os.listdir(cache.path) if name.endswith('.json'))
+
+
+def test_put_does_not_list_the_directory(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path), max_entries=100)
+    listings = []
+    listdir = os.listdir
+    monkeypatch.setattr(gitea_cache.os, 'listdir', lambda path: listings.append(path) or listdir(path))
+    for i in range(1000):
+        put(cache, i)
+    assert len(entries(cache)) <= 100
+    # One listing to start from, then one per eviction down to LOW_WATER
+    assert len(listings) <= 1 + 1000 // 10
+
+
+def test_least_recently_used_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_entries=10)
+    for i in range(10):
+        put(cache, i)
+        os.utime(cache._file(cache.key('/repos/{}'.format(i), 'token')), (i, i))
+    assert cache.get(cache.key('/repos/0', 'token'))['etag'] == '0'
+    put(cache, 10)
+    kept = set(entries(cache))
+    assert len(kept) == 9
+    for i in (0, 10) + tuple(range(3, 10)):
+        assert cache.key('/repos/{}'.format(i), 'token') + '.json' in kept
+
+
+def test_size_bound_tracks_replaced_entries(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=1000)
+    for _ in range(50):
+        put(cache, 0, size=500)
+    assert len(entries(cache)) == 1
+    assert cache._total == os.path.getsize(os.path.join(cache.path, entries(cache)[0]))
+
+
+def test_entries_of_other_processes_are_counted_on_eviction(tmp_path):
+    other = ResponseCache(str(tmp_path), max_entries=10)
+    cache = ResponseCache(str(tmp_path), max_entries=10)
+    put(cache, 0)
+    for i in range(1, 10):
+        put(other, i)
+    put(cache, 10)
+    put(cache, 11)
+    # cache believes it holds 3 entries; the scan on its next eviction sees 12
+    cache.evict()
+    assert len(entries(cache)) <= 9
@@ -0,0 +1,86 @@
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""
+Tests of the pagination of the gitea client against a server capping the
+size of pages, as Gitea does at its MAX_RESPONSE_ITEMS.
+"""
+
+import pytest
+
+from ansible.module_utils.gitea_client import GiteaClient
+
+MAX_RESPONSE_ITEMS = 50
+
+
+class Response(object):
+    def __init__(self, headers):
+        self.headers = headers
+
+
+class CappedClient(GiteaClient):
+    """ A client of a fake list endpoint serving pages of at most MAX_RESPONSE_ITEMS """
+
+    def __init__(self, count, total_header=True):
+        super(CappedClient, self).__init__('http://gitea.invalid/api/v1')
+        self.items = list(range(count))
+        self.total_header = total_header
+        self.pages = []
+
+    def _serve(self, page, limit):
+        self.pages.append(page)
+        size = min(limit, MAX_RESPONSE_ITEMS)
+        headers = {'X-Total-Count': str(len(self.items))} if self.total_header else {}
+        return headers, self.items[(page - 1) * size:page * size]
+
+    def _page(self, path, page, limit, query, params):
+        headers, items = self._serve(page, limit)
+        return Response(headers), items
+
+    def _stream_page(self, path, page, limit, query, params, meta):
+        meta['headers'], items = self._serve(page, limit)
+        for item in items:
+            yield item
+
+
+@pytest.mark.parametrize('count', [0, 1, 49, 50, 51, 100, 120, 150])
+@pytest.mark.parametrize('limit', [10, 50, 100])
+@pytest.mark.parametrize('prefetch', [1, 4])
+@pytest.mark.parametrize('total_header', [True, False])
+@pytest.mark.parametrize('cache', [False, True])
+def test_paginate_capped(count, limit, prefetch, total_header, cache):
+    client = CappedClient(count, total_header)
+    if cache:
+        # Cached responses go through iter_pages, like prefetched ones
+        client.cache = object()
+    assert list(client.paginate('/repos/search', limit=limit, prefetch=prefetch)) == client.items
+    size = min(limit, MAX_RESPONSE_ITEMS)
+    pages = max(1, -(-count // size))
+    # Without the total, a last page as large as the others needs an empty one after it
+    assert len(client.pages) <= pages + (not total_header)
+
+
+def test_iter_pages_capped():
+    client = CappedClient(120)
+    pages = list(client.iter_pages('/repos/search', limit=100, prefetch=4))
+    assert [len(page) for page in pages] == [50, 50, 20]
@@ -0,0 +1,101 @@
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""
+Tests of the refresh of the snapshot index against the mock gitea server.
+"""
+
+import pytest
+
+from ansible.module_utils.gitea_client import GiteaClient
+from ansible.module_utils.gitea_index import PAGE_SIZE, SnapshotIndex
+
+SEARCH = ('GET', '/repos/search', 200)
+
+
+@pytest.fixture
+def gitea(mock_gitea):
+    mock_gitea.state.add_org(dict(username='org'))
+    for i in range(2 * PAGE_SIZE + 10):
+        add_repo(mock_gitea, 'repo{}'.format(i), i)
+    return mock_gitea
+
+
+def add_repo(mock, name, minute):
+    repo = mock.state.add_repo('org', dict(name=name, auto_init=True))
+    repo['updated_at'] = '2026-01-01T00:{:02d}:{:02d}Z'.format(minute // 60, minute % 60)
+    return repo
+
+
+def refresh(mock, path, identity='token'):
+    """ Open the index at path and refresh its repositories, returning it and the searches made """
+    mock.counts.clear()
+    index = SnapshotIndex(str(path), identity)
+    with GiteaClient(mock.url, api_token='token') as client:
+        index._ensure(client, 'repos')
+    return index, mock.counts[SEARCH]
+
+
+def test_first_refresh_lists_every_repository(gitea, tmp_path):
+    index, searches = refresh(gitea, tmp_path / 'index.db')
+    assert searches == 3
+    assert index.refreshes['full'] == 1
+    assert index.stats()['repos_indexed'] == len(gitea.state.repos)
+
+
+def test_unchanged_refresh_reads_one_page(gitea, tmp_path):
+    refresh(gitea, tmp_path / 'index.db')
+    index, searches = refresh(gitea, tmp_path / 'index.db')
+    assert searches == 1
+    assert index.refreshes['full'] == 0
+
+
+def test_refresh_picks_up_updated_and_new_repositories(gitea, tmp_path):
+    refresh(gitea, tmp_path / 'index.db')
+    add_repo(gitea, 'new', 200)
+    gitea.state.repo('org', 'repo3')['updated_at'] = '2026-01-01T00:03:21Z'
+    gitea.state.repo('org', 'repo3')['default_branch'] = 'develop'
+    index, searches = refresh(gitea, tmp_path / 'index.db')
+    assert searches == 1
+    assert index.refreshes['full'] == 0
+    with GiteaClient(gitea.url, api_token='token') as client:
+        assert index.repo(client, 'Org', 'NEW')['full_name'] == 'org/new'
+        assert index.repo(client, 'org', 'repo3')['default_branch'] == 'develop'
+
+
+def test_deleted_repositories_rebuild_the_index(gitea, tmp_path):
+    refresh(gitea, tmp_path / 'index.db')
+    del gitea.state.repos[('org', 'repo7')]
+    index, searches = refresh(gitea, tmp_path / 'index.db')
+    assert index.refreshes['full'] == 1
+    assert searches == 1 + 3
+    with GiteaClient(gitea.url, api_token='token') as client:
+        assert index.repo(client, 'org', 'repo7') is None
+        assert index.repo(client, 'org', 'repo8') is not None
+
+
+def test_another_identity_starts_afresh(gitea, tmp_path):
+    refresh(gitea, tmp_path / 'index.db')
+    index, searches = refresh(gitea, tmp_path / 'index.db', identity='other')
+    assert index.refreshes['full'] == 1
+    assert searches == 3
@@ -0,0 +1,72 @@
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""
+Tests of the incremental JSON list decoder, fed sample pages split at
+every byte offset.
+"""
+
+import json
+
+import pytest
+
+from ansible.module_utils.gitea_json import ItemDecoder
+
+REPOS = [dict(id=i, name='répo-%d' % i, size=1024.5 * i, stars=-3e-2, private=bool(i % 2),
+              mirror_interval=None, topics=['a', 'b,]}"\\'], owner=dict(id=12, login='cray'))
+         for i in range(3)] + [12.5, 1e21, -7, 0, True, None, 'x', [], {}]
+PAGES = [
+    (json.dumps(REPOS), REPOS),
+    (json.dumps(REPOS, indent=2), REPOS),
+    (json.dumps(dict(n=12.5, ok=True, data=REPOS, total=1e3)), REPOS),
+    ('[12.5,3e10 , 1E-2]', [12.5, 3e10, 1e-2]),
+    ('[]', []),
+    ('{"ok": true}', []),
+]
+
+
+def decode(chunks, key='data'):
+    decoder = ItemDecoder(key)
+    items = []
+    for chunk in chunks:
+        items += decoder.feed(chunk)
+    return items + decoder.close()
+
+
+@pytest.mark.parametrize('text, expected', PAGES)
+def test_split_at_every_offset(text, expected):
+    data = text.encode('utf-8')
+    for offset in range(len(data) + 1):
+        assert decode([data[:offset], data[offset:]]) == expected, offset
+
+
+@pytest.mark.parametrize('text, expected', PAGES)
+def test_byte_by_byte(text, expected):
+    data = text.encode('utf-8')
+    assert decode(data[i:i + 1] for i in range(len(data))) == expected
+
+
+@pytest.mark.parametrize('text', ['[1, 2', '{"data": [1,', '[1 2]', '[1]x', '"s"', '[12.x]'])
+def test_invalid(text):
+    with pytest.raises(ValueError):
+        decode([text.encode('utf-8')])
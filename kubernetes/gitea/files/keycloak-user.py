@@ -2,7 +2,7 @@
 #
 # MIT License
 #
-# (C) Copyright 2020-2022 Hewlett Packard Enterprise Development LP
+# (C) Copyright 2020-2022, 2026 Hewlett Packard Enterprise Development LP
 #
 # Permission is hereby granted, free of charge, to any person obtaining a
 # copy of this software and associated documentation files (the "Software"),
@@ -23,21 +23,100 @@
 # OTHER DEALINGS IN THE SOFTWARE.
 #
 
+import argparse
+import base64
+import hashlib
+import json
 import logging
 import os
+import random
+import secrets
+import sqlite3
+import tempfile
+import threading
 import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
 
-import kubernetes.config
-import oauthlib.oauth2
-import requests_oauthlib
+import requests
+import requests.adapters
+
+# kubernetes is only imported by the reconciler, and oauthlib and
+# requests_oauthlib once keycloak is ready and the admin session is needed.
 
 VCS_SECRET_DIR = '/mnt/vcs-user-credentials'
+VCS_SECRET_NAME = 'vcs-user-credentials'
+
+USERS_MODES = ('concurrent', 'partial-import')
 
 DEFAULT_KEYCLOAK_BASE = 'https://keycloak.services:8080/keycloak'
+DEFAULT_GITEA_URL = 'http://gitea-vcs'
+
+# Tokens are refreshed when they have less than this many seconds left
+TOKEN_REFRESH_MARGIN = 30
 
 LOGGER = logging.getLogger('vcs-keycloak-setup')
 
 
+class KeycloakNotReady(Exception):
+    """ Keycloak did not become ready before the deadline """
+
+
+def backoff_delay(failures, initial=1.0, maximum=30.0):
+    """ Exponential backoff with full jitter after a number of failures """
+    return random.uniform(0, min(maximum, initial * 2 ** (failures - 1)))
+
+
+def is_fatal(exc):
+    """
+    Whether a setup error will not go away by retrying: the master admin
+    credentials or client being rejected, or the admin API refusing access.
+    Connection errors and 5xx responses are worth retrying.
+    """
+    import oauthlib.oauth2
+
+    if isinstance(exc, (oauthlib.oauth2.InvalidGrantError,
+                        oauthlib.oauth2.InvalidClientError,
+                        oauthlib.oauth2.UnauthorizedClientError)):
+        return True
+    response = getattr(exc, 'response', None)
+    return response is not None and response.status_code in (401, 403)
+
+
+def wait_for_keycloak(keycloak_base, timeout=600, max_delay=10.0):
+    """
+    Probe the OIDC discovery document of the master realm until Keycloak
+    serves it, backing off exponentially with jitter between probes.
+    Connection errors, 404 (not routed yet) and 5xx responses are retried
+    until timeout seconds have passed, when KeycloakNotReady is raised; any
+    other status is raised at once. Returns the (seconds, probes) it took.
+    """
+    url = '{}/realms/{}/.well-known/openid-configuration'.format(
+        keycloak_base, KeycloakGiteaSetup.MASTER_REALM_NAME)
+    start = time.monotonic()
+    deadline = start + timeout
+    probes = 0
+    while True:
+        probes += 1
+        try:
+            response = requests.get(url, timeout=5, verify=False)
+            if response.ok:
+                return time.monotonic() - start, probes
+            if response.status_code != 404 and response.status_code < 500:
+                response.raise_for_status()
+            reason = 'HTTP {}'.format(response.status_code)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            reason = type(e).__name__
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise KeycloakNotReady(
+                'Keycloak not ready after {:.0f}s ({} probes, last: {})'.format(
+                    time.monotonic() - start, probes, reason))
+        delay = min(backoff_delay(probes, 0.5, max_delay), remaining)
+        LOGGER.info("Keycloak not ready (%s), probing again in %.1fs", reason, delay)
+        time.sleep(delay)
+
+
 class KeycloakGiteaSetup(object):
     MASTER_REALM_NAME = 'master'
     SHASTA_REALM_NAME = 'shasta'
@@ -47,45 +126,128 @@ class KeycloakGiteaSetup(object):
             keycloak_base,
             kc_master_admin_client_id,
             kc_master_admin_username,
-            kc_master_admin_password):
+            kc_master_admin_password,
+            users_dir=None,
+            users_manifest=None,
+            users_mode='concurrent',
+            users_concurrency=8,
+            users_chunk_size=100,
+            token_cache=None):
         self.keycloak_base = keycloak_base
         self.kc_master_admin_client_id = kc_master_admin_client_id
         self.kc_master_admin_username = kc_master_admin_username
         self.kc_master_admin_password = kc_master_admin_password
+        self.users_dir = users_dir
+        self.users_manifest = users_manifest
+        self.users_mode = users_mode
+        self.users_concurrency = max(1, users_concurrency)
+        self.users_chunk_size = max(1, users_chunk_size)
+        self.token_cache = token_cache
 
         self._kc_master_admin_client_cache = None
+        self._token_lock = threading.Lock()
+        # Whether the session token was cached or refreshed, rather than
+        # granted for the password by this process
+        self._token_reused = False
 
     def run(self):
         self._create_gitea_user()
+        if self.users_dir or self.users_manifest:
+            self._create_batch_users()
 
     @property
     def _kc_master_admin_client(self):
-        if self._kc_master_admin_client_cache:
-            return self._kc_master_admin_client_cache
+        with self._token_lock:
+            client = self._kc_master_admin_client_cache
+            if client is None:
+                client = self._new_kc_master_admin_client()
+                self._kc_master_admin_client_cache = client
+            elif _expiring(client.token, 'expires_at'):
+                # Refresh ahead of expiry rather than on a failed request
+                self._refresh_token(client)
+            return client
 
-        kc_master_token_endpoint = (
+    @property
+    def _kc_master_token_endpoint(self):
+        return (
             '{}/realms/{}/protocol/openid-connect/token'.format(
                 self.keycloak_base, self.MASTER_REALM_NAME))
 
+    @property
+    def _token_cache_key(self):
+        return (self.keycloak_base, self.kc_master_admin_client_id, self.kc_master_admin_username)
+
+    def _new_kc_master_admin_client(self):
+        import oauthlib.oauth2
+        import requests_oauthlib
+
+        token = None
+        if self.token_cache is not None:
+            token = self.token_cache.load(*self._token_cache_key)
+
         kc_master_client = oauthlib.oauth2.LegacyApplicationClient(
             client_id=self.kc_master_admin_client_id)
 
         client = requests_oauthlib.OAuth2Session(
-            client=kc_master_client, auto_refresh_url=kc_master_token_endpoint,
+            client=kc_master_client, auto_refresh_url=self._kc_master_token_endpoint,
             auto_refresh_kwargs={
                 'client_id': self.kc_master_admin_client_id,
             },
-            token_updater=lambda t: LOGGER.info("Refreshed Keycloak master admin token"))
+            token_updater=self._token_updated, token=token)
         client.verify = False
+
+        if token and not _expiring(token, 'expires_at'):
+            LOGGER.info("Using cached KC master admin token.")
+            self._token_reused = True
+            return client
+        if token and token.get('refresh_token') and not _expiring(token, 'refresh_expires_at'):
+            try:
+                self._refresh_token(client)
+                return client
+            except Exception:
+                LOGGER.info("Could not refresh cached KC master admin token.", exc_info=True)
+
         LOGGER.info("Fetching initial KC master admin token.")
-        client.fetch_token(
-            token_url=kc_master_token_endpoint,
+        token = client.fetch_token(
+            token_url=self._kc_master_token_endpoint,
             client_id=self.kc_master_admin_client_id,
             username=self.kc_master_admin_username,
             password=self.kc_master_admin_password)
+        self._token_updated(token)
+        self._token_reused = False
+        return client
+
+    def _refresh_token(self, client):
+        LOGGER.info("Refreshing KC master admin token.")
+        token = client.refresh_token(
+            self._kc_master_token_endpoint, client_id=self.kc_master_admin_client_id)
+        self._token_updated(token)
+        self._token_reused = True
+
+    def _token_updated(self, token):
+        if self.token_cache is not None:
+            self.token_cache.save(token, *self._token_cache_key)
 
-        self._kc_master_admin_client_cache = client
-        return self._kc_master_admin_client_cache
+    def reset_kc_master_admin_client(self):
+        """ Drop the admin session and its cached token after an error """
+        with self._token_lock:
+            self._kc_master_admin_client_cache = None
+            self._token_reused = False
+            if self.token_cache is not None:
+                self.token_cache.discard(*self._token_cache_key)
+
+    def discard_rejected_token(self):
+        """
+        Drop the admin session after Keycloak rejected it, if its token was
+        cached or refreshed, e.g. from before Keycloak restarted, so that the
+        next request makes a password grant. Returns whether it was: only
+        the rejection of a token just granted for the password is final.
+        """
+        with self._token_lock:
+            reused = self._token_reused
+        if reused:
+            self.reset_kc_master_admin_client()
+        return reused
 
     def _create_gitea_user(self):
         LOGGER.info("Creating gitea users..")
@@ -104,26 +266,536 @@ class KeycloakGiteaSetup(object):
             LOGGER.warning('Expected vcs user secret, but not found')
             raise
 
-    def _create_user(self, username, password):
+    def _create_user(self, username, password, **attributes):
         url = (
             '{}/admin/realms/{}/users'.format(
                 self.keycloak_base, self.SHASTA_REALM_NAME))
-        req_body = {
-            'username': username,
-            'enabled': True,
-            'credentials': [
-                {
-                    'type': 'password',
-                    'value': password,
-                },
-            ]
-        }
+        req_body = user_representation(username, password, **attributes)
         response = self._kc_master_admin_client.post(url, json=req_body)
         if response.status_code == 409:
             LOGGER.info("User %r already exists", username)
-            return
+            return 'existing'
         response.raise_for_status()
         LOGGER.info("Created user %r", username)
+        return 'created'
+
+    def _set_user_password(self, username, password):
+        """ Reset the password of a user, creating the user if needed """
+        url = (
+            '{}/admin/realms/{}/users'.format(
+                self.keycloak_base, self.SHASTA_REALM_NAME))
+        response = self._kc_master_admin_client.get(
+            url, params={'username': username, 'exact': 'true'})
+        response.raise_for_status()
+        # Keycloak stores usernames in lower case
+        users = [u for u in response.json() if u['username'] == username.lower()]
+        if not users:
+            return self._create_user(username, password)
+        response = self._kc_master_admin_client.put(
+            '{}/{}/reset-password'.format(url, users[0]['id']),
+            json={'type': 'password', 'value': password, 'temporary': False})
+        response.raise_for_status()
+        LOGGER.info("Reset password of user %r", username)
+        return 'updated'
+
+    def _create_batch_users(self):
+        """
+        Provision the users of the users directory and manifest, either
+        concurrently over the admin session or through the realm partial
+        import endpoint in chunks. Users that already exist are left as they
+        are. Raises RuntimeError if any user could not be provisioned, once
+        all have been tried, so that a retry only redoes the failed ones.
+        """
+        users = load_users(self.users_dir, self.users_manifest)
+        LOGGER.info("Provisioning %d users (%s).", len(users), self.users_mode)
+        start = time.monotonic()
+        if self.users_mode == 'partial-import':
+            counts = self._partial_import_users(users)
+        else:
+            counts = self._create_users_concurrently(users)
+        LOGGER.info(
+            "Provisioned %d users in %.1fs: %d created, %d existing, %d failed",
+            len(users), time.monotonic() - start,
+            counts['created'], counts['existing'], counts['failed'])
+        if counts['failed']:
+            raise RuntimeError(
+                '{} of {} users could not be provisioned'.format(
+                    counts['failed'], len(users)))
+        return counts
+
+    def _create_users_concurrently(self, users):
+        # Fetch the token before fanning out, and let the session keep a
+        # keep-alive connection per worker.
+        client = self._kc_master_admin_client
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.users_concurrency)
+        client.mount('http://', adapter)
+        client.mount('https://', adapter)
+
+        def provision(user):
+            try:
+                return self._create_user(**user)
+            except Exception:
+                LOGGER.warning(
+                    "Failed to create user %r", user['username'], exc_info=True)
+                return 'failed'
+
+        with ThreadPoolExecutor(max_workers=self.users_concurrency) as executor:
+            return Counter(executor.map(provision, users))
+
+    def _partial_import_users(self, users):
+        url = (
+            '{}/admin/realms/{}/partialImport'.format(
+                self.keycloak_base, self.SHASTA_REALM_NAME))
+        counts = Counter()
+        for i in range(0, len(users), self.users_chunk_size):
+            chunk = users[i:i + self.users_chunk_size]
+            req_body = {
+                'ifResourceExists': 'SKIP',
+                'users': [user_representation(**user) for user in chunk],
+            }
+            try:
+                response = self._kc_master_admin_client.post(url, json=req_body)
+                response.raise_for_status()
+                result = response.json()
+            except Exception:
+                LOGGER.warning(
+                    "Partial import of users %d-%d failed", i + 1, i + len(chunk),
+                    exc_info=True)
+                counts['failed'] += len(chunk)
+                continue
+            counts['created'] += result.get('added', 0)
+            counts['existing'] += result.get('skipped', 0)
+            LOGGER.info(
+                "Imported users %d-%d: %d added, %d skipped", i + 1, i + len(chunk),
+                result.get('added', 0), result.get('skipped', 0))
+        return counts
+
+
+class VcsUserReconciler(object):
+    """
+    Keeps the Keycloak password of the vcs user in line with the
+    vcs-user-credentials secret. The secret is listed once and then watched
+    from the listed resourceVersion, so rotations are applied as soon as the
+    API server reports them and nothing runs in between. Watches that end
+    are resumed from the last resourceVersion handled; the secret is listed
+    again only when that is too old (410 Gone). Keycloak is only called when
+    the hash of the credentials changes.
+    """
+    WATCH_TIMEOUT = 300
+    MAX_BACKOFF = 60
+
+    def __init__(self, setup, namespace, secret_name=VCS_SECRET_NAME):
+        self.setup = setup
+        self.namespace = namespace
+        self.secret_name = secret_name
+        self.resource_version = None
+        self._applied_digest = None
+
+    def run(self):
+        import kubernetes.client
+
+        api = kubernetes.client.CoreV1Api()
+        failures = 0
+        while True:
+            try:
+                if self.resource_version is None:
+                    self._list(api)
+                self._watch(api)
+                failures = 0
+            except kubernetes.client.rest.ApiException as e:
+                if e.status == 410:
+                    LOGGER.info(
+                        "resourceVersion %s is too old, listing %s again",
+                        self.resource_version, self.secret_name)
+                    self.resource_version = None
+                    continue
+                failures += 1
+                LOGGER.warning("Watching secret %s failed", self.secret_name, exc_info=True)
+                time.sleep(backoff_delay(failures, maximum=self.MAX_BACKOFF))
+            except Exception:
+                # Most likely Keycloak; the failed event is seen again when
+                # the watch resumes from the last version handled.
+                failures += 1
+                LOGGER.warning("Reconciling secret %s failed", self.secret_name, exc_info=True)
+                self.setup.reset_kc_master_admin_client()
+                time.sleep(backoff_delay(failures, maximum=self.MAX_BACKOFF))
+
+    def _field_selector(self):
+        return 'metadata.name={}'.format(self.secret_name)
+
+    def _list(self, api):
+        secrets = api.list_namespaced_secret(
+            self.namespace, field_selector=self._field_selector())
+        for secret in secrets.items:
+            self._apply(secret)
+        if not secrets.items:
+            LOGGER.warning("Secret %s not found, waiting for it", self.secret_name)
+        self.resource_version = secrets.metadata.resource_version
+
+    def _watch(self, api):
+        import kubernetes.watch
+
+        watch = kubernetes.watch.Watch()
+        for event in watch.stream(
+                api.list_namespaced_secret, self.namespace,
+                field_selector=self._field_selector(),
+                resource_version=self.resource_version,
+                timeout_seconds=self.WATCH_TIMEOUT,
+                allow_watch_bookmarks=True):
+            if event['type'] in ('ADDED', 'MODIFIED'):
+                self._apply(event['object'])
+            elif event['type'] == 'DELETED':
+                LOGGER.warning(
+                    "Secret %s was deleted, keeping the current password", self.secret_name)
+                self._applied_digest = None
+            self.resource_version = watch.resource_version
+
+    def _apply(self, secret):
+        data = secret.data or {}
+        try:
+            username = base64.b64decode(data['vcs_username']).decode('utf-8')
+            password = base64.b64decode(data['vcs_password']).decode('utf-8')
+        except KeyError:
+            LOGGER.warning("Secret %s lacks vcs_username or vcs_password", self.secret_name)
+            return
+        digest = hashlib.sha256(
+            '{}\0{}'.format(username, password).encode('utf-8')).hexdigest()
+        if digest == self._applied_digest:
+            return
+        LOGGER.info(
+            "Credentials in secret %s (resourceVersion %s) changed, updating keycloak",
+            self.secret_name, secret.metadata.resource_version)
+        self.setup._set_user_password(username, password)
+        self._applied_digest = digest
+
+
+class GiteaUserSync(object):
+    """
+    Brings the Gitea accounts in line with the users of the shasta realm.
+
+    Gitea users are listed first into a table keyed by lower-case username
+    holding only what the diff needs, spilled to a temporary SQLite file in
+    scratch_dir rather than kept in memory. Keycloak users are then streamed
+    page by page and each is looked up in the table once: users missing from
+    Gitea are created, and accounts whose login state differs from the
+    Keycloak enabled flag are enabled or disabled. Matched entries leave the
+    table, so what remains when the stream ends are the Gitea users unknown
+    to Keycloak, which are disabled. Admins and the vcs user are never
+    disabled. The two listings are not merged in order, as Gitea sorts users
+    by the collation of its database.
+
+    Changes are applied concurrently as they are found with at most window
+    of them pending, so neither the users nor the changes are held in
+    memory, whatever their number, and the writes made are proportional to
+    the difference.
+    """
+    PAGE_SIZE = 100
+    SERVICE_ACCOUNT_PREFIX = 'service-account-'
+    DONE = {'create': 'Created', 'enable': 'Enabled', 'disable': 'Disabled'}
+
+    def __init__(self, setup, gitea_url, gitea_username, gitea_password, source_id=0,
+                 concurrency=8, page_size=PAGE_SIZE, disable_missing=True, dry_run=False,
+                 scratch_dir=None):
+        self.setup = setup
+        self.gitea_url = gitea_url.rstrip('/')
+        self.gitea_username = gitea_username
+        self.source_id = source_id
+        self.concurrency = max(1, concurrency)
+        self.page_size = max(1, page_size)
+        self.disable_missing = disable_missing
+        self.dry_run = dry_run
+        self.scratch_dir = scratch_dir
+        self.session = requests.Session()
+        self.session.auth = (gitea_username, gitea_password)
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def keycloak_users(self):
+        """ Stream the users of the shasta realm, one page in memory at a time """
+        url = '{}/admin/realms/{}/users'.format(
+            self.setup.keycloak_base, self.setup.SHASTA_REALM_NAME)
+        first = 0
+        while True:
+            response = self.setup._kc_master_admin_client.get(url, params={
+                'first': first, 'max': self.page_size, 'briefRepresentation': 'true'})
+            response.raise_for_status()
+            page = response.json()
+            for user in page:
+                yield user
+            if len(page) < self.page_size:
+                return
+            first += len(page)
+
+    def gitea_users(self):
+        """ Stream the Gitea users, one page in memory at a time """
+        url = '{}/api/v1/admin/users'.format(self.gitea_url)
+        page_number = 1
+        seen = 0
+        while True:
+            response = self.session.get(url, params={'page': page_number, 'limit': self.page_size})
+            response.raise_for_status()
+            page = response.json()
+            for user in page:
+                yield user
+            seen += len(page)
+            # Gitea caps limit at its MAX_RESPONSE_ITEMS, so a short page
+            # does not mean the last one; the total count does
+            total = response.headers.get('X-Total-Count')
+            if not page or (total is not None and seen >= int(total)):
+                return
+            page_number += 1
+
+    def _gitea_table(self, db):
+        """
+        Fill the users table of db with the Gitea users, username ->
+        (login_name, source_id, prohibit_login, protected), a page at a time,
+        returning their number
+        """
+        vcs_username = self.gitea_username.lower()
+        db.execute(
+            'CREATE TABLE users (username TEXT PRIMARY KEY, login_name TEXT, source_id INTEGER, '
+            'prohibit_login INTEGER, protected INTEGER)')
+        count = 0
+        page = []
+        for user in self.gitea_users():
+            username = user['login'].lower()
+            page.append((
+                username, user.get('login_name') or user['login'], user.get('source_id', 0),
+                bool(user.get('prohibit_login')),
+                bool(user.get('is_admin')) or username == vcs_username))
+            if len(page) >= self.page_size:
+                count += len(page)
+                db.executemany('INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?, ?)', page)
+                page = []
+        count += len(page)
+        db.executemany('INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?, ?)', page)
+        return count
+
+    def diff(self, db):
+        """
+        Generate the (action, username, data) changes from the Keycloak users
+        to the Gitea users in the users table of db, which is consumed
+        """
+        for user in self.keycloak_users():
+            username = user['username'].lower()
+            if username.startswith(self.SERVICE_ACCOUNT_PREFIX):
+                continue
+            enabled = user.get('enabled', True)
+            entry = db.execute(
+                'SELECT login_name, source_id, prohibit_login, protected FROM users '
+                'WHERE username = ?', (username,)).fetchone()
+            if entry is not None:
+                db.execute('DELETE FROM users WHERE username = ?', (username,))
+            if entry is None:
+                if enabled:
+                    yield 'create', username, user
+                else:
+                    yield 'unchanged', username, None
+            elif entry[2] == enabled and (enabled or not entry[3]):
+                # Login prohibited in Gitea while enabled in Keycloak, or
+                # the other way around
+                yield 'enable' if enabled else 'disable', username, entry
+            else:
+                yield 'unchanged', username, None
+        rows = db.execute(
+            'SELECT username, login_name, source_id, prohibit_login, protected FROM users')
+        for row in rows:
+            username, entry = row[0], row[1:]
+            if self.disable_missing and not entry[2] and not entry[3]:
+                yield 'disable', username, entry
+            else:
+                yield 'unchanged', username, None
+
+    def _apply(self, action, username, data):
+        if action == 'unchanged' or self.dry_run:
+            return action
+        try:
+            if action == 'create':
+                name = ' '.join(filter(None, (data.get('firstName'), data.get('lastName'))))
+                response = self.session.post(
+                    '{}/api/v1/admin/users'.format(self.gitea_url), json={
+                        'username': data['username'],
+                        'email': data.get('email') or '{}@mgmt-plane-nmn.local'.format(username),
+                        'full_name': name,
+                        # Users log in through Keycloak; the password is never used
+                        'password': secrets.token_urlsafe(24),
+                        'must_change_password': False,
+                        'send_notify': False,
+                        'login_name': data['username'],
+                        'source_id': self.source_id,
+                    })
+                if response.status_code == 422 and 'already exists' in response.text:
+                    return 'unchanged'
+            else:
+                login_name, source_id = data[0], data[1]
+                response = self.session.patch(
+                    '{}/api/v1/admin/users/{}'.format(self.gitea_url, username), json={
+                        'login_name': login_name,
+                        'source_id': source_id,
+                        'prohibit_login': action == 'disable',
+                    })
+            response.raise_for_status()
+        except Exception:
+            LOGGER.warning("Failed to %s gitea user %r", action, username, exc_info=True)
+            return 'failed'
+        LOGGER.info("%s gitea user %r", self.DONE[action], username)
+        return action
+
+    def run(self):
+        """ Sync the users, returning the counts of each action """
+        start = time.monotonic()
+        counts = Counter()
+        with tempfile.TemporaryDirectory(prefix='vcs-user-sync-', dir=self.scratch_dir) as scratch:
+            db = sqlite3.connect(os.path.join(scratch, 'gitea-users.sqlite'))
+            try:
+                # A scratch file: nothing to recover after a crash, and a
+                # bounded page cache so memory does not grow with the table
+                db.execute('PRAGMA journal_mode = OFF')
+                db.execute('PRAGMA synchronous = OFF')
+                db.execute('PRAGMA cache_size = -2048')
+                gitea_count = self._gitea_table(db)
+                LOGGER.info(
+                    "Listed %d gitea users in %.1fs.", gitea_count, time.monotonic() - start)
+                with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                    for result in bounded_map(executor, self._apply, self.diff(db),
+                                              self.concurrency * 4):
+                        counts[result] += 1
+            finally:
+                db.close()
+        LOGGER.info(
+            "Synced gitea users in %.1fs%s: %d created, %d enabled, %d disabled, "
+            "%d unchanged, %d failed", time.monotonic() - start,
+            ' (dry run)' if self.dry_run else '', counts['create'], counts['enable'],
+            counts['disable'], counts['unchanged'], counts['failed'])
+        counts['gitea_users'] = gitea_count
+        if counts['failed']:
+            raise RuntimeError('{} gitea user changes failed'.format(counts['failed']))
+        return counts
+
+
+def bounded_map(executor, func, items, window):
+    """
+    Like executor.map over argument tuples, but consuming items only as far
+    as window ahead of the results yielded, so a long generator of items is
+    never held in memory
+    """
+    pending = deque()
+    for args in items:
+        pending.append(executor.submit(func, *args))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def write_metrics(metrics, path=None):
+    """ Log the startup metrics as one JSON line, also writing them to path """
+    line = json.dumps(metrics, sort_keys=True)
+    LOGGER.info("Startup metrics: %s", line)
+    if path:
+        with open(path, 'w') as f:
+            f.write(line + '\n')
+
+
+def _namespace():
+    """ The namespace of this pod """
+    if os.environ.get('POD_NAMESPACE'):
+        return os.environ['POD_NAMESPACE']
+    with open('/var/run/secrets/kubernetes.io/serviceaccount/namespace') as f:
+        return f.read().strip()
+
+
+class TokenCache(object):
+    """
+    Keycloak tokens shared between runs through a directory, best on tmpfs,
+    with one file per Keycloak, client and user, readable only by us. A
+    restarted container can then reuse or refresh the token of its previous
+    run instead of making another password grant.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def _file(self, *key):
+        digest = hashlib.sha256('\0'.join(key).encode('utf-8')).hexdigest()[:32]
+        return os.path.join(self.path, 'kc-token-{}.json'.format(digest))
+
+    def load(self, *key):
+        try:
+            with open(self._file(*key)) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def save(self, token, *key):
+        token = dict(token)
+        if 'refresh_expires_in' in token:
+            token['refresh_expires_at'] = time.time() + float(token['refresh_expires_in'])
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(token, f)
+            os.replace(tmp, self._file(*key))
+        except (IOError, OSError):
+            LOGGER.warning("Could not cache token in %s", self.path, exc_info=True)
+
+    def discard(self, *key):
+        try:
+            os.unlink(self._file(*key))
+        except OSError:
+            pass
+
+
+def _expiring(token, field):
+    """ Whether the expiry time field of a token is within the refresh margin """
+    return token.get(field) is not None and float(token[field]) - time.time() < TOKEN_REFRESH_MARGIN
+
+
+def user_representation(username, password, **attributes):
+    """ The Keycloak representation of an enabled user with a password """
+    user = {
+        'username': username,
+        'enabled': True,
+        'credentials': [
+            {
+                'type': 'password',
+                'value': password,
+            },
+        ]
+    }
+    user.update(attributes)
+    return user
+
+
+def load_users(users_dir=None, users_manifest=None):
+    """
+    Read the users to provision as dicts with username, password and any
+    other Keycloak user attributes.
+
+    users_dir holds one file per user, named after the username and holding
+    the password, as when a secret is mounted; hidden entries are skipped.
+    users_manifest is a JSON list of objects with at least username and
+    password. A user in both is taken from the manifest.
+    """
+    users = {}
+    if users_dir:
+        for name in sorted(os.listdir(users_dir)):
+            path = os.path.join(users_dir, name)
+            if name.startswith('.') or not os.path.isfile(path):
+                continue
+            with open(path) as f:
+                users[name] = {'username': name, 'password': f.read()}
+    if users_manifest:
+        with open(users_manifest) as f:
+            for user in json.load(f):
+                if not user.get('username') or 'password' not in user:
+                    raise ValueError(
+                        'Manifest user {!r} needs a username and a password'.format(user))
+                users[user['username']] = dict(user)
+    return list(users.values())
 
 
 def read_keycloak_master_admin_secrets(
@@ -142,12 +814,19 @@ def read_keycloak_master_admin_secrets(
     }
 
 def main():
+    parser = argparse.ArgumentParser(
+        description='Add the vcs users to keycloak, or keep their passwords up to date')
+    parser.add_argument(
+        'mode', nargs='?', choices=('setup', 'reconcile', 'sync'), default='setup',
+        help='setup creates the users once; reconcile watches the vcs-user-credentials '
+             'secret and updates the keycloak password whenever it changes; sync creates, '
+             'enables and disables gitea users to match the keycloak shasta realm')
+    args = parser.parse_args()
+
+    start = time.monotonic()
     log_format = "%(asctime)-15s - %(levelname)-7s - %(message)s"
     logging.basicConfig(level=logging.INFO, format=log_format)
 
-    # Load K8s configuration
-    kubernetes.config.load_incluster_config()
-
     keycloak_base = os.environ.get('KEYCLOAK_BASE', DEFAULT_KEYCLOAK_BASE)
 
     # If this fails, a retry shouldn't make a difference, since it is just
@@ -156,22 +835,92 @@ def main():
     LOGGER.info("Loading keycloak secrets.")
     kc_master_admin_secrets = read_keycloak_master_admin_secrets()
 
+    users_mode = os.environ.get('VCS_USERS_MODE', 'concurrent')
+    if users_mode not in USERS_MODES:
+        raise ValueError('VCS_USERS_MODE must be one of {}'.format(', '.join(USERS_MODES)))
+
     ks = KeycloakGiteaSetup(
         keycloak_base=keycloak_base,
         kc_master_admin_client_id=kc_master_admin_secrets['client_id'],
         kc_master_admin_username=kc_master_admin_secrets['user'],
         kc_master_admin_password=kc_master_admin_secrets['password'],
+        users_dir=os.environ.get('VCS_USERS_DIR'),
+        users_manifest=os.environ.get('VCS_USERS_MANIFEST'),
+        users_mode=users_mode,
+        users_concurrency=int(os.environ.get('VCS_USERS_CONCURRENCY', 8)),
+        users_chunk_size=int(os.environ.get('VCS_USERS_CHUNK_SIZE', 100)),
+        token_cache=(TokenCache(os.environ['KEYCLOAK_TOKEN_CACHE_DIR'])
+                     if os.environ.get('KEYCLOAK_TOKEN_CACHE_DIR') else None),
     )
 
+    LOGGER.info("Waiting for keycloak at %s.", keycloak_base)
+    waited, probes = wait_for_keycloak(
+        keycloak_base, timeout=float(os.environ.get('KEYCLOAK_READY_TIMEOUT', 600)))
+    metrics = {
+        'keycloak_ready_seconds': round(time.monotonic() - start, 3),
+        'keycloak_wait_seconds': round(waited, 3),
+        'keycloak_probes': probes,
+    }
+    LOGGER.info("Keycloak ready after %.1fs (%d probes).", waited, probes)
+
+    if args.mode == 'reconcile':
+        import kubernetes.config
+
+        # Load K8s configuration
+        kubernetes.config.load_incluster_config()
+        reconciler = VcsUserReconciler(
+            ks, _namespace(), os.environ.get('VCS_USER_SECRET_NAME', VCS_SECRET_NAME))
+        LOGGER.info(
+            "Reconciling keycloak with secret %s/%s", reconciler.namespace,
+            reconciler.secret_name)
+        reconciler.run()
+
+    if args.mode == 'sync':
+        gitea_username, gitea_password = ks._load_vcs_user_secret()
+        sync = GiteaUserSync(
+            ks, os.environ.get('GITEA_URL', DEFAULT_GITEA_URL), gitea_username, gitea_password,
+            source_id=int(os.environ.get('VCS_SYNC_SOURCE_ID', 0)),
+            concurrency=int(os.environ.get('VCS_SYNC_CONCURRENCY', 8)),
+            page_size=int(os.environ.get('VCS_SYNC_PAGE_SIZE', GiteaUserSync.PAGE_SIZE)),
+            disable_missing=os.environ.get('VCS_SYNC_DISABLE_MISSING', 'true').lower() == 'true',
+            dry_run=os.environ.get('VCS_SYNC_DRY_RUN', 'false').lower() == 'true',
+            scratch_dir=os.environ.get('VCS_SYNC_SCRATCH_DIR'))
+        try:
+            counts = sync.run()
+        except Exception as e:
+            if not (is_fatal(e) and ks.discard_rejected_token()):
+                raise
+            LOGGER.warning('KC master admin token was rejected, syncing again with a new one')
+            counts = sync.run()
+        metrics.update({'sync_' + k: v for (k, v) in counts.items()})
+        metrics['sync_seconds'] = round(time.monotonic() - start, 3)
+        write_metrics(metrics, os.environ.get('STARTUP_METRICS_FILE'))
+        return
+
+    attempts = 0
     while True:
+        attempts += 1
         try:
             ks.run()
             break
-        except Exception:
+        except Exception as e:
+            if is_fatal(e) and ks.discard_rejected_token():
+                LOGGER.warning(
+                    'KC master admin token was rejected, trying again with a new one',
+                    exc_info=True)
+                continue
+            if is_fatal(e):
+                LOGGER.error(
+                    'setup of gitea default user in keycloak failed, not retrying', exc_info=True)
+                raise
+            delay = backoff_delay(attempts)
             LOGGER.warning(
-                'setup of gitea default user in keycloak failed, will try again', exc_info=True)
-            time.sleep(10)
+                'setup of gitea default user in keycloak failed, will try again in %.1fs',
+                delay, exc_info=True)
+            time.sleep(delay)
 
+    metrics.update(setup_attempts=attempts, setup_seconds=round(time.monotonic() - start, 3))
+    write_metrics(metrics, os.environ.get('STARTUP_METRICS_FILE'))
     LOGGER.info('gitea user creation complete')
 
 
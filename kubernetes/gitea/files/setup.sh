@@ -2,7 +2,7 @@
 #
 # MIT License
 #
-# (C) Copyright 2019-2022 Hewlett Packard Enterprise Development LP
+# (C) Copyright 2019-2022, 2026 Hewlett Packard Enterprise Development LP
 #
 # Permission is hereby granted, free of charge, to any person obtaining a
 # copy of this software and associated documentation files (the "Software"),
@@ -22,40 +22,66 @@
 # ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
 # OTHER DEALINGS IN THE SOFTWARE.
 #
-# Create the admin user for gitea
+# Create the admin user for gitea. The web service and the credentials mount
+# are waited for concurrently, the service being probed with a fast backoff
+# so it is noticed within moments of coming up.
 
 DATA_MOUNT=/var/lib/gitea
 LOG_FILE=${DATA_MOUNT}/setup.log
+CREDENTIALS_DIR=/mnt/crayvcs-credentials
+# As long as the waits could take before: 30 attempts 5 seconds apart
+SETUP_TIMEOUT=${SETUP_TIMEOUT:-150}
+DEADLINE=$((SECONDS + SETUP_TIMEOUT))
+START_US=${EPOCHREALTIME//[.,]/}
 echo `date` >> $LOG_FILE
 rm -f ${DATA_MOUNT}/git/.gitconfig.lock
 
+# Seconds since the start of the setup, to the millisecond
+elapsed() {
+    local ms=$(( (${EPOCHREALTIME//[.,]/} - START_US) / 1000 ))
+    printf '%d.%03d' $((ms / 1000)) $((ms % 1000))
+}
+
 # Wait for the service to be up and running before attempting to run the cli
-echo "Waiting for gitea web service to be available..." >> $LOG_FILE
-attempt_counter=0
-max_attempts=30
-until $(curl --output ${DATA_MOUNT}/curl.out --silent --fail http://localhost:3000); do
-    if [ ${attempt_counter} -eq ${max_attempts} ];then
-      echo "Max attempts reached" >> $LOG_FILE
-      exit 1
-    fi
-    printf '.'
-    attempt_counter=$(($attempt_counter+1))
-    sleep 5
-done
+wait_for_web_service() {
+    local delays=(0.05 0.1 0.2 0.4 0.8 1)
+    local probes=0
+    until curl --output ${DATA_MOUNT}/curl.out --silent --fail --max-time 5 http://localhost:3000; do
+        if [ ${SECONDS} -ge ${DEADLINE} ]; then
+            echo "Gitea web service not available after ${probes} probes" >> $LOG_FILE
+            return 1
+        fi
+        sleep ${delays[$((probes < 5 ? probes : 5))]}
+        probes=$((probes + 1))
+    done
+    echo "Gitea web service available after $(elapsed)s ($((probes + 1)) probes)" >> $LOG_FILE
+}
 
 # Wait for secret mounts to be in place before attempting to run the cli
-echo "Waiting for vcs user credentials to be available..." >> $LOG_FILE
-attempt_counter=0
-max_attempts=30
-until $([[ -f "/mnt/crayvcs-credentials/vcs_username" ]]); do
-    if [ ${attempt_counter} -eq ${max_attempts} ];then
-      echo "Max attempts reached" >> $LOG_FILE
-      exit 1
-    fi
-    printf '.'
-    attempt_counter=$(($attempt_counter+1))
-    sleep 5
-done
+wait_for_credentials() {
+    until [[ -f "${CREDENTIALS_DIR}/vcs_username" ]]; do
+        if [ ${SECONDS} -ge ${DEADLINE} ]; then
+            echo "Vcs user credentials not available" >> $LOG_FILE
+            return 1
+        fi
+        sleep 0.5
+    done
+    echo "Vcs user credentials available after $(elapsed)s" >> $LOG_FILE
+}
+
+echo "Waiting for gitea web service and vcs user credentials to be available..." >> $LOG_FILE
+wait_for_web_service &
+web_service_pid=$!
+wait_for_credentials &
+credentials_pid=$!
+wait ${web_service_pid}
+web_service_result=$?
+wait ${credentials_pid}
+credentials_result=$?
+if [ ${web_service_result} -ne 0 ] || [ ${credentials_result} -ne 0 ]; then
+  echo "Max wait of ${SETUP_TIMEOUT}s reached" >> $LOG_FILE
+  exit 1
+fi
 
 # The migration to the rootless container requires that hooks be regenerated
 if [ -f "/var/lib/gitea/regenerate-hooks" ]; then
@@ -64,15 +90,26 @@ if [ -f "/var/lib/gitea/regenerate-hooks" ]; then
   rm /var/lib/gitea/regenerate-hooks
 fi
 
-# Setting up crayvcs user, gitea has no way of listing users to check if the
-# user already exists, so have to create one and check the return code. Gitea
-# issue has been filed: https://github.com/go-gitea/gitea/issues/6001
-echo "Creating admin user" >> $LOG_FILE
-CRAYVCS_USER=$(</mnt/crayvcs-credentials/vcs_username)
-CRAYVCS_PASSWORD=$(</mnt/crayvcs-credentials/vcs_password)
+# Whether the admin user exists. The cli reads the database, so unlike the
+# API, which only answers the user itself, it tells a missing user apart
+# from one whose password differs.
+admin_user_exists() {
+    /usr/local/bin/gitea admin user list --admin --config ${DATA_MOUNT}/app.ini 2>> $LOG_FILE |
+        awk -v user="${1,,}" 'NR > 1 && tolower($2) == user { found = 1 } END { exit !found }'
+}
+
+CRAYVCS_USER=$(<${CREDENTIALS_DIR}/vcs_username)
+CRAYVCS_PASSWORD=$(<${CREDENTIALS_DIR}/vcs_password)
 CRAYVCS_USER_EMAIL="${CRAYVCS_USER}@mgmt-plane-nmn.local"
 cd ${DATA_MOUNT}/custom
 echo "Running in `pwd`" >> $LOG_FILE
+if admin_user_exists "${CRAYVCS_USER}"; then
+  echo "admin user '${CRAYVCS_USER}' already exists" >> $LOG_FILE
+  echo "Setup done after $(elapsed)s" >> $LOG_FILE
+  exit 0
+fi
+
+echo "Creating admin user" >> $LOG_FILE
 # The password argument must go last because if it happens to begin with
 # a dash, it causes problems if it is not last.
 /usr/local/bin/gitea admin user create \
@@ -92,3 +129,4 @@ if [ $RESULT == 0 ]; then
 else
   echo "User creation failed OR admin user '${CRAYVCS_USER}' has previously been created" >> $LOG_FILE
 fi
+echo "Setup done after $(elapsed)s" >> $LOG_FILE
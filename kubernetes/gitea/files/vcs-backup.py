@@ -0,0 +1,424 @@
+#
+# MIT License
+#
+# (C) Copyright 2026 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+
+import argparse
+import fnmatch
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+# The backup store holds:
+#   objects/ab/cdef...        file contents, named by their SHA-256
+#   snapshots/ID.jsonl.gz     one manifest per backup, enough to restore it
+#   index.sqlite              the size/mtime/inode fingerprint and hash of
+#                             every file of the last backup, so unchanged
+#                             files are neither read nor copied again
+
+DEFAULT_SOURCE = '/var/lib/gitea'
+DEFAULT_STORE = '/mnt/vcs-backup'
+
+# Repositories live in OWNER/NAME.git directories below this, relative to
+# the data mount, and are backed up concurrently with each other
+REPOSITORIES_DIR = os.path.join('data', 'gitea-repositories')
+
+# Files being written by git or gitea, not worth backing up
+DEFAULT_EXCLUDES = ('*.lock', 'tmp_pack_*', 'tmp_idx_*', 'tmp_obj_*')
+
+CHUNK_SIZE = 1024 * 1024
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    id TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    source TEXT NOT NULL,
+    files INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    new_files INTEGER NOT NULL,
+    new_bytes INTEGER NOT NULL
+);
+'''
+
+LOGGER = logging.getLogger('vcs-backup')
+
+
+class Store(object):
+    """ A content-addressed store of file contents, snapshot manifests and the file index """
+
+    def __init__(self, path):
+        self.path = path
+        self.objects = os.path.join(path, 'objects')
+        self.snapshots = os.path.join(path, 'snapshots')
+        self.tmp = os.path.join(path, 'tmp')
+        for d in (self.objects, self.snapshots, self.tmp):
+            os.makedirs(d, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(path, 'index.sqlite'))
+        self.db.executescript(SCHEMA)
+
+    def object_path(self, sha):
+        return os.path.join(self.objects, sha[:2], sha[2:])
+
+    def has(self, sha):
+        return os.path.exists(self.object_path(sha))
+
+    def ingest(self, path):
+        """
+        Copy a file into the store while hashing it, in one read. Returns
+        (sha256, size, new), new being False when the store already had the
+        content, in which case the copy is dropped.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp = _mkstemp(self.tmp)
+        try:
+            with open(path, 'rb') as src, os.fdopen(fd, 'wb') as dst:
+                for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    dst.write(chunk)
+                    size += len(chunk)
+                dst.flush()
+                os.fsync(dst.fileno())
+            sha = digest.hexdigest()
+            if self.has(sha):
+                os.unlink(tmp)
+                return sha, size, False
+            os.makedirs(os.path.dirname(self.object_path(sha)), exist_ok=True)
+            os.chmod(tmp, 0o444)
+            os.replace(tmp, self.object_path(sha))
+            return sha, size, True
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def load_index(self):
+        """ path -> (size, mtime_ns, inode, sha256) of the files of the last backup """
+        return dict((row[0], tuple(row[1:])) for row in
+                    self.db.execute('SELECT path, size, mtime_ns, inode, sha256 FROM files'))
+
+    def save_index(self, index, seen):
+        """ Store the fingerprints of changed files and drop those of deleted ones """
+        with self.db:
+            self.db.executemany('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)',
+                                ((path,) + fingerprint for (path, fingerprint) in seen.items()
+                                 if index.get(path) != fingerprint))
+            self.db.executemany('DELETE FROM files WHERE path = ?',
+                                ((path,) for path in index if path not in seen))
+
+    def manifest_path(self, snapshot):
+        return os.path.join(self.snapshots, snapshot + '.jsonl.gz')
+
+    def write_manifest(self, snapshot, header, entries):
+        fd, tmp = _mkstemp(self.tmp)
+        with gzip.open(os.fdopen(fd, 'wb'), 'wt') as f:
+            f.write(json.dumps(header, sort_keys=True) + '\n')
+            for entry in entries:
+                f.write(json.dumps(entry, sort_keys=True) + '\n')
+        os.replace(tmp, self.manifest_path(snapshot))
+
+    def read_manifest(self, snapshot):
+        """ The (header, entries) of a snapshot manifest """
+        with gzip.open(self.manifest_path(snapshot), 'rt') as f:
+            header = json.loads(f.readline())
+            return header, [json.loads(line) for line in f]
+
+    def list_snapshots(self):
+        return [dict(zip(('id', 'created', 'source', 'files', 'bytes', 'new_files', 'new_bytes'), row))
+                for row in self.db.execute('SELECT * FROM snapshots ORDER BY created, id')]
+
+    def prune(self, keep):
+        """ Keep the last keep snapshots, and only the objects they reference """
+        snapshots = [s['id'] for s in self.list_snapshots()]
+        expired, kept = snapshots[:-keep], snapshots[-keep:]
+        if not expired:
+            return 0, 0
+        with self.db:
+            self.db.executemany('DELETE FROM snapshots WHERE id = ?', ((s,) for s in expired))
+        for snapshot in expired:
+            try:
+                os.unlink(self.manifest_path(snapshot))
+            except FileNotFoundError:
+                pass
+
+        referenced = set()
+        for snapshot in kept:
+            _, entries = self.read_manifest(snapshot)
+            referenced.update(e['sha256'] for e in entries if e['type'] == 'file')
+        removed = freed = 0
+        for prefix in os.listdir(self.objects):
+            for name in os.listdir(os.path.join(self.objects, prefix)):
+                if prefix + name not in referenced:
+                    path = os.path.join(self.objects, prefix, name)
+                    freed += os.path.getsize(path)
+                    os.unlink(path)
+                    removed += 1
+        LOGGER.info("Pruned %d snapshots, removed %d objects (%d bytes)", len(expired), removed, freed)
+        return removed, freed
+
+
+def _mkstemp(directory):
+    return tempfile.mkstemp(dir=directory, suffix='.tmp')
+
+
+def _common(st):
+    return dict(mode=st.st_mode & 0o7777, uid=st.st_uid, gid=st.st_gid, mtime_ns=st.st_mtime_ns)
+
+
+class Backup(object):
+    """ Backs up a source tree into a store, reading and copying only changed files """
+
+    def __init__(self, store, source, excludes=DEFAULT_EXCLUDES):
+        self.store = store
+        self.source = source
+        self.excludes = excludes
+        self.index = store.load_index()
+        self.seen = {}
+
+    def units(self):
+        """
+        The independent units of work: the top of the tree, skipping the
+        repository directories, then each repository directory.
+        """
+        repos = []
+        top = os.path.join(self.source, REPOSITORIES_DIR)
+        if os.path.isdir(top):
+            for owner in sorted(os.listdir(top)):
+                if os.path.isdir(os.path.join(top, owner)):
+                    repos.extend(os.path.join(REPOSITORIES_DIR, owner, name)
+                                 for name in sorted(os.listdir(os.path.join(top, owner)))
+                                 if os.path.isdir(os.path.join(top, owner, name)))
+        return [('', frozenset(repos))] + [(repo, frozenset()) for repo in repos]
+
+    def _excluded(self, name):
+        return any(fnmatch.fnmatch(name, pattern) for pattern in self.excludes)
+
+    def scan(self, unit):
+        """ Back up the files of one unit, returning (entries, fingerprints, counters) """
+        top, skip = unit
+        entries = []
+        fingerprints = {}
+        counters = Counter()
+        if top:
+            entries.append(dict(_common(os.lstat(os.path.join(self.source, top))), path=top, type='dir'))
+        stack = [top]
+        while stack:
+            rel = stack.pop()
+            try:
+                it = os.scandir(os.path.join(self.source, rel))
+            except FileNotFoundError:
+                continue
+            with it:
+                for entry in it:
+                    path = os.path.join(rel, entry.name) if rel else entry.name
+                    if self._excluded(entry.name) or path in skip:
+                        continue
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                        if entry.is_symlink():
+                            entries.append(dict(_common(st), path=path, type='symlink',
+                                                target=os.readlink(entry.path)))
+                        elif entry.is_dir(follow_symlinks=False):
+                            entries.append(dict(_common(st), path=path, type='dir'))
+                            stack.append(path)
+                        elif entry.is_file(follow_symlinks=False):
+                            entries.append(self._file(path, entry.path, st, fingerprints, counters))
+                    except FileNotFoundError:
+                        # Removed while the backup was running
+                        continue
+        return entries, fingerprints, counters
+
+    def _file(self, path, full_path, st, fingerprints, counters):
+        fingerprint = (st.st_size, st.st_mtime_ns, st.st_ino)
+        previous = self.index.get(path)
+        counters['files'] += 1
+        counters['bytes'] += st.st_size
+        if previous is not None and previous[:3] == fingerprint and self.store.has(previous[3]):
+            sha = previous[3]
+            size = st.st_size
+        else:
+            sha, size, new = self.store.ingest(full_path)
+            counters['read_bytes'] += size
+            if new:
+                counters['new_files'] += 1
+                counters['new_bytes'] += size
+            after = os.lstat(full_path)
+            if (after.st_size, after.st_mtime_ns, after.st_ino) != fingerprint:
+                # Changed while being copied: keep the copy, but read the
+                # file again next time
+                LOGGER.warning("%s changed while being backed up", path)
+                return dict(_common(st), path=path, type='file', size=size, sha256=sha)
+        fingerprints[path] = fingerprint + (sha,)
+        return dict(_common(st), path=path, type='file', size=size, sha256=sha)
+
+    def run(self, concurrency=4):
+        """ Back up the source, returning the snapshot summary """
+        start = time.time()
+        snapshot = time.strftime('%Y%m%dT%H%M%SZ', time.gmtime(start))
+        entries = []
+        counters = Counter()
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            for (unit_entries, fingerprints, unit_counters) in executor.map(self.scan, self.units()):
+                entries.extend(unit_entries)
+                self.seen.update(fingerprints)
+                counters.update(unit_counters)
+        entries.sort(key=lambda e: e['path'])
+
+        header = dict(version=1, id=snapshot, created=start, source=self.source)
+        self.store.write_manifest(snapshot, header, entries)
+        self.store.save_index(self.index, self.seen)
+        summary = dict(id=snapshot, files=counters['files'], bytes=counters['bytes'],
+                       new_files=counters['new_files'], new_bytes=counters['new_bytes'])
+        with self.store.db:
+            self.store.db.execute('INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                  (snapshot, start, self.source, summary['files'], summary['bytes'],
+                                   summary['new_files'], summary['new_bytes']))
+        summary.update(read_bytes=counters['read_bytes'], seconds=round(time.time() - start, 3))
+        return summary
+
+
+class Restore(object):
+    """ Restores a snapshot manifest from a store into a target directory """
+
+    def __init__(self, store, snapshot, target, verify=False):
+        self.store = store
+        self.target = target
+        self.verify = verify
+        self.header, self.entries = store.read_manifest(snapshot)
+        self.chown = os.geteuid() == 0
+
+    def _attributes(self, path, entry):
+        if self.chown:
+            os.chown(path, entry['uid'], entry['gid'], follow_symlinks=False)
+        if entry['type'] != 'symlink':
+            os.chmod(path, entry['mode'])
+            os.utime(path, ns=(entry['mtime_ns'], entry['mtime_ns']))
+
+    def _file(self, entry):
+        path = os.path.join(self.target, entry['path'])
+        digest = hashlib.sha256()
+        tmp = path + '.restore.tmp'
+        with open(self.store.object_path(entry['sha256']), 'rb') as src, open(tmp, 'wb') as dst:
+            for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                if self.verify:
+                    digest.update(chunk)
+                dst.write(chunk)
+        if self.verify and digest.hexdigest() != entry['sha256']:
+            os.unlink(tmp)
+            raise ValueError('{}: object {} is corrupt'.format(entry['path'], entry['sha256']))
+        os.replace(tmp, path)
+        self._attributes(path, entry)
+        return entry['size']
+
+    def run(self, concurrency=4):
+        start = time.time()
+        os.makedirs(self.target, exist_ok=True)
+        dirs = [e for e in self.entries if e['type'] == 'dir']
+        for entry in dirs:
+            os.makedirs(os.path.join(self.target, entry['path']), exist_ok=True)
+        for entry in self.entries:
+            if entry['type'] == 'symlink':
+                path = os.path.join(self.target, entry['path'])
+                if os.path.lexists(path):
+                    os.unlink(path)
+                os.symlink(entry['target'], path)
+                self._attributes(path, entry)
+        files = [e for e in self.entries if e['type'] == 'file']
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            restored = sum(executor.map(self._file, files))
+        # Children change the mtime of their directory, so do these last,
+        # deepest first
+        for entry in reversed(dirs):
+            self._attributes(os.path.join(self.target, entry['path']), entry)
+        return dict(id=self.header['id'], files=len(files), bytes=restored,
+                    seconds=round(time.time() - start, 3))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Incremental, content-addressed backup of the gitea data volume')
+    parser.add_argument('--store', default=os.environ.get('VCS_BACKUP_STORE', DEFAULT_STORE),
+                        help='backup store directory (default: %(default)s)')
+    parser.add_argument('--concurrency', type=int,
+                        default=int(os.environ.get('VCS_BACKUP_CONCURRENCY', '4')),
+                        help='repositories processed at once (default: %(default)s)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    backup = commands.add_parser('backup', help='back up the files changed since the last backup')
+    backup.add_argument('--source', default=os.environ.get('VCS_BACKUP_SOURCE', DEFAULT_SOURCE),
+                        help='gitea data directory (default: %(default)s)')
+    backup.add_argument('--exclude', action='append', default=list(DEFAULT_EXCLUDES),
+                        help='file name pattern not to back up, may be repeated')
+    backup.add_argument('--keep', type=int, default=int(os.environ.get('VCS_BACKUP_KEEP', '0')),
+                        help='prune all but the last KEEP snapshots afterwards, 0 keeping all')
+
+    restore = commands.add_parser('restore', help='restore a snapshot into a directory')
+    restore.add_argument('target', help='directory to restore into')
+    restore.add_argument('--snapshot', default='latest', help='snapshot id (default: %(default)s)')
+    restore.add_argument('--verify', action='store_true', help='check the hash of every file restored')
+    restore.add_argument('--force', action='store_true', help='restore into a non-empty directory')
+
+    commands.add_parser('list', help='list the snapshots')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    store = Store(args.store)
+
+    if args.command == 'backup':
+        summary = Backup(store, args.source, excludes=tuple(args.exclude)).run(args.concurrency)
+        if args.keep > 0:
+            summary['pruned_objects'], summary['pruned_bytes'] = store.prune(args.keep)
+        LOGGER.info("Snapshot %s: %d files, %d new (%d of %d bytes)", summary['id'], summary['files'],
+                    summary['new_files'], summary['new_bytes'], summary['bytes'])
+    elif args.command == 'restore':
+        snapshot = args.snapshot
+        if snapshot == 'latest':
+            snapshots = store.list_snapshots()
+            if not snapshots:
+                parser.error('the store has no snapshot')
+            snapshot = snapshots[-1]['id']
+        if os.path.isdir(args.target) and os.listdir(args.target) and not args.force:
+            parser.error('{} is not empty, use --force to restore into it'.format(args.target))
+        summary = Restore(store, snapshot, args.target, verify=args.verify).run(args.concurrency)
+        LOGGER.info("Restored snapshot %s: %d files, %d bytes", summary['id'], summary['files'],
+                    summary['bytes'])
+    else:
+        summary = store.list_snapshots()
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()